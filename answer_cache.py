@@ -0,0 +1,109 @@
+"""Semantic answer cache for repeated questions against the same library.
+
+Answers are stored per library key and per scope (plain Q&A, agent chat,
+...). A question is a hit when it normalises to a question already asked,
+or when its embedding is at least `threshold` cosine-similar to one. Hits
+skip retrieval and the LLM entirely.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("STUDYGEN_ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = int(os.getenv("STUDYGEN_ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_SIZE = int(os.getenv("STUDYGEN_ANSWER_CACHE_SIZE", "1000"))
+
+
+def normalize_query(query):
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+class _Entry:
+    def __init__(self, vector, answer):
+        self.vector = vector
+        self.answer = answer
+        self.created = time.time()
+
+
+class AnswerCache:
+    """In-memory, TTL- and size-bounded cache of answers by query similarity"""
+
+    def __init__(self, embeddings, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL,
+                 max_entries=ANSWER_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # {(library key, scope, normalised query): _Entry}
+        self._lock = threading.Lock()
+
+    def _embed(self, query):
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for key in [key for key, entry in self._entries.items() if entry.created < cutoff]:
+            del self._entries[key]
+
+    def lookup(self, library_key, scope, query):
+        """Return a cached answer for `query`, or None"""
+        exact_key = (library_key, scope, normalize_query(query))
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(exact_key)
+            if entry is None:
+                candidates = [
+                    (key, entry) for key, entry in self._entries.items()
+                    if key[0] == library_key and key[1] == scope
+                ]
+            else:
+                candidates = []
+
+        if entry is None and candidates:
+            vector = self._embed(query)
+            scores = np.stack([candidate.vector for _, candidate in candidates]) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                exact_key, entry = candidates[best]
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if exact_key in self._entries:
+                self._entries.move_to_end(exact_key)
+            return entry.answer
+
+    def store(self, library_key, scope, query, answer):
+        key = (library_key, scope, normalize_query(query))
+        entry = _Entry(self._embed(query), answer)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, library_key, scope, query, compute):
+        answer = self.lookup(library_key, scope, query)
+        if answer is None:
+            answer = compute(query)
+            self.store(library_key, scope, query, answer)
+        return answer
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,78 @@
+"""Agent prompt tokens per chat turn: unbounded buffer vs. budgeted summary memory.
+
+Run from the repository root:
+
+    python benchmarks/bench_chat_memory.py
+
+Holds a long study conversation with the agent app's
+CONVERSATIONAL_REACT_DESCRIPTION agent on a fake LLM that gives ~200-token
+answers, once with ConversationBufferMemory and once with
+BudgetedSummaryMemory, and counts the prompt tokens every turn sends.
+Summaries come from the same fake LLM, so summariser calls and their
+prompt tokens are reported too.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.agents import AgentType, Tool, initialize_agent
+
+from chat_memory import MEMORY_TOKENS, history_tokens, make_memory
+from streaming import LLMCallCounter
+
+from fakes import FakeLLM
+
+TURNS = 40
+ANSWER = "The material explains this step by step with examples and definitions. " * 16
+SUMMARY = "The student is revising photosynthesis, cell respiration and enzymes, " * 8
+
+
+def respond(prompt):
+    if "Progressively summarize" in prompt:
+        return SUMMARY
+    return f"Do I need to use a tool? No\nAI: {ANSWER}"
+
+
+def run_session(mode):
+    summary_counter = LLMCallCounter()
+    summary_llm = FakeLLM(respond=respond, callbacks=[summary_counter])
+    memory = make_memory(summary_llm, mode=mode)
+    tool = Tool(name="Question Answering", func=lambda query: ANSWER,
+                description="Answers specific questions from the study material with source references")
+    agent = initialize_agent(
+        tools=[tool],
+        llm=FakeLLM(respond=respond),
+        agent=AgentType.CONVERSATIONAL_REACT_DESCRIPTION,
+        memory=memory,
+        verbose=False,
+        handle_parsing_errors=True,
+    )
+    turns = []
+    for turn in range(TURNS):
+        counter = LLMCallCounter()
+        history = history_tokens(memory)
+        agent.run(f"Question {turn}: how does step {turn} of the process work?", callbacks=[counter])
+        turns.append((counter.prompt_tokens, history))
+    return turns, summary_counter
+
+
+def main():
+    buffer_turns, _ = run_session("buffer")
+    summary_turns, summary_counter = run_session("summary")
+
+    print(f"Prompt tokens per turn (memory budget {MEMORY_TOKENS:,} tokens):")
+    print(f"{'turn':>5} {'buffer prompt':>14} {'history':>8} {'summary prompt':>15} {'history':>8}")
+    for turn in range(0, TURNS, 5):
+        (buffer_prompt, buffer_history), (summary_prompt, summary_history) = buffer_turns[turn], summary_turns[turn]
+        print(f"{turn + 1:>5} {buffer_prompt:>14,} {buffer_history:>8,} {summary_prompt:>15,} {summary_history:>8,}")
+
+    buffer_total = sum(prompt for prompt, _ in buffer_turns)
+    summary_total = sum(prompt for prompt, _ in summary_turns) + summary_counter.prompt_tokens
+    print(f"\nTotal over {TURNS} turns: buffer {buffer_total:,} prompt tokens, "
+          f"summary {summary_total:,} ({summary_counter.calls} summariser calls, "
+          f"{summary_counter.prompt_tokens:,} of those tokens)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Prompt tokens and latency with and without context packing.
+
+Run from the repository root:
+
+    python benchmarks/bench_context_packing.py
+
+Builds synthetic modules of increasing size and, for a batch of questions,
+compares the old "whole module in every prompt" approach with token-budgeted
+packing. Completion latency is simulated from prompt size (prefill cost per
+token plus a fixed round trip), and embedding calls from a fixed per-call
+latency, so the numbers are comparable across machines and commits.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_pack import CONTEXT_TOKEN_BUDGET, count_tokens, pack_context
+
+from fakes import hash_vector, make_document
+
+ROUND_TRIP = 0.3  # seconds per completion, independent of prompt size
+PREFILL_PER_TOKEN = 0.00005  # seconds per prompt token
+EMBED_CALL = 0.05  # seconds per embeddings request
+QUESTIONS = [
+    "What does section 3 discuss?",
+    "How does concept 42 relate to topic 7?",
+    "Summarise the main ideas of section 10.",
+    "Define concept 100.",
+    "What is topic 5 about?",
+]
+
+
+def embed(texts):
+    time.sleep(EMBED_CALL * ((len(texts) + 255) // 256))
+    return [hash_vector(text) for text in texts]
+
+
+def simulated_completion(prompt_tokens):
+    return ROUND_TRIP + PREFILL_PER_TOKEN * prompt_tokens
+
+
+def main():
+    print(f"budget {CONTEXT_TOKEN_BUDGET} tokens, {len(QUESTIONS)} questions per module")
+    print(f"{'module chars':>12} | {'full tok/q':>10} {'full s/q':>9} | {'packed tok/q':>12} {'packed s/q':>10} {'index s':>8}")
+    for chars in (8_000, 50_000, 250_000, 1_000_000):
+        text = make_document(1, chars)
+
+        full_tokens = [count_tokens(f"Answer this based on:\n\n{text}\n\nQ: {q}") for q in QUESTIONS]
+
+        index = None
+        packed_tokens = []
+        packing_time = 0.0
+        index_time = 0.0
+        for q in QUESTIONS:
+            start = time.perf_counter()
+            had_index = index is not None
+            context, index = pack_context(text, q, embed, index=index)
+            elapsed = time.perf_counter() - start
+            if not had_index and index is not None:
+                index_time += elapsed
+            else:
+                packing_time += elapsed
+            packed_tokens.append(count_tokens(f"Answer this based on:\n\n{context}\n\nQ: {q}"))
+
+        full_latency = sum(simulated_completion(t) for t in full_tokens) / len(QUESTIONS)
+        packed_latency = (packing_time + sum(simulated_completion(t) for t in packed_tokens)) / len(QUESTIONS)
+        print(f"{chars:>12,} | {sum(full_tokens) // len(QUESTIONS):>10,} {full_latency:>9.2f} | "
+              f"{sum(packed_tokens) // len(QUESTIONS):>12,} {packed_latency:>10.2f} {index_time:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Scoped retrieval: filtering chunks before the similarity search versus after it.
+
+Run from the repository root:
+
+    python benchmarks/bench_filtered_retrieval.py
+
+For each library size, a question scoped to one document is answered three
+ways: an unscoped search over the whole library, LangChain's FAISS filter
+(search the library, then drop chunks from other documents) and
+IncrementalIndex.search (dense mode), which picks the document's chunks
+from their metadata and scores only those. The post-filter columns show
+how many of the k results survive with the default fetch_k; the pre-filter
+results are checked against an exhaustive search of the scoped chunks.
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import FakeEmbeddings, make_document
+from vector_index import IncrementalIndex
+
+LIBRARY_SIZES = [10, 100, 400]
+DIM = 1536  # text-embedding-3-small
+K = 5
+SEARCHES = 20
+
+
+def median_seconds(search):
+    latencies = []
+    for i in range(SEARCHES):
+        start = time.perf_counter()
+        results = search(f"How does concept {i} relate to topic {i % 13}?")
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies), len(results)
+
+
+def main():
+    print(f"{'docs':>5} {'chunks':>7} {'all ms':>8} {'post ms':>8} {'post hits':>10} {'pre ms':>8} {'pre hits':>9} {'exact':>6}")
+    for size in LIBRARY_SIZES:
+        index = IncrementalIndex(FakeEmbeddings(dim=DIM))
+        index.sync({f"chapter_{i}.pdf": {"text": make_document(i)} for i in range(size)})
+        store = index.store
+        scope = {"source": "chapter_3.pdf"}
+
+        everything, _ = median_seconds(lambda query: index.search(query, K, mode="vector"))
+        post, post_hits = median_seconds(lambda query: store.similarity_search(query, k=K, filter=scope))
+        pre, pre_hits = median_seconds(lambda query: index.search(query, K, scope, mode="vector"))
+
+        query = "How does concept 7 relate to topic 7?"
+        exhaustive = store.similarity_search(query, k=K, filter=scope, fetch_k=store.index.ntotal)
+        scoped = index.search(query, K, scope, mode="vector")
+        exact = [doc.page_content for doc in scoped] == [doc.page_content for doc in exhaustive]
+        print(f"{size:>5} {index.chunk_count:>7} {everything * 1000:>8.2f} {post * 1000:>8.2f} {post_hits:>10} "
+              f"{pre * 1000:>8.2f} {pre_hits:>9} {str(exact):>6}")
+
+
+if __name__ == "__main__":
+    main()
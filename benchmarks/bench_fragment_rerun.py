@@ -0,0 +1,94 @@
+"""Flashcard interaction latency: full-script rerun vs. fragment rerun.
+
+Run from the repository root:
+
+    python benchmarks/bench_fragment_rerun.py
+
+Drives hackathon_ai_tool_agent.py with Streamlit's AppTest on in-memory
+libraries of growing size (fake embeddings, no network). A full rerun is
+what every card flip cost before the flashcard deck became a fragment; a
+fragment rerun is what a flip costs now. AppTest can only request full
+reruns, so fragment reruns are requested the way the browser does, by
+queueing the fragment's id on the rerun. The compiled script is cached
+across reruns as the Streamlit server does; AppTest otherwise recompiles
+it on every run.
+"""
+import functools
+import os
+import statistics
+import sys
+import time
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import streamlit.testing.v1.app_test as app_test
+import streamlit.testing.v1.local_script_runner as local_script_runner
+from streamlit.testing.v1 import AppTest
+
+from vector_index import IncrementalIndex
+
+from fakes import FakeEmbeddings, make_document
+
+LIBRARY_SIZES = [5, 50, 200]
+RERUNS = 20
+
+
+def open_app(documents_count):
+    app = AppTest.from_file(os.path.join(ROOT, "hackathon_ai_tool_agent.py"), default_timeout=120)
+    app.run()
+    documents = {
+        f"doc{i}.txt": {"text": make_document(i, 2000), "upload_time": "", "size": 2000, "type": "TXT"}
+        for i in range(documents_count)
+    }
+    index = IncrementalIndex(FakeEmbeddings())
+    index.sync(documents)
+    app.session_state["documents"] = documents
+    app.session_state["vectorstore"] = index
+    app.session_state["current_tab"] = "flashcards"
+    app.session_state["current_flashcards"] = [
+        {"question": f"Question {i}?", "answer": f"Answer {i}."} for i in range(10)
+    ]
+    app.run()
+    assert not app.exception, [e.value for e in app.exception]
+    return app
+
+
+def flip(app):
+    next(b for b in app.button if b.label in ("👁️ Show Answer", "🙈 Hide Answer")).click()
+    started = time.perf_counter()
+    app.run()
+    return time.perf_counter() - started
+
+
+def fragment_reruns(app):
+    """Make app.run() rerun only the fragments registered by the last full run"""
+    fragment_ids = list(app._fragment_storage._fragments)
+    rerun_data = functools.partial(
+        local_script_runner.RerunData, fragment_id_queue=fragment_ids, is_fragment_scoped_rerun=True
+    )
+    return mock.patch.object(local_script_runner, "RerunData", rerun_data)
+
+
+def main():
+    shared_script_cache = app_test.ScriptCache()
+    for module in (app_test, local_script_runner):
+        mock.patch.object(module, "ScriptCache", lambda: shared_script_cache).start()
+
+    print(f"Median flashcard flip over {RERUNS} reruns (AppTest overhead included):")
+    print(f"{'documents':>10} {'full rerun':>12} {'fragment':>12}")
+    for size in LIBRARY_SIZES:
+        app = open_app(size)
+        full = [flip(app) for _ in range(RERUNS)]
+        with fragment_reruns(app):
+            before = app.session_state["show_answer"]
+            fragment = [flip(app) for _ in range(RERUNS)]
+            # An even number of flips lands back where it started
+            assert app.session_state["show_answer"] == before
+        print(f"{size:>10} {statistics.median(full) * 1000:>10.1f}ms {statistics.median(fragment) * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Hybrid (BM25 + dense) retrieval versus dense-only: latency, recall and embedding calls.
+
+Run from the repository root:
+
+    python benchmarks/bench_hybrid_retrieval.py
+
+Every generated document has one planted fact naming a made-up term
+("The varkelin-17 constant of liver tissue is 412 units."). Two query sets
+are run against libraries of growing size with a bag-of-words dense
+embedder that waits EMBEDDING_LATENCY per call, like the API:
+
+- exact: "What is the varkelin-17 constant?"; recall@k is the share of
+  queries whose planted fact is among the k chunks returned
+- general: "How does concept 7 relate to topic 7?", which has no rare
+  terms, so hybrid mode fuses the lexical and dense rankings
+
+For each mode the table shows the median latency, recall@k on the exact
+set, and how many queries had to embed the query text.
+
+Last, plain questions are asked of one small upload, the repository's
+README, as a student would phrase them. None of them names a rare term,
+so all should take the hybrid path rather than skip dense retrieval.
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import BowEmbeddings, make_document
+from vector_index import IncrementalIndex
+
+README = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "README.md")
+NATURAL_QUESTIONS = [
+    "which language models are supported",
+    "How do I install the requirements?",
+    "What file types can I upload?",
+    "Where are the saved indexes kept?",
+    "Is there a way to generate a quiz from my notes?",
+]
+
+LIBRARY_SIZES = [20, 100, 400]
+QUERIES = 40
+K = 5
+EMBEDDING_LATENCY = 0.05
+TISSUES = ["liver", "kidney", "muscle", "bone", "skin", "lung", "heart", "nerve"]
+SYLLABLES = ["var", "kel", "zor", "bin", "tam", "quo", "rix", "pel", "dun", "mav"]
+
+
+def term(n):
+    return f"{SYLLABLES[n % 10]}{SYLLABLES[n // 10 % 10]}in-{n}"
+
+
+def fact(n):
+    return f"The {term(n)} constant of {TISSUES[n % 8]} tissue is {400 + n % 97} units. "
+
+
+def make_library(size):
+    documents = {}
+    for n in range(size):
+        text = make_document(n)
+        middle = len(text) // 2
+        documents[f"chapter_{n}.pdf"] = {"text": text[:middle] + fact(n) + text[middle:]}
+    return documents
+
+
+def run(index, queries, mode):
+    """(median seconds, queries whose chunks include their expected text, query embeddings)"""
+    embeddings = index.embeddings
+    calls_before = embeddings.calls
+    latencies = []
+    found = 0
+    for query, expected in queries:
+        start = time.perf_counter()
+        chunks = index.search(query, K, mode=mode)
+        latencies.append(time.perf_counter() - start)
+        found += expected is not None and any(expected in chunk.page_content for chunk in chunks)
+    return statistics.median(latencies), found, embeddings.calls - calls_before
+
+
+def main():
+    print(f"{'docs':>5} {'chunks':>7} {'queries':>8} {'mode':>7} {'median ms':>10} {'recall@5':>9} {'embedded':>9}")
+    for size in LIBRARY_SIZES:
+        embeddings = BowEmbeddings(dim=256)
+        index = IncrementalIndex(embeddings)
+        index.sync(make_library(size))
+        embeddings.latency = EMBEDDING_LATENCY
+
+        step = max(1, size // QUERIES)
+        exact = [(f"What is the {term(n)} constant?", term(n)) for n in range(0, size, step)][:QUERIES]
+        general = [(f"How does concept {i} relate to topic {i % 13}?", None) for i in range(QUERIES)]
+        for name, queries in [("exact", exact), ("general", general)]:
+            for mode in ["vector", "hybrid"]:
+                seconds, found, embedded = run(index, queries, mode)
+                recall = f"{found / len(queries):.0%}" if name == "exact" else "-"
+                print(f"{size:>5} {index.chunk_count:>7} {name:>8} {mode:>7} {seconds * 1000:>10.2f} "
+                      f"{recall:>9} {embedded:>5}/{len(queries):<3}")
+
+    index = IncrementalIndex(BowEmbeddings(dim=256))
+    with open(README, encoding="utf-8") as f:
+        index.add_document("README.md", f.read())
+    for question in NATURAL_QUESTIONS:
+        index.search(question, K)
+    print(f"\nREADME.md ({index.chunk_count} chunks), {len(NATURAL_QUESTIONS)} plain questions: "
+          f"{index.search_counts['hybrid']} hybrid, {index.search_counts['lexical']} lexical only")
+
+
+if __name__ == "__main__":
+    main()
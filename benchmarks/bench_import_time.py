@@ -0,0 +1,79 @@
+"""Import cost of opening each app's landing page in a fresh process.
+
+Run from the repository root:
+
+    python benchmarks/bench_import_time.py [--root CHECKOUT] [--repeat N]
+
+For every app, a new interpreter started with `-X importtime` runs the
+script once through Streamlit's AppTest with no documents loaded, which is
+what the first visitor after a server start pays. Modules that an empty
+Streamlit script also loads are subtracted, so the numbers are the app's own
+imports: how many modules, their total self time, and which of the heavy
+dependencies were pulled in. `--root` points at another checkout (e.g. a
+`git worktree` of an older commit) to get before/after numbers.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APPS = ["hackathon_ai_tool.py", "hackathon_ai_tool_rag.py", "hackathon_ai_tool_agent.py"]
+HEAVY = ["openai", "langchain_openai", "langchain.agents", "langchain.memory", "langchain.chains",
+         "faiss", "PyPDF2", "docx", "numpy"]
+
+RUNNER = """
+import os, sys
+sys.path.insert(0, {root!r})
+os.chdir({root!r})
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({script!r}, default_timeout=120) if {script!r} else AppTest.from_string("import streamlit as st")
+app.run()
+assert not app.exception, [e.value for e in app.exception]
+"""
+
+
+def import_times(root, script):
+    """{module: self microseconds} for one fresh AppTest run of `script`"""
+    env = dict(os.environ, OPENAI_API_KEY="sk-benchmark",
+               STUDYGEN_CACHE_DIR=tempfile.mkdtemp(prefix="studygen-import-"))
+    env.pop("STUDYGEN_DEBUG", None)
+    code = RUNNER.format(root=root, script=os.path.join(root, script) if script else "")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr[-2000:])
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root", default=ROOT, help="checkout to measure (default: this one)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per app; the median is reported")
+    args = parser.parse_args()
+    root = os.path.abspath(args.root)
+
+    harness = set(import_times(root, None))
+    print(f"App imports on a cold landing page ({root}, median of {args.repeat}):")
+    print(f"{'app':<28} {'modules':>8} {'import ms':>10}  heavy modules loaded")
+    for script in APPS:
+        runs = [
+            {name: us for name, us in import_times(root, script).items() if name not in harness}
+            for _ in range(args.repeat)
+        ]
+        total_ms = statistics.median(sum(run.values()) for run in runs) / 1000
+        heavy = [name for name in HEAVY if name in runs[0]]
+        print(f"{script:<28} {len(runs[0]):>8} {total_ms:>10.0f}  {', '.join(heavy) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Add/delete cost of the incremental index versus a full rebuild.
+
+Run from the repository root:
+
+    python benchmarks/bench_incremental_index.py
+
+For each library size the script times adding one more document and
+deleting one document, and counts how many chunks had to be embedded.
+The incremental columns should stay flat as the library grows while the
+full-rebuild column grows linearly.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_community.vectorstores import FAISS
+
+from fakes import FakeEmbeddings, make_document
+from vector_index import IncrementalIndex, make_text_splitter
+
+LIBRARY_SIZES = [5, 10, 20, 40]
+# Roughly what a remote embedding call costs per chunk
+PER_CHUNK_LATENCY = 0.002
+
+
+def full_rebuild(documents, embeddings):
+    all_text = ""
+    for filename, doc_data in documents.items():
+        all_text += f"\n\n=== {filename} ===\n{doc_data['text']}"
+    chunks = make_text_splitter().split_text(all_text)
+    return FAISS.from_texts(chunks, embeddings)
+
+
+def main():
+    print(f"{'docs':>5} {'add s':>8} {'add emb':>8} {'del s':>8} {'del emb':>8} {'rebuild s':>10} {'rebuild emb':>12}")
+    for size in LIBRARY_SIZES:
+        documents = {f"doc_{i}.pdf": {"text": make_document(i)} for i in range(size)}
+        embeddings = FakeEmbeddings(per_text_latency=PER_CHUNK_LATENCY)
+        index = IncrementalIndex(embeddings)
+        index.sync(documents)
+
+        embeddings.texts_embedded = 0
+        start = time.perf_counter()
+        index.add_document("new.pdf", make_document(size + 1))
+        add_time = time.perf_counter() - start
+        add_embedded = embeddings.texts_embedded
+
+        embeddings.texts_embedded = 0
+        start = time.perf_counter()
+        index.remove_document("doc_0.pdf")
+        delete_time = time.perf_counter() - start
+        delete_embedded = embeddings.texts_embedded
+
+        documents["new.pdf"] = {"text": make_document(size + 1)}
+        del documents["doc_0.pdf"]
+        embeddings.texts_embedded = 0
+        start = time.perf_counter()
+        full_rebuild(documents, embeddings)
+        rebuild_time = time.perf_counter() - start
+
+        print(f"{size:>5} {add_time:>8.3f} {add_embedded:>8} {delete_time:>8.4f} {delete_embedded:>8} "
+              f"{rebuild_time:>10.3f} {embeddings.texts_embedded:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Memory of many sessions opening the same library through the IndexRegistry.
+
+Run from the repository root:
+
+    python benchmarks/bench_index_registry.py [sessions]
+
+Every session uploads (or opens) its own copy of the same library, as the
+apps do, and acquires the shared index for it. Libraries are tried with
+plain documents and with the course and module metadata ingest.py and
+course libraries carry. The table shows how many of the sessions' document
+texts ended up as the registry's one shared copy, how many distinct text
+objects the sessions hold, and the registry's memory.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import FakeEmbeddings, make_document
+from index_registry import IndexRegistry
+from vector_index import IncrementalIndex, library_key
+
+DOCUMENTS = 8
+
+
+def library(metadata):
+    """A fresh copy of the library, with new text objects like a new upload"""
+    documents = {}
+    for i in range(DOCUMENTS):
+        doc_data = {"text": "".join(list(make_document(i, chars=8000)))}
+        if metadata:
+            doc_data.update(course="biology", module=f"week{i % 3 + 1}")
+        documents[f"week{i % 3 + 1}/doc_{i}.txt"] = doc_data
+    return documents
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"{sessions} sessions, {DOCUMENTS} documents each")
+    print(f"{'library':<10} {'texts shared':>14} {'text objects':>14} {'registry MB':>12}")
+    for label, metadata in [("plain", False), ("metadata", True)]:
+        registry = IndexRegistry()
+        embeddings = FakeEmbeddings()
+        held = []
+        for session in range(sessions):
+            documents = library(metadata)
+
+            def build():
+                index = IncrementalIndex(embeddings)
+                index.sync(documents)
+                return index
+
+            registry.acquire(f"session-{session}", library_key(documents), build, documents)
+            held.append(documents)
+        shared_copies = set(map(id, registry._texts.values()))
+        texts = [doc_data["text"] for documents in held for doc_data in documents.values()]
+        shared = sum(id(text) in shared_copies for text in texts)
+        print(f"{label:<10} {f'{shared}/{len(texts)}':>14} {len(set(map(id, texts))):>14} "
+              f"{registry.memory_bytes() / 1024 / 1024:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Cold-start cost of a persisted library index versus rebuilding it.
+
+Run from the repository root:
+
+    python benchmarks/bench_index_store.py
+
+Builds a library with simulated embedding latency, saves it, then measures
+opening it from disk (lazy) and answering the first similarity search.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("STUDYGEN_CACHE_DIR", tempfile.mkdtemp(prefix="studygen-bench-"))
+
+from fakes import FakeEmbeddings, make_document
+from index_store import load_index, save_index
+from vector_index import IncrementalIndex, library_key
+
+PER_CHUNK_LATENCY = 0.002
+
+
+def main():
+    for size in (10, 40, 160):
+        documents = {f"doc_{i}.pdf": {"text": make_document(i)} for i in range(size)}
+        embeddings = FakeEmbeddings(per_text_latency=PER_CHUNK_LATENCY)
+
+        start = time.perf_counter()
+        index = IncrementalIndex(embeddings)
+        index.sync(documents)
+        build_time = time.perf_counter() - start
+        save_index(index)
+
+        start = time.perf_counter()
+        loaded = load_index(library_key(documents), embeddings)
+        open_time = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded.store.similarity_search("concept 42", k=5)
+        first_query = time.perf_counter() - start
+
+        print(f"{size:>4} docs {index.chunk_count:>6} chunks: build {build_time:7.3f}s | "
+              f"open {open_time * 1000:6.2f}ms, first search {first_query * 1000:6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""LLM calls and latency per chat query: intent router vs. ReAct agent.
+
+Run from the repository root:
+
+    python benchmarks/bench_intent_router.py
+
+Sends the chat tab's example requests, and questions that mention a tool
+without asking for it, through the agent app's real
+CONVERSATIONAL_REACT_DESCRIPTION agent and through the local router. The
+LLM is scripted: it sleeps a fixed latency per call and picks the tool the
+router would pick, so both paths do the same tool work and differ only in
+the agent's own reasoning and answer calls.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.agents import AgentType, Tool, initialize_agent
+from langchain.memory import ConversationBufferMemory
+
+from intent_router import IntentRouter
+from streaming import LLMCallCounter
+
+from fakes import FakeLLM
+
+LLM_LATENCY = 0.2  # seconds per completion
+QUERIES = [
+    "Create study notes for Chapter 5",
+    "Make flashcards for biology terms",
+    "What is photosynthesis?",
+    "Generate a quiz on quantum mechanics",
+    "Explain the main concepts simply",
+    "Summarize the key takeaways",
+    "Explain that more simply",
+    "Thanks, that helps!",
+    # Questions about the material that mention a tool go to the agent
+    "Do my notes mention enzymes?",
+    "Is photosynthesis covered in the notes?",
+    "Quiz me on enzymes",
+]
+TOOL_DESCRIPTIONS = {
+    "Question Answering": "Answers specific questions from the study material with source references",
+    "Notes Generator": "Creates structured, comprehensive study notes on any topic from the material",
+    "Flashcard Creator": "Generates flashcards for active recall and memorization practice",
+    "Quiz Generator": "Creates multiple choice quizzes to test knowledge and understanding",
+}
+
+
+def scripted_reply(expected_tools):
+    """Reply to agent prompts in ReAct format and to tool prompts with filler text"""
+    def respond(prompt):
+        if "New input:" not in prompt:
+            return "Generated study material."
+        new_input = prompt.split("New input:")[-1]
+        if "Observation:" in new_input:
+            return "Do I need to use a tool? No\nAI: Here is what I found."
+        tool = expected_tools.get(new_input.strip().splitlines()[0].strip())
+        if tool is None:
+            return "Do I need to use a tool? No\nAI: Happy to help."
+        return f"Do I need to use a tool? Yes\nAction: {tool}\nAction Input: the requested topic"
+    return respond
+
+
+def main():
+    expected_tools = {}
+    llm = FakeLLM(respond=scripted_reply(expected_tools), latency=LLM_LATENCY)
+
+    def make_tool(name, description):
+        return Tool(name=name, description=description,
+                    func=lambda topic, callbacks=None: llm.invoke(f"{name}: {topic}", config={"callbacks": callbacks}))
+
+    tools = [make_tool(name, description) for name, description in TOOL_DESCRIPTIONS.items()]
+    router = IntentRouter(tools)
+    routes = {query: router.route(query) for query in QUERIES}
+    expected_tools.update({query: route.tool.name for query, route in routes.items() if route})
+
+    agent = initialize_agent(
+        tools=tools,
+        llm=llm,
+        agent=AgentType.CONVERSATIONAL_REACT_DESCRIPTION,
+        memory=ConversationBufferMemory(memory_key="chat_history"),
+        verbose=False,
+        handle_parsing_errors=True,
+    )
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        for query in QUERIES:
+            router.route(query)
+    route_us = (time.perf_counter() - started) / (1000 * len(QUERIES)) * 1e6
+    print(f"Routing decision: {route_us:.0f} µs per query\n")
+
+    print(f"{'query':<40} {'routed to':<20} {'topic':<20} {'agent':>14} {'router':>14}")
+    totals = {"agent": [0, 0.0], "router": [0, 0.0]}
+    for query in QUERIES:
+        counter = LLMCallCounter()
+        agent.run(query, callbacks=[counter])
+        agent_cost = (counter.calls, counter.elapsed)
+
+        route = routes[query]
+        if route:
+            counter = LLMCallCounter()
+            route.tool.func(route.tool_input, callbacks=[counter])
+            router_cost = (counter.calls, counter.elapsed)
+        else:
+            router_cost = agent_cost  # falls back to the agent
+
+        for path, (calls, seconds) in (("agent", agent_cost), ("router", router_cost)):
+            totals[path][0] += calls
+            totals[path][1] += seconds
+        topic = route.tool_input if route and route.tool.name != "Question Answering" else ""
+        print(f"{query:<40} {route.tool.name if route else '(agent)':<20} {topic[:20]:<20} "
+              f"{agent_cost[0]:>3} / {agent_cost[1]:>5.2f}s {router_cost[0]:>5} / {router_cost[1]:>5.2f}s")
+
+    saved_calls = totals["agent"][0] - totals["router"][0]
+    saved_seconds = totals["agent"][1] - totals["router"][1]
+    print(f"\nTotal: agent {totals['agent'][0]} calls / {totals['agent'][1]:.2f}s, "
+          f"with router {totals['router'][0]} calls / {totals['router'][1]:.2f}s "
+          f"(saved {saved_calls} calls, {saved_seconds:.2f}s over {len(QUERIES)} queries)")
+
+
+if __name__ == "__main__":
+    main()
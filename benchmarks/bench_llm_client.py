@@ -0,0 +1,112 @@
+"""Classroom load against a rate-limited API: the shared client versus the SDK's defaults.
+
+Run from the repository root:
+
+    python benchmarks/bench_llm_client.py [students]
+
+The local OpenAI stand-in (fake_openai.FakeOpenAIServer) answers at most
+REQUESTS_PER_SECOND requests in any second and 429s the rest, like an
+account's rate limit. Every student starts at once: each generates notes
+for one of a few shared modules (so many prompts are identical) and asks
+one question of their own.
+
+"sdk default" is openai.OpenAI as the apps made it before: its own
+httpx pool and two retries. "shared client" sends through
+llm_client.pooled_transport, which learns the limit from the server's
+x-ratelimit-limit-requests header. The table shows the calls that failed
+for the user, the 429s the server sent, the requests that reached it and
+the latency of a call as the student sees it.
+
+A second table checks that learned limits keep queueing: for common tiers
+(whose per-minute rates do not survive a float round trip), the requests
+bucket is overdrawn and the same x-ratelimit headers are learned again, as
+they are on every response. The seconds still owed must not drop.
+"""
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openai
+
+import engine
+from fake_openai import FakeOpenAIServer
+from llm_client import ModelLimits, make_http_client, pooled_transport
+
+REQUESTS_PER_SECOND = 10
+MODULES = 4
+SERVER = {"latency": 0.3, "tokens_per_second": 2000, "requests_per_second": REQUESTS_PER_SECOND}
+# (requests, tokens) per minute of common account tiers
+TIERS = [(500, 2_000_000), (3_500, 1_000_000), (10_000, 2_000_000)]
+OVERDRAWN_REQUESTS = 30
+
+
+def classroom(students):
+    """One notes prompt (shared by every student on the same module) and one own question per student"""
+    prompts = []
+    for student in range(students):
+        prompts.append(engine.notes_prompt(f"Module {student % MODULES}: how cells make energy from glucose."))
+        prompts.append(engine.question_prompt(f"Module {student % MODULES} material.", f"Student {student}: why?"))
+    return prompts
+
+
+def run(client, prompts):
+    """(failures, [seconds per successful call], wall seconds)"""
+    def call(prompt):
+        start = time.perf_counter()
+        try:
+            engine.complete(client, prompt)
+        except openai.APIError:
+            return None
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+        results = list(pool.map(call, prompts))
+    seconds = [result for result in results if result is not None]
+    return len(results) - len(seconds), seconds, time.perf_counter() - start
+
+
+def relearned_wait(requests, tokens):
+    """(seconds owed after overdrawing the requests bucket, seconds owed once the same limits are learned again)"""
+    limits = ModelLimits({})
+    headers = {"x-ratelimit-limit-requests": str(requests), "x-ratelimit-limit-tokens": str(tokens)}
+    limits.learn(engine.CHAT_MODEL, headers)
+    requests_bucket = limits.buckets(engine.CHAT_MODEL)[0]
+    for _ in range(int(requests_bucket.capacity) + OVERDRAWN_REQUESTS):
+        requests_bucket.reserve(1)
+    owed = requests_bucket.reserve(0)
+    limits.learn(engine.CHAT_MODEL, headers)
+    return owed, limits.buckets(engine.CHAT_MODEL)[0].reserve(0)
+
+
+def main():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    prompts = classroom(students)
+    print(f"{students} students, {len(prompts)} calls, server limit {REQUESTS_PER_SECOND} requests/s")
+    print(f"{'client':<16} {'failed':>7} {'429s':>6} {'sent':>6} {'p50 s':>7} {'p95 s':>7} {'wall s':>7}")
+    for label in ["sdk default", "shared client"]:
+        with FakeOpenAIServer(**SERVER) as server:
+            if label == "sdk default":
+                client = openai.OpenAI(api_key="sk-benchmark", base_url=server.base_url)
+            else:
+                client = openai.OpenAI(api_key="sk-benchmark", base_url=server.base_url, max_retries=0,
+                                       http_client=make_http_client(pooled_transport()))
+            failed, seconds, wall = run(client, prompts)
+            p50 = statistics.median(seconds) if seconds else 0
+            p95 = statistics.quantiles(seconds, n=20)[-1] if len(seconds) > 1 else p50
+            print(f"{label:<16} {failed:>7} {server.stats['rate_limited']:>6} "
+                  f"{server.stats['chat_requests'] + server.stats['rate_limited']:>6} "
+                  f"{p50:>7.2f} {p95:>7.2f} {wall:>7.2f}")
+
+    print(f"\n{'limits (rpm/tpm)':<20} {'owed s':>8} {'relearned s':>12}")
+    for requests, tokens in TIERS:
+        owed, relearned = relearned_wait(requests, tokens)
+        print(f"{f'{requests:,}/{tokens:,}':<20} {owed:>8.2f} {relearned:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
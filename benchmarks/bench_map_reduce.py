@@ -0,0 +1,71 @@
+"""Map-reduce notes over a whole book: throughput by concurrency, and coverage.
+
+Run from the repository root:
+
+    python benchmarks/bench_map_reduce.py [pages ...]
+
+A generated book is turned into study notes the way the Tool app's Studio
+does it, against the local OpenAI stand-in (fake_openai.FakeOpenAIServer)
+with fixed per-request latency and token rates and the real openai
+client: map_reduce.condense summarizes every part of the book and merges
+the summaries, then one notes prompt is sent.
+
+For each concurrency limit the table shows the completion calls, the
+wall time and the speedup over one call at a time. "coverage" is the
+share of the book's tokens the notes were generated from; the first row
+is the retrieval the Studio used before (the chunks most relevant to the
+notes query, packed into the prompt budget), for comparison.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+
+import engine
+from context_pack import count_tokens, pack_context
+from fake_openai import FakeOpenAIServer, bow_vector
+from fakes import make_document
+from map_reduce import condense
+
+CHARS_PER_PAGE = 3000
+CONCURRENCY = [1, 2, 4, 8, 16]
+NOTES_QUERY = "main topics, key concepts, definitions and important facts"
+SERVER = {"latency": 0.1, "tokens_per_second": 1000, "prefill_tokens_per_second": 50000}
+
+
+def run(book, client, server, concurrency):
+    """(calls, seconds) to generate notes from all of `book`"""
+    before = server.stats["chat_requests"]
+    start = time.perf_counter()
+    complete = lambda prompt: engine.complete(client, prompt)
+    digest = condense(book, engine.part_notes_prompt, engine.merge_notes_prompt, complete,
+                      concurrency=concurrency)
+    complete(engine.notes_prompt(digest))
+    return server.stats["chat_requests"] - before, time.perf_counter() - start
+
+
+def main():
+    pages_list = [int(arg) for arg in sys.argv[1:]] or [60, 240]
+    with FakeOpenAIServer(**SERVER) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        client = engine.make_client()
+        print(f"{'pages':>6} {'mode':<16} {'calls':>7} {'seconds':>9} {'speedup':>9} {'coverage':>9}")
+        for pages in pages_list:
+            book = make_document(pages, chars=pages * CHARS_PER_PAGE)
+            tokens = count_tokens(book)
+            embed = lambda texts: [bow_vector(text) for text in texts]
+            context, _ = pack_context(book, NOTES_QUERY, embed)
+            print(f"{pages:>6} {'retrieval':<16} {1:>7} {'':>9} {'':>9} {count_tokens(context) / tokens:>9.1%}")
+            baseline = None
+            for concurrency in CONCURRENCY:
+                calls, seconds = run(book, client, server, concurrency)
+                baseline = baseline or seconds
+                print(f"{pages:>6} {f'map-reduce x{concurrency}':<16} {calls:>7} {seconds:>9.2f} "
+                      f"{baseline / seconds:>8.1f}x {1:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
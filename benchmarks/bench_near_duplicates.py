@@ -0,0 +1,142 @@
+"""Near-duplicate elimination and MMR on a course with overlapping uploads.
+
+Run from the repository root:
+
+    python benchmarks/bench_near_duplicates.py [lectures]
+
+Each generated lecture comes as the students upload it: the lecture notes,
+the same notes exported again (different line wrapping), a handout in two
+versions (v2 has a few percent of its words edited) and the lecture's
+slides, whose bullets are some of the notes' paragraphs with a title
+slide added. The course is indexed with STUDYGEN_DEDUPLICATE off and on,
+and the table shows the chunks stored (every chunk is, either way) and the
+chunks embedded (texts sent to the embedding API; the rest reuse a near
+duplicate's vector).
+
+For a fixed set of questions, the k=5 chunks a RetrievalQA prompt stuffs
+in are then compared: "redundant" is the tokens of chunks that nearly
+duplicate one ranked above them in the same prompt, and "distinct" the
+number of different passages the prompt covers, with and without maximal
+marginal relevance (diversity 0.3).
+"""
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import near_duplicates
+from context_pack import count_tokens
+from fakes import BowEmbeddings
+from near_duplicates import DUPLICATE_THRESHOLD, signature, similarity
+from vector_index import IncrementalIndex, document_metadata
+
+K = 5
+DIVERSITY = 0.3
+PARAGRAPHS = 24
+WORDS = (
+    "membrane transport ions nutrients mitochondria respiration energy oxidative phosphorylation enzyme "
+    "catalysis activation photosynthesis light glucose gradient synthesis adenosine triphosphate organism "
+    "chromosome genetic transcription translation protein ribosome nucleus cytoplasm vesicle receptor "
+    "signal pathway kinase hormone insulin osmosis diffusion channel pump sodium potassium calcium"
+).split()
+FILLER = "the of and in a to is by which with that from as for".split()
+
+
+def paragraph(rng, lecture):
+    words = []
+    for _ in range(rng.randint(50, 90)):
+        words.append(rng.choice(WORDS) if rng.random() < 0.6 else rng.choice(FILLER))
+    return f"Lecture {lecture}: " + " ".join(words) + "."
+
+
+def wrap(text, width):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    return "\n".join(lines + [line])
+
+
+def edit(rng, text, share):
+    words = text.split(" ")
+    for i in rng.sample(range(len(words)), int(share * len(words))):
+        words[i] = rng.choice(WORDS)
+    return " ".join(words)
+
+
+def course(lectures):
+    """{filename: {"text", "course", "module"}} for a course with overlapping uploads"""
+    rng = random.Random(7)
+    files = {}
+    for lecture in range(1, lectures + 1):
+        notes = [paragraph(rng, lecture) for _ in range(PARAGRAPHS)]
+        handout = [paragraph(rng, lecture) for _ in range(PARAGRAPHS // 2)]
+        versions = {
+            "notes.txt": "\n\n".join(wrap(p, 90) for p in notes),
+            "notes (exported).txt": "\n\n".join(wrap(p, 72) for p in notes),
+            "handout_v1.txt": "\n\n".join(handout),
+            "handout_v2.txt": "\n\n".join(edit(rng, p, 0.03) for p in handout),
+            "slides.txt": "\n\n".join([f"Lecture {lecture}\nSlides"] + rng.sample(notes, PARAGRAPHS // 2)),
+        }
+        for name, text in versions.items():
+            files[f"week{lecture}/{name}"] = {"text": text, "course": "biology", "module": f"week{lecture}"}
+    return files
+
+
+def redundancy(chunks):
+    """(tokens of chunks nearly duplicating one above them, number of distinct passages)"""
+    kept, redundant = [], 0
+    for chunk in chunks:
+        sig = signature(chunk)
+        if any(similarity(sig, other) >= DUPLICATE_THRESHOLD for other in kept):
+            redundant += count_tokens(chunk)
+        else:
+            kept.append(sig)
+    return redundant, len(kept)
+
+
+def measure(files, questions, deduplicate):
+    near_duplicates.DEDUPLICATE = deduplicate
+    embeddings = BowEmbeddings(dim=256)
+    index = IncrementalIndex(embeddings)
+    for filename, doc_data in files.items():
+        index.add_document(filename, doc_data["text"], document_metadata(doc_data))
+    result = {"chunks stored": index.chunk_count, "chunks embedded": embeddings.texts_embedded}
+    for label, diversity in [("", 0), (" mmr", DIVERSITY)]:
+        retrieved = [
+            [doc.page_content for doc in index.search(q, K, mode="vector", diversity=diversity)] for q in questions
+        ]
+        scores = [redundancy(chunks) for chunks in retrieved]
+        result[f"redundant{label}"] = statistics.mean(score[0] for score in scores)
+        result[f"distinct{label}"] = statistics.mean(score[1] for score in scores)
+    return result
+
+
+def main():
+    lectures = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    files = course(lectures)
+    rng = random.Random(11)
+    questions = [f"How does {rng.choice(WORDS)} relate to {rng.choice(WORDS)} and {rng.choice(WORDS)}?"
+                 for _ in range(40)]
+    columns = ["chunks stored", "chunks embedded", "redundant", "distinct", "redundant mmr", "distinct mmr"]
+    print(f"{lectures} lectures, {len(files)} files")
+    print(f"{'deduplicate':<12}" + "".join(f"{name:>16}" for name in columns))
+    results = {}
+    for deduplicate in [False, True]:
+        results[deduplicate] = measure(files, questions, deduplicate)
+        print(f"{'on' if deduplicate else 'off':<12}" + "".join(
+            f"{results[deduplicate][name]:>16,.1f}" for name in columns
+        ))
+    before, after = results[False], results[True]
+    print(f"{'change':<12}" + "".join(
+        f"{(after[name] - before[name]) / before[name]:>16.1%}" if before[name] else f"{'':>16}" for name in columns
+    ))
+
+
+if __name__ == "__main__":
+    main()
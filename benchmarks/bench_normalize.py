@@ -0,0 +1,125 @@
+"""Token savings of ingest normalization on generated sample textbooks.
+
+Run from the repository root:
+
+    python benchmarks/bench_normalize.py [pages]
+
+Three textbook layouts are generated as PDFs, each with the noise real
+extractions carry: a running header (alternating on even and odd pages in
+one of them), a footer or page number, words hyphenated across line
+breaks and doubled spaces. "raw" reads and chunks each one as before
+normalization (page markers and all); "normal" uses the current readers
+and IncrementalIndex's splitting. The table shows the document tokens, the
+chunks (texts sent to the embedding API), the tokens embedded, and, for
+the k=5 chunks a RetrievalQA prompt stuffs in (averaged over a fixed set
+of questions), their tokens and how many of those are boilerplate: page
+markers, headers, footers, split words and extra whitespace.
+"""
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_community.vectorstores import FAISS
+
+from bench_pdf_extract import make_pdf
+from context_pack import count_tokens
+from engine import read_pdf
+from fakes import BowEmbeddings
+from pdf_extract import iter_pdf_pages
+from text_normalize import boilerplate_keys, line_key, normalize_text
+from vector_index import PAGE_MARKER, IncrementalIndex, make_text_splitter
+
+LINE_CHARS = 90
+LINES_PER_PAGE = 46
+K = 5
+WORDS = (
+    "the cell membrane controls transport of ions and nutrients while mitochondrial respiration "
+    "produces energy through oxidative phosphorylation enzymes catalyse reactions by lowering "
+    "activation energy and photosynthesis converts light into chemical energy stored in glucose "
+    "electrochemical gradients drive synthesis of adenosine triphosphate in every living organism "
+    "chromosomes carry genetic information that transcription and translation express as proteins"
+).split()
+# Fixed questions built from the textbook vocabulary
+QUESTIONS = [f"How does {WORDS[i * 7 % len(WORDS)]} affect {WORDS[i * 11 % len(WORDS)]}?" for i in range(40)]
+
+
+def body_lines(rng, count):
+    """Justified-looking body text, hyphenating long words at line ends"""
+    lines, line = [], ""
+    while len(lines) < count:
+        if rng.random() < 0.04 and line:
+            lines.extend([line, ""])  # paragraph break
+            line = ""
+            continue
+        word = rng.choice(WORDS)
+        if len(line) + len(word) + 1 <= LINE_CHARS:
+            line = f"{line}{'  ' if rng.random() < 0.1 else ' '}{word}".strip()
+        elif len(word) > 8 and LINE_CHARS - len(line) > 5:
+            cut = min(len(word) - 3, LINE_CHARS - len(line) - 2)
+            lines.append(f"{line} {word[:cut]}-")
+            line = word[cut:]
+        else:
+            lines.append(line)
+            line = word
+    return lines[:count]
+
+
+def textbook(layout, pages):
+    rng = random.Random(layout)
+
+    def page_lines(p):
+        number = p + 1
+        body = body_lines(rng, LINES_PER_PAGE)
+        if layout == "cell-biology":
+            return [f"Introduction to Cell Biology        Chapter {p // 20 + 1}", ""] + body + ["", str(number)]
+        if layout == "chemistry":
+            header = f"{number}    ORGANIC CHEMISTRY" if number % 2 == 0 else f"Reactions of Alkenes    {number}"
+            return [header, ""] + body + ["", "© 2024 Example Press. All rights reserved."]
+        return body + ["", f"Page {number} of {pages}"]
+
+    return make_pdf(pages, page_lines=page_lines)
+
+
+def boilerplate_tokens(chunk, keys):
+    """Tokens of `chunk` that normalization would remove"""
+    lines = [line for line in PAGE_MARKER.sub("", chunk).split("\n") if line_key(line) not in keys]
+    return count_tokens(chunk) - count_tokens(normalize_text("\n".join(lines)))
+
+
+def measure(data, normalize):
+    text = read_pdf(data, normalize=normalize)
+    if normalize:
+        chunks = IncrementalIndex(None).split_document("textbook.pdf", text)
+    else:
+        chunks = make_text_splitter().split_text(f"=== textbook.pdf ===\n{text}")
+    store = FAISS.from_texts(chunks, BowEmbeddings(dim=256))
+    keys = boilerplate_keys([page.text.split("\n") for page in iter_pdf_pages(data)])
+    retrieved = [[doc.page_content for doc in store.similarity_search(question, k=K)] for question in QUESTIONS]
+    return {
+        "document tokens": count_tokens(text),
+        "chunks": len(chunks),
+        "embedded tokens": sum(count_tokens(chunk) for chunk in chunks),
+        "prompt tokens": statistics.mean(sum(count_tokens(chunk) for chunk in chunks) for chunks in retrieved),
+        "boilerplate": statistics.mean(sum(boilerplate_tokens(chunk, keys) for chunk in chunks) for chunks in retrieved),
+    }
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    columns = ["document tokens", "chunks", "embedded tokens", "prompt tokens", "boilerplate"]
+    print(f"{'textbook':<14} {'':<6}" + "".join(f"{name:>17}" for name in columns))
+    for layout in ["cell-biology", "chemistry", "lecture-notes"]:
+        data = textbook(layout, pages)
+        before, after = measure(data, normalize=False), measure(data, normalize=True)
+        for label, result in [("raw", before), ("normal", after)]:
+            print(f"{layout:<14} {label:<6}" + "".join(f"{result[name]:>17,.0f}" for name in columns))
+        print(f"{'':<14} {'change':<6}" + "".join(
+            f"{(after[name] - before[name]) / before[name]:>17.1%}" if before[name] else f"{'':>17}" for name in columns
+        ))
+
+
+if __name__ == "__main__":
+    main()
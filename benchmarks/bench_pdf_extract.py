@@ -0,0 +1,98 @@
+"""PDF extraction throughput on a generated 1,000-page textbook.
+
+Run from the repository root:
+
+    python benchmarks/bench_pdf_extract.py [pages]
+
+Compares the original single-threaded `text +=` loop with the shared
+parallel extractor, and reports the peak number of pages held in memory
+by the streaming generator.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyPDF2 import PdfReader
+
+from pdf_extract import PAGES_PER_TASK, iter_pdf_pages
+
+
+def pdf_string(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages, lines_per_page=40, page_lines=None):
+    """Build a minimal text-only PDF in memory; `page_lines(page index)` supplies each page's lines"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for p in range(pages):
+        if page_lines is None:
+            lines = [f"BT /F1 10 Tf 50 {780 - 18 * i} Td (Page {p + 1} line {i}: the mitochondria is the powerhouse of the cell) Tj ET"
+                     for i in range(lines_per_page)]
+        else:
+            lines = [f"BT /F1 10 Tf 50 {780 - 14 * i} Td ({pdf_string(line)}) Tj ET" for i, line in enumerate(page_lines(p))]
+        stream = "\n".join(lines).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % ref for ref in page_refs)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def baseline(data):
+    import io
+    pdf = PdfReader(io.BytesIO(data))
+    text = ""
+    for page in pdf.pages:
+        text += page.extract_text()
+    return text
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    data = make_pdf(pages)
+    print(f"{os.cpu_count()} CPUs; generated {pages}-page PDF ({len(data) / 1e6:.1f} MB)")
+
+    start = time.perf_counter()
+    baseline_chars = len(baseline(data))
+    baseline_time = time.perf_counter() - start
+    print(f"baseline serial   : {baseline_time:7.2f}s  {pages / baseline_time:7.1f} pages/s  {baseline_chars:,} chars")
+
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        chars = 0
+        last = 0
+        for page in iter_pdf_pages(data, workers=workers):
+            assert page.number == last + 1
+            last = page.number
+            chars += len(page.text)
+        elapsed = time.perf_counter() - start
+        in_flight = workers * 2 * PAGES_PER_TASK if workers > 1 else 1
+        print(f"parallel {workers:>2} proc: {elapsed:7.2f}s  {pages / elapsed:7.1f} pages/s  {chars:,} chars  "
+              f"<= {in_flight} pages in flight")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Rerun latency of the agent app with and without the cached assistant.
+
+Run from the repository root:
+
+    python benchmarks/bench_rerun_latency.py
+
+Drives hackathon_ai_tool_agent.py with Streamlit's AppTest on an in-memory
+library (fake embeddings, no network) and times reruns that only flip a
+flashcard. The "rebuild" column clears the cached agent before each rerun,
+which reproduces the old behaviour of rebuilding the retriever, chains,
+tools and agent on every script run.
+"""
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from streamlit.testing.v1 import AppTest
+
+from vector_index import IncrementalIndex
+
+from fakes import FakeEmbeddings, make_document
+
+RERUNS = 30
+
+
+def open_app():
+    app = AppTest.from_file(os.path.join(ROOT, "hackathon_ai_tool_agent.py"), default_timeout=60)
+    app.run()
+    documents = {f"doc{i}.txt": {"text": make_document(i, 20000), "upload_time": "", "size": 20000, "type": "TXT"}
+                 for i in range(5)}
+    index = IncrementalIndex(FakeEmbeddings())
+    index.sync(documents)
+    app.session_state["documents"] = documents
+    app.session_state["vectorstore"] = index
+    app.session_state["current_tab"] = "flashcards"
+    app.session_state["current_flashcards"] = [
+        {"question": f"Question {i}?", "answer": f"Answer {i}."} for i in range(10)
+    ]
+    app.run()
+    assert not app.exception, [e.value for e in app.exception]
+    return app
+
+
+def time_reruns(app, rebuild):
+    timings = []
+    for _ in range(RERUNS):
+        if rebuild:
+            app.session_state["assistant"] = None
+        flip = next(b for b in app.button if b.label in ("👁️ Show Answer", "🙈 Hide Answer"))
+        flip.click()
+        started = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    app = open_app()
+    cached = time_reruns(app, rebuild=False)
+    rebuilt = time_reruns(app, rebuild=True)
+
+    print(f"Flashcard flip rerun, median of {RERUNS} (AppTest overhead included):")
+    print(f"  rebuild every rerun: {statistics.median(rebuilt) * 1000:7.1f} ms")
+    print(f"  cached assistant:    {statistics.median(cached) * 1000:7.1f} ms")
+    print(f"  saved per rerun:     {(statistics.median(rebuilt) - statistics.median(cached)) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
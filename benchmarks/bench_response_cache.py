@@ -0,0 +1,81 @@
+"""Repeated Studio generations with and without the persistent response cache.
+
+Run from the repository root:
+
+    python benchmarks/bench_response_cache.py [sessions]
+
+A class of sessions opens the same module and each clicks Generate Notes,
+Mindmap, Quiz and Flashcards, then clicks Notes and Quiz once more; half
+way through, the server "restarts" (the cache is reopened from disk). The
+completions go to the local OpenAI stand-in (fake_openai.FakeOpenAIServer)
+with fixed latency and token rates. The table shows the completion calls,
+the completion tokens generated and the median seconds per click, with the
+cache off and on, and the time a cache hit takes.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+
+import engine
+from context_pack import CONTEXT_TOKEN_BUDGET, chunk_text, text_hash
+from fake_openai import FakeOpenAIServer
+from fakes import make_document
+from map_reduce import group_texts
+from response_cache import open_response_cache
+
+SERVER = {"latency": 0.2, "tokens_per_second": 500, "prefill_tokens_per_second": 50000}
+CLICKS = [engine.notes_prompt, engine.mindmap_prompt, engine.quiz_prompt, engine.flashcards_prompt,
+          engine.notes_prompt, engine.quiz_prompt]
+
+
+def run(sessions, client, server, cached):
+    text = group_texts(chunk_text(make_document(7, chars=40000)), CONTEXT_TOKEN_BUDGET)[0]
+    source = text_hash(text)
+    path = os.path.join(tempfile.mkdtemp(), "responses.sqlite3")
+    cache = open_response_cache(path)
+    before = dict(server.stats)
+    seconds, hits = [], []
+    for session in range(sessions):
+        if session == sessions // 2:
+            cache = open_response_cache(path)  # restart: only the disk survives
+        for build_prompt in CLICKS:
+            prompt = build_prompt(text)
+            start = time.perf_counter()
+            if cached:
+                hit = cache.lookup(engine.CHAT_MODEL, prompt, source) is not None
+                cache.get_or_generate(engine.CHAT_MODEL, prompt, source, lambda: engine.complete(client, prompt))
+            else:
+                hit = False
+                engine.complete(client, prompt)
+            (hits if hit else seconds).append(time.perf_counter() - start)
+    return {
+        "calls": server.stats["chat_requests"] - before.get("chat_requests", 0),
+        "tokens out": server.stats["completion_tokens"] - before.get("completion_tokens", 0),
+        "median s": statistics.median(seconds + hits),
+        "hit ms": 1000 * statistics.median(hits) if hits else 0,
+    }
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    columns = ["calls", "tokens out", "median s", "hit ms"]
+    print(f"{sessions} sessions x {len(CLICKS)} clicks on one module")
+    print(f"{'cache':<6}" + "".join(f"{name:>12}" for name in columns))
+    with FakeOpenAIServer(**SERVER) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        client = engine.make_client()
+        for cached in [False, True]:
+            result = run(sessions, client, server, cached)
+            print(f"{'on' if cached else 'off':<6}" + "".join(
+                f"{result[name]:>12,}" if isinstance(result[name], int) else f"{result[name]:>12,.2f}" for name in columns
+            ))
+
+
+if __name__ == "__main__":
+    main()
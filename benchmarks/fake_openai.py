@@ -0,0 +1,254 @@
+"""Local stand-in for the OpenAI API, for offline benchmarks.
+
+FakeOpenAIServer speaks enough of the chat completions (streaming and not)
+and embeddings endpoints for the openai client and langchain-openai. Its
+timing is configurable: every request waits `latency` seconds, prompts are
+"read" at `prefill_tokens_per_second`, and completions are produced at
+`tokens_per_second`, streamed in roughly one-token chunks. Embeddings are
+deterministic bag-of-words vectors, so texts that share words are similar
+and retrieval behaves sensibly. Completions are canned replies picked by
+prompt pattern, covering every prompt the three apps send. With
+`requests_per_second` set, requests beyond that many in any second are
+answered 429 with a Retry-After, and responses report the limit in
+x-ratelimit-limit-requests, like the real API's rate limits.
+
+    with FakeOpenAIServer(latency=0.2, tokens_per_second=50) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+"""
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+
+FLASHCARDS = "".join(
+    f"**Card {i}:**\nQ: What does concept {i} describe?\nA: Concept {i} describes how topic {i % 5} works.\n\n"
+    for i in range(1, 11)
+)
+QUIZ = "".join(
+    f"**Question {i}:** Which statement about concept {i} is correct?\n"
+    f"A) It is unrelated\nB) It explains topic {i % 5}\nC) It is deprecated\nD) None of these\n"
+    f"**Correct Answer:** B - Concept {i} explains topic {i % 5}.\n\n"
+    for i in range(1, 9)
+)
+QUIZ_JSON = json.dumps([
+    {"question": f"Which statement about concept {i} is correct?",
+     "options": ["It is unrelated", f"It explains topic {i}", "It is deprecated", "None of these"],
+     "answer": f"It explains topic {i}"}
+    for i in range(1, 6)
+])
+QA_FLASHCARDS = "".join(f"Q: What is concept {i}?\nA: The idea behind topic {i}.\n" for i in range(1, 6))
+MINDMAP = 'digraph G {\n  "Topic" -> "Concept 1";\n  "Topic" -> "Concept 2";\n  "Concept 1" -> "Detail";\n}'
+NOTES = (
+    "## Study Notes\n\n### Key Concepts:\n"
+    + "".join(f"- Concept {i}: how topic {i % 5} relates to the rest of the material.\n" for i in range(1, 13))
+    + "\n### Summary:\nThe material builds each topic on the previous one.\n"
+)
+SUMMARY = "The student asked about several concepts and received explanations of each."
+AGENT_ANSWER = "Do I need to use a tool? No\nAI: The material explains this concept step by step."
+
+# (pattern, reply) pairs; the first pattern found in the lower-cased prompt wins
+DEFAULT_REPLIES = [
+    ("progressively summarize", SUMMARY),
+    ("do i need to use a tool", AGENT_ANSWER),
+    ("**card x:**", FLASHCARDS),
+    ("flashcards as q&a", QA_FLASHCARDS),
+    ("q&a style flashcards", QA_FLASHCARDS),
+    ("**question x:**", QUIZ),
+    ("mcqs in json", QUIZ_JSON),
+    ("multiple-choice", QUIZ),
+    ("digraph", MINDMAP),
+    ("notes", NOTES),
+]
+DEFAULT_REPLY = "Based on the material, the answer is that each concept builds on the previous topic."
+
+
+def bow_vector(text, dim=256):
+    """Deterministic unit vector from hashed word counts"""
+    vector = [0.0] * dim
+    for word, count in Counter(re.findall(r"\w+", text.lower())).items():
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[index] += sign * count
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class FakeOpenAIServer:
+    """Threaded HTTP server answering /v1/chat/completions and /v1/embeddings"""
+
+    def __init__(self, latency=0.0, tokens_per_second=None, prefill_tokens_per_second=None,
+                 embedding_latency=0.0, embedding_dim=256, replies=None, requests_per_second=None, port=0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.embedding_latency = embedding_latency
+        self.embedding_dim = embedding_dim
+        self.replies = DEFAULT_REPLIES if replies is None else replies
+        self.requests_per_second = requests_per_second
+        self.stats = Counter()
+        self._recent = deque()  # start times of the requests in the last second
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, **fields):
+        with self._lock:
+            self.stats.update(fields)
+
+    def retry_after(self):
+        """0 if a request may start now, else the seconds until one may"""
+        if not self.requests_per_second:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 1:
+                self._recent.popleft()
+            if len(self._recent) >= self.requests_per_second:
+                self.stats["rate_limited"] += 1
+                return 1 - (now - self._recent[0])
+            self._recent.append(now)
+            return 0
+
+    def reply_for(self, prompt):
+        lowered = prompt.lower()
+        for pattern, reply in self.replies:
+            if pattern in lowered:
+                return reply
+        return DEFAULT_REPLY
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                wait = server.retry_after()
+                if wait:
+                    self.send_json({"error": {"message": "Rate limit reached", "type": "requests",
+                                              "code": "rate_limit_exceeded"}},
+                                   status=429, headers={"retry-after-ms": str(int(wait * 1000))})
+                elif self.path.endswith("/embeddings"):
+                    self.embeddings(body)
+                elif self.path.endswith("/chat/completions"):
+                    self.chat(body)
+                else:
+                    self.send_error(404)
+
+            def embeddings(self, body):
+                texts = body["input"]
+                texts = [texts] if isinstance(texts, str) else texts
+                texts = [text if isinstance(text, str) else " ".join(map(str, text)) for text in texts]
+                tokens = sum(estimate_tokens(text) for text in texts)
+                server.count(embedding_requests=1, embedding_texts=len(texts), embedding_tokens=tokens)
+                time.sleep(server.embedding_latency)
+                self.send_json({
+                    "object": "list",
+                    "model": body.get("model", ""),
+                    "data": [
+                        {"object": "embedding", "index": i, "embedding": bow_vector(text, server.embedding_dim)}
+                        for i, text in enumerate(texts)
+                    ],
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                })
+
+            def chat(self, body):
+                prompt = "\n".join(
+                    message["content"] if isinstance(message["content"], str) else json.dumps(message["content"])
+                    for message in body["messages"]
+                )
+                reply = server.reply_for(prompt)
+                usage = {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(reply)}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                server.count(chat_requests=1, prompt_tokens=usage["prompt_tokens"],
+                             completion_tokens=usage["completion_tokens"])
+
+                delay = server.latency
+                if server.prefill_tokens_per_second:
+                    delay += usage["prompt_tokens"] / server.prefill_tokens_per_second
+                time.sleep(delay)
+
+                base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body.get("model", "")}
+                if not body.get("stream"):
+                    if server.tokens_per_second:
+                        time.sleep(usage["completion_tokens"] / server.tokens_per_second)
+                    self.send_json({
+                        **base,
+                        "object": "chat.completion",
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": reply},
+                                     "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for start in range(0, len(reply), CHARS_PER_TOKEN):
+                    if server.tokens_per_second:
+                        time.sleep(1 / server.tokens_per_second)
+                    self.send_event({**base, "object": "chat.completion.chunk", "choices": [
+                        {"index": 0, "delta": {"content": reply[start:start + CHARS_PER_TOKEN]}, "finish_reason": None}
+                    ]})
+                self.send_event({**base, "object": "chat.completion.chunk", "usage": usage, "choices": [
+                    {"index": 0, "delta": {}, "finish_reason": "stop"}
+                ]})
+                self.send_chunk(b"data: [DONE]\n\n")
+                self.send_chunk(b"")
+
+            def send_event(self, payload):
+                self.send_chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+            def send_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def send_json(self, payload, status=200, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                if server.requests_per_second:
+                    self.send_header("x-ratelimit-limit-requests", str(server.requests_per_second * 60))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
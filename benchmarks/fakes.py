@@ -0,0 +1,87 @@
+"""Offline stand-ins for the OpenAI clients used by the benchmarks."""
+import hashlib
+import math
+import time
+
+from typing import Callable
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+
+from fake_openai import bow_vector
+
+
+def hash_vector(text, dim=64):
+    """Deterministic unit vector for a piece of text"""
+    values = []
+    counter = 0
+    while len(values) < dim:
+        digest = hashlib.sha256(f"{counter}\0{text}".encode("utf-8")).digest()
+        values.extend((b - 127.5) / 127.5 for b in digest)
+        counter += 1
+    values = values[:dim]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+class FakeEmbeddings(Embeddings):
+    """Counts embedded texts and optionally sleeps per call like a remote API"""
+
+    def __init__(self, dim=64, latency=0.0, per_text_latency=0.0):
+        self.dim = dim
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.texts_embedded = 0
+        self.calls = 0
+
+    def _embed(self, texts):
+        self.calls += 1
+        self.texts_embedded += len(texts)
+        time.sleep(self.latency + self.per_text_latency * len(texts))
+        return [hash_vector(t, self.dim) for t in texts]
+
+    def embed_documents(self, texts):
+        return self._embed(list(texts))
+
+    def embed_query(self, text):
+        return self._embed([text])[0]
+
+
+class BowEmbeddings(FakeEmbeddings):
+    """FakeEmbeddings with bag-of-words vectors, so texts sharing words are similar"""
+
+    def _embed(self, texts):
+        vectors = super()._embed(texts)
+        return [bow_vector(t, len(v)) for t, v in zip(texts, vectors)]
+
+
+class FakeLLM(LLM):
+    """Completion model whose reply is `respond(prompt)`, after `latency` seconds"""
+
+    respond: Callable[[str], str]
+    latency: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "fake"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self.respond(prompt)
+
+
+def make_document(n, chars=20000):
+    """Generate a synthetic study document of roughly `chars` characters"""
+    sentences = []
+    size = 0
+    i = 0
+    while size < chars:
+        sentence = f"Document {n} section {i // 8} discusses concept {i} and its relation to topic {i % 13}. "
+        sentences.append(sentence)
+        size += len(sentence)
+        i += 1
+        if i % 8 == 0:
+            sentences.append("\n\n")
+    return "".join(sentences)
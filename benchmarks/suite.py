@@ -0,0 +1,306 @@
+"""Offline end-to-end benchmark suite for all three apps.
+
+Run from the repository root:
+
+    python benchmarks/suite.py [--quick] [--out results.json]
+    python benchmarks/suite.py --compare before.json after.json
+
+Starts a local OpenAI stand-in (fake_openai.FakeOpenAIServer) with fixed
+latency and token rates, points the apps at it through OPENAI_BASE_URL,
+and drives them headlessly with Streamlit's AppTest, real clients and a
+throwaway cache directory, so nothing touches the network or ~/.cache:
+
+- ingest: upload a generated corpus (TXT to the agent app, PDFs to the RAG
+  app, one PDF to a Tool app module) and wait for it to be indexed
+- retrieval: similarity search latency on indexes of growing size
+- rerun: an idle rerun of the agent app with a library of growing size
+- generate: notes, quiz and flashcards end to end in each app
+
+Every corpus is generated from fixed seeds and the server timing is part of
+the config, so results from different commits are comparable. Each run
+writes a JSON file with the commit, config and flat metric names; use
+--compare to print the change per metric between two runs.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Before any app module reads them
+CACHE_DIR = tempfile.mkdtemp(prefix="studygen-bench-")
+os.environ["STUDYGEN_CACHE_DIR"] = CACHE_DIR
+os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+os.environ.pop("STUDYGEN_DEBUG", None)
+os.environ.pop("STUDYGEN_TRACE_FILE", None)
+
+import streamlit.testing.v1.app_test as app_test
+import streamlit.testing.v1.local_script_runner as local_script_runner
+from streamlit.testing.v1 import AppTest
+
+from bench_pdf_extract import make_pdf
+from fake_openai import FakeOpenAIServer
+from fakes import make_document
+
+SERVER = {
+    "latency": 0.05,
+    "tokens_per_second": 500,
+    "prefill_tokens_per_second": 50000,
+    "embedding_latency": 0.02,
+}
+CONFIG = {
+    "server": SERVER,
+    "document_chars": 20000,
+    "corpus_sizes": [2, 8, 32],
+    "pdf_pages": 20,
+    "index_sizes": [10, 100, 400],
+    "searches": 20,
+    "library_sizes": [5, 50],
+    "reruns": 10,
+}
+QUICK = {"corpus_sizes": [2, 4], "index_sizes": [10, 50], "searches": 5, "library_sizes": [5], "reruns": 3}
+
+APPS = {
+    "agent": "hackathon_ai_tool_agent.py",
+    "rag": "hackathon_ai_tool_rag.py",
+    "tool": "hackathon_ai_tool.py",
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def open_app(name, **session):
+    app = AppTest.from_file(os.path.join(ROOT, APPS[name]), default_timeout=600)
+    for key, value in session.items():
+        app.session_state[key] = value
+    app.run()
+    check(app)
+    return app
+
+
+def check(app):
+    assert not app.exception, [e.value for e in app.exception]
+
+
+def click(app, label):
+    next(b for b in app.button if b.label == label).click()
+    app.run()
+    check(app)
+
+
+def corpus(size, seed):
+    """`size` deterministic documents; `seed` keeps corpora disjoint so caches never help"""
+    return {f"doc{seed}_{i}.txt": make_document(seed * 1000 + i, CONFIG["document_chars"]) for i in range(size)}
+
+
+def unique_pdf(seed):
+    """A generated PDF whose text differs per seed (same length, so its xref stays valid)"""
+    return make_pdf(CONFIG["pdf_pages"]).replace(b"mitochondria", b"m%011d" % seed)
+
+
+def tool_session():
+    module = {"text": "", "notes": "", "flashcards": [], "quiz": [], "mindmap": ""}
+    return {
+        "courses": {"Bench": {"Module": module}},
+        "page": "content",
+        "selected_course": "Bench",
+        "selected_module": "Module",
+    }
+
+
+def bench_ingest(results):
+    for size in CONFIG["corpus_sizes"]:
+        documents = corpus(size, seed=size)
+        chars = sum(len(text) for text in documents.values())
+
+        app = open_app("agent")
+        app.file_uploader[0].set_value([(name, text.encode("utf-8"), "text/plain") for name, text in documents.items()])
+        seconds = timed(app.run)
+        check(app)
+        assert len(app.session_state["documents"]) == size
+        results[f"ingest.agent.{size}_docs.seconds"] = seconds
+        results[f"ingest.agent.{size}_docs.chars_per_second"] = chars / seconds
+
+        app = open_app("rag")
+        app.file_uploader[0].set_value([(f"doc{size}_{i}.pdf", unique_pdf(size * 1000 + i), "application/pdf")
+                                        for i in range(size)])
+        seconds = timed(app.run)
+        check(app)
+        assert len(app.session_state["documents"]) == size
+        results[f"ingest.rag.{size}_pdfs.seconds"] = seconds
+
+    app = open_app("tool", **tool_session())
+    app.file_uploader[0].set_value(("module.pdf", unique_pdf(1), "application/pdf"))
+    results["ingest.tool.1_pdf.seconds"] = timed(app.run)
+    check(app)
+
+
+def bench_retrieval(results):
+    from engine import make_embeddings
+    from vector_index import IncrementalIndex
+
+    embeddings = make_embeddings(cache=False)
+    for size in CONFIG["index_sizes"]:
+        index = IncrementalIndex(embeddings)
+        index.sync({name: {"text": text} for name, text in corpus(size, seed=10000 + size).items()})
+        retriever = index.as_retriever(search_kwargs={"k": 5})
+        latencies = [
+            timed(lambda: retriever.invoke(f"How does concept {i} relate to topic {i % 13}?"))
+            for i in range(CONFIG["searches"])
+        ]
+        results[f"retrieval.{size}_docs.chunks"] = index.chunk_count
+        results[f"retrieval.{size}_docs.median_seconds"] = statistics.median(latencies)
+
+
+def bench_rerun(results):
+    from engine import make_embeddings
+    from vector_index import IncrementalIndex
+
+    for size in CONFIG["library_sizes"]:
+        documents = {
+            name: {"text": text, "upload_time": "", "size": len(text), "type": "TXT"}
+            for name, text in corpus(size, seed=20000 + size).items()
+        }
+        index = IncrementalIndex(make_embeddings(cache=False))
+        index.sync(documents)
+        app = open_app("agent", documents=documents, vectorstore=index)
+        app.run()
+        latencies = [timed(app.run) for _ in range(CONFIG["reruns"])]
+        check(app)
+        results[f"rerun.agent.{size}_docs.median_seconds"] = statistics.median(latencies)
+
+
+def bench_generate(results):
+    documents = corpus(4, seed=30000)
+    uploads = [(name, text.encode("utf-8"), "text/plain") for name, text in documents.items()]
+
+    app = open_app("agent")
+    app.file_uploader[0].set_value(uploads)
+    app.run()
+    check(app)
+    for tab, topic, label, key in [
+        ("nav_notes", "Concepts", "📝 Generate Notes", "notes"),
+        ("nav_quiz", "Concepts", "🧠 Create Quiz", "quiz"),
+        ("nav_flashcards", "Concepts", "🎯 Create Flashcards", "flashcards"),
+    ]:
+        app.button(key=tab).click()
+        app.run()
+        app.text_input[0].input(topic)
+        results[f"generate.agent.{key}.seconds"] = timed(lambda: click(app, label))
+
+    app = open_app("rag")
+    app.file_uploader[0].set_value([("doc.pdf", unique_pdf(30000), "application/pdf")])
+    app.run()
+    check(app)
+    app.text_input[1].input("Concepts")
+    for label, key in [("Generate Notes", "notes"), ("Generate Quiz", "quiz"), ("Generate Flashcards", "flashcards")]:
+        results[f"generate.rag.{key}.seconds"] = timed(lambda: click(app, label))
+
+    session = tool_session()
+    session["courses"]["Bench"]["Module"]["text"] = "\n\n".join(documents.values())
+    app = open_app("tool", **session)
+    for label, key in [("📝 Generate Notes", "notes"), ("🎯 Generate Quiz", "quiz"),
+                       ("📖 Generate Flashcards", "flashcards")]:
+        results[f"generate.tool.{key}.seconds"] = timed(lambda: click(app, label))
+        assert app.session_state["courses"]["Bench"]["Module"][key], key
+
+
+SECTIONS = {
+    "ingest": bench_ingest,
+    "retrieval": bench_retrieval,
+    "rerun": bench_rerun,
+    "generate": bench_generate,
+}
+
+
+def run(sections):
+    # Compile each script once, as the Streamlit server does; AppTest
+    # otherwise recompiles it on every run
+    shared_script_cache = app_test.ScriptCache()
+    for module in (app_test, local_script_runner):
+        mock.patch.object(module, "ScriptCache", lambda: shared_script_cache).start()
+
+    results = {}
+    with FakeOpenAIServer(**SERVER) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        for name in sections:
+            started = time.perf_counter()
+            SECTIONS[name](results)
+            print(f"{name}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        requests = dict(server.stats)
+    return {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": CONFIG,
+        "server_requests": requests,
+        "results": results,
+    }
+
+
+def show(report):
+    print(f"commit {report['commit'] or '?'} • {report['time']}")
+    width = max(len(metric) for metric in report["results"])
+    for metric, value in report["results"].items():
+        print(f"{metric:<{width}} {value:>12,.4f}")
+
+
+def compare(before_path, after_path):
+    with open(before_path, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(after_path, encoding="utf-8") as f:
+        after = json.load(f)
+    if before["config"] != after["config"]:
+        print("warning: the runs used different configs; numbers may not be comparable")
+    print(f"{before['commit'] or '?'} -> {after['commit'] or '?'}")
+    metrics = [metric for metric in after["results"] if metric in before["results"]]
+    width = max(len(metric) for metric in metrics) if metrics else 0
+    for metric in metrics:
+        old, new = before["results"][metric], after["results"][metric]
+        change = f"{(new - old) / old:+.1%}" if old else ""
+        print(f"{metric:<{width}} {old:>12,.4f} {new:>12,.4f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="smaller corpora and fewer repeats")
+    parser.add_argument("--sections", nargs="+", choices=list(SECTIONS), default=list(SECTIONS))
+    parser.add_argument("--out", help="where to write the JSON report (default: bench-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two JSON reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.quick:
+        CONFIG.update(QUICK)
+    report = run(args.sections)
+    show(report)
+    out = args.out or f"bench-{report['commit'] or 'local'}.json"
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {out}")
+
+
+if __name__ == "__main__":
+    main()
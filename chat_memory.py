@@ -0,0 +1,71 @@
+"""Token-budgeted conversation memory for the study agent.
+
+ConversationBufferMemory resends the whole chat on every turn, so prompts
+grow with the length of the session. BudgetedSummaryMemory keeps recent
+turns verbatim within a token budget and folds the oldest turns into a
+rolling summary. Turns are summarised in batches: once the history is over
+budget it is cut back to `low_water` of the budget, so the summariser runs
+every few turns rather than on every one, and only sees the turns it is
+adding to the existing summary.
+
+langchain.memory takes about half a second to import, so it is loaded (and
+BudgetedSummaryMemory defined) when the first conversation memory is made.
+"""
+import functools
+import os
+
+from context_pack import count_tokens
+
+MEMORY_MODE = os.getenv("STUDYGEN_MEMORY_MODE", "summary")  # "summary" or "buffer"
+MEMORY_TOKENS = int(os.getenv("STUDYGEN_MEMORY_TOKENS", "1500"))
+MESSAGE_OVERHEAD = 4  # tokens of role and framing per chat message
+
+
+def message_tokens(messages):
+    return sum(count_tokens(message.content) + MESSAGE_OVERHEAD for message in messages)
+
+
+@functools.lru_cache(maxsize=None)
+def budgeted_summary_memory_class():
+    from langchain.memory import ConversationSummaryBufferMemory
+
+    class BudgetedSummaryMemory(ConversationSummaryBufferMemory):
+        """Recent turns verbatim within `max_token_limit`, older turns in a rolling summary"""
+
+        low_water: float = 0.6
+
+        def prune(self):
+            buffer = self.chat_memory.messages
+            if message_tokens(buffer) <= self.max_token_limit:
+                return
+            pruned = []
+            while buffer and message_tokens(buffer) > self.max_token_limit * self.low_water:
+                # Whole turns only, so the kept history never starts with an orphaned answer
+                pruned.extend(buffer[:2])
+                del buffer[:2]
+            self.moving_summary_buffer = self.predict_new_summary(pruned, self.moving_summary_buffer)
+
+    return BudgetedSummaryMemory
+
+
+def make_memory(summary_llm, mode=MEMORY_MODE, max_tokens=MEMORY_TOKENS):
+    """Conversation memory for the agent; `summary_llm` writes the rolling summary"""
+    if mode == "buffer":
+        from langchain.memory import ConversationBufferMemory
+
+        return ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    return budgeted_summary_memory_class()(
+        llm=summary_llm,
+        max_token_limit=max_tokens,
+        memory_key="chat_history",
+        return_messages=True,
+    )
+
+
+def history_tokens(memory):
+    """Tokens of chat history (and summary) the next agent prompt will carry"""
+    tokens = message_tokens(memory.chat_memory.messages)
+    summary = getattr(memory, "moving_summary_buffer", "")
+    if summary:
+        tokens += count_tokens(summary) + MESSAGE_OVERHEAD
+    return tokens
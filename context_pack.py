@@ -0,0 +1,95 @@
+"""Token-budgeted context packing for prompts built from a module's text.
+
+Instead of pasting a whole module into every prompt, the text is split into
+overlapping chunks that are embedded once per module. Each prompt then gets
+the chunks most similar to its query, in document order, up to a token
+budget. Modules that already fit the budget are used whole and never
+embedded.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("STUDYGEN_CONTEXT_TOKENS", "3000"))
+CHUNK_CHARS = 1200
+CHUNK_OVERLAP = 200
+
+_encoding = None
+
+
+def count_tokens(text):
+    """Token count for gpt-4o-family models, or a 4-chars-per-token estimate"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_text(text, size=CHUNK_CHARS, overlap=CHUNK_OVERLAP):
+    """Split text into ~`size`-character chunks, preferring paragraph and sentence breaks"""
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            for separator in ("\n\n", "\n", ". ", " "):
+                cut = text.rfind(separator, start + size // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class ModuleIndex:
+    """Embedded chunks of one module's text"""
+
+    def __init__(self, text, embed):
+        """`embed(list_of_texts)` returns one vector per text"""
+        self.text_hash = text_hash(text)
+        self.embed = embed
+        self.chunks = chunk_text(text)
+        self.tokens = [count_tokens(chunk) for chunk in self.chunks]
+        self.vectors = _normalize(np.asarray(embed(self.chunks), dtype=np.float32))
+
+    def pack(self, query, budget=CONTEXT_TOKEN_BUDGET):
+        """The chunks most relevant to `query` that fit in `budget` tokens, in document order"""
+        query_vector = _normalize(np.asarray(self.embed([query])[0], dtype=np.float32))
+        chosen = []
+        used = 0
+        for i in np.argsort(-(self.vectors @ query_vector)):
+            if used + self.tokens[i] > budget:
+                continue
+            chosen.append(int(i))
+            used += self.tokens[i]
+        return "\n\n".join(self.chunks[i] for i in sorted(chosen))
+
+
+def pack_context(text, query, embed, budget=CONTEXT_TOKEN_BUDGET, index=None):
+    """Return (context, index) for `query`; reuses `index` while the text is unchanged"""
+    if count_tokens(text) <= budget:
+        return text, index
+    if index is None or index.text_hash != text_hash(text):
+        index = ModuleIndex(text, embed)
+    return index.pack(query, budget), index
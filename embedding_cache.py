@@ -0,0 +1,67 @@
+"""Content-addressed embedding cache.
+
+Vectors are stored on disk under a hash of the embedding model name and the
+chunk text, so the same chunk is embedded once per model no matter how many
+sessions, rebuilds or restarts ask for it.
+"""
+import hashlib
+import os
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+from disk_cache import CACHE_DIR, DiskLRUCache
+
+EMBEDDING_CACHE_MB = int(os.getenv("STUDYGEN_EMBEDDING_CACHE_MB", "512"))
+
+
+def embedding_key(model, text):
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def open_embedding_cache(path=None, max_bytes=None):
+    return DiskLRUCache(
+        path or os.path.join(CACHE_DIR, "embeddings.sqlite3"),
+        max_bytes if max_bytes is not None else EMBEDDING_CACHE_MB * 1024 * 1024
+    )
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an Embeddings object and only forwards texts it has never seen"""
+
+    def __init__(self, embeddings, cache, model=None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model or getattr(embeddings, "model", None) or type(embeddings).__name__
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        keys = [embedding_key(self.model, text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = {
+                key: array("f", vector).tobytes()
+                for key, vector in zip(missing, vectors)
+            }
+            self.cache.set_many(fresh)
+            cached.update(fresh)
+
+        return [array("f", cached[key]).tolist() for key in keys]
+
+    def embed_query(self, text):
+        key = embedding_key(self.model, text)
+        value = self.cache.get(key)
+        if value is None:
+            vector = self.embeddings.embed_query(text)
+            value = array("f", vector).tobytes()
+            self.cache.set(key, value)
+        return array("f", value).tolist()
+
+    def stats(self):
+        return self.cache.stats()
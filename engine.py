@@ -0,0 +1,430 @@
+"""Headless Study Gen engine: ingest, index, retrieve, generate and parse.
+
+Everything the three Streamlit apps do besides drawing widgets lives here:
+reading uploads, building the shared document index, retrieval, the study
+prompts and agent, and turning model output into flashcards, quizzes and
+mindmaps. Nothing here imports Streamlit or needs an API key until a model
+is actually called, so batch jobs, profilers, benchmarks and other
+frontends can use the same code paths as the apps.
+
+The OpenAI SDK, LangChain (even its embeddings base class pulls in
+LangSmith), FAISS, PyPDF2 and python-docx take seconds to import between
+them, so each is imported inside the functions that need it: opening an
+app costs none of them until a feature first uses it.
+"""
+import io
+import json
+import os
+import re
+
+from pdf_extract import iter_pdf_pages, read_bytes
+from text_normalize import NORMALIZE, normalize_pages, normalize_text
+
+SUPPORTED_TYPES = ("pdf", "txt", "docx")
+CHAT_MODEL = "gpt-4o-mini"
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_BATCH = 256
+
+
+# --- Ingest ---
+def file_type(filename):
+    """Upper-case extension, e.g. "PDF" """
+    return filename.rsplit(".", 1)[-1].upper()
+
+
+def read_pdf(source, on_progress=None, page_markers=True, workers=None, normalize=NORMALIZE):
+    """Text of a PDF, optionally with a "--- Page N ---" line before each page.
+
+    With `normalize`, running headers, footers and page numbers are dropped,
+    hyphenated line breaks joined and whitespace collapsed (see text_normalize).
+    """
+    pages = [page for page in iter_pdf_pages(source, workers=workers, on_progress=on_progress) if page.text]
+    texts = [page.text for page in pages]
+    if normalize:
+        texts = normalize_pages(texts)
+    parts = []
+    for page, text in zip(pages, texts):
+        if not text:
+            continue
+        parts.append(f"\n--- Page {page.number} ---\n{text}" if page_markers else text)
+    return ("\n" if normalize and not page_markers else "").join(parts)
+
+
+def read_txt(source, normalize=NORMALIZE):
+    text = read_bytes(source).decode("utf-8")
+    return normalize_text(text) if normalize else text
+
+
+def read_docx(source, normalize=NORMALIZE):
+    import docx
+
+    document = docx.Document(io.BytesIO(read_bytes(source)))
+    text = "".join(paragraph.text + "\n" for paragraph in document.paragraphs)
+    return normalize_text(text) if normalize else text
+
+
+def read_document(filename, source, on_progress=None, workers=None, normalize=NORMALIZE):
+    """Text of a PDF, TXT or DOCX file given as a path, bytes or file-like object"""
+    kind = file_type(filename).lower()
+    if kind == "pdf":
+        return read_pdf(source, on_progress=on_progress, workers=workers, normalize=normalize)
+    if kind == "txt":
+        return read_txt(source, normalize=normalize)
+    if kind == "docx":
+        return read_docx(source, normalize=normalize)
+    raise ValueError(f"Unsupported file type: {filename}")
+
+
+# --- Models ---
+def make_llm(model_name=CHAT_MODEL, api_key=None, **kwargs):
+    """Chat model; the key defaults to OPENAI_API_KEY"""
+    from langchain_openai import ChatOpenAI
+
+    from llm_client import http_client
+
+    if api_key:
+        kwargs["openai_api_key"] = api_key
+    # Rate limits and retries are handled by the shared client (see llm_client)
+    return ChatOpenAI(model_name=model_name, http_client=http_client(), max_retries=0, **kwargs)
+
+
+def make_embeddings(api_key=None, cache=True):
+    """OpenAI embeddings, behind the persistent embedding cache unless `cache` is False"""
+    from langchain_openai import OpenAIEmbeddings
+
+    from embedding_cache import CachedEmbeddings, open_embedding_cache
+    from llm_client import http_client
+
+    kwargs = {"openai_api_key": api_key} if api_key else {}
+    # Chunks are far below the model's input limit, so skip the client-side tiktoken
+    # length check; it costs a tokenizer pass per text and needs network on first use
+    embeddings = OpenAIEmbeddings(check_embedding_ctx_length=False, http_client=http_client(), max_retries=0, **kwargs)
+    return CachedEmbeddings(embeddings, open_embedding_cache()) if cache else embeddings
+
+
+def make_client(api_key=None):
+    """OpenAI SDK client for the completion and embedding helpers below"""
+    import openai
+
+    from llm_client import http_client
+
+    return openai.OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"), http_client=http_client(), max_retries=0)
+
+
+# --- Index and retrieve ---
+def index_documents(all_documents, index):
+    """Index matching a {filename: {text, ...}} library, built from a copy of `index`.
+
+    Indexes may be shared between sessions, so `index` itself is never
+    changed; a persisted index is reused when this exact library was
+    indexed before.
+    """
+    from index_store import update_library_index
+
+    return update_library_index(index.copy(), all_documents)
+
+
+def build_index(all_documents, embeddings=None):
+    """Index a library from scratch (or from disk), e.g. for a batch job"""
+    from vector_index import IncrementalIndex
+
+    return index_documents(all_documents, IncrementalIndex(embeddings or make_embeddings()))
+
+
+def retrieve(index, query, k=5, filter=None, diversity=None):
+    """The `k` chunks most similar to `query`, among those matching `filter` (see IncrementalIndex.search)"""
+    return index.as_retriever(search_kwargs={"k": k, "filter": filter, "diversity": diversity}).invoke(query)
+
+
+def make_qa_chain(llm, index, k=None, return_source_documents=False, filter=None):
+    """RetrievalQA chain over `index`, optionally limited to the chunks matching `filter`"""
+    from langchain.chains import RetrievalQA
+
+    search_kwargs = {"k": k} if k else {}
+    if filter:
+        search_kwargs["filter"] = filter
+    return RetrievalQA.from_chain_type(
+        llm=llm,
+        retriever=index.as_retriever(search_kwargs=search_kwargs),
+        return_source_documents=return_source_documents
+    )
+
+
+# --- Generate ---
+# Queries for a retrieval chain, which supplies the matching material itself
+def notes_query(topic):
+    return f"""Generate comprehensive, well-structured study notes on '{topic}'.
+        Format as:
+        ## {topic}
+
+        ### Key Concepts:
+        - [List main concepts with brief explanations]
+
+        ### Important Details:
+        - [Detailed explanations of complex points]
+        - [Include formulas, definitions, examples where relevant]
+
+        ### Summary:
+        [Concise summary for quick review]
+
+        ### Review Questions:
+        - [3-4 questions to test understanding]"""
+
+
+def flashcards_query(topic="the uploaded material"):
+    return f"""Create 10 flashcards from {topic}. Format each as:
+
+        **Card X:**
+        Q: [Clear, specific question]
+        A: [Concise but complete answer]
+
+        Focus on key concepts, definitions, formulas, and important facts that students need to memorize."""
+
+
+def quiz_query(topic="the uploaded material"):
+    return f"""Create an 8-question multiple choice quiz from {topic}.
+
+        Format each question as:
+        **Question X:** [Question text]
+        A) [Option A]
+        B) [Option B]
+        C) [Option C]
+        D) [Option D]
+
+        **Correct Answer:** [Letter] - [Brief explanation why this is correct]
+
+        Make questions progressively harder. Include a mix of factual recall and conceptual understanding."""
+
+
+# Prompts that carry the material in the prompt itself
+def notes_prompt(text):
+    return f"Summarize into study notes:\n\n{text}"
+
+
+def mindmap_prompt(text):
+    return f"Create a mindmap in Graphviz DOT format. Use 'digraph' syntax. Only return the DOT code. Content: {text}"
+
+
+# Map-reduce steps for material too long for one prompt (see map_reduce.condense)
+def part_notes_prompt(text):
+    return f"Summarize this part of a longer document into concise study notes. Keep every key concept, definition, formula and fact:\n\n{text}"
+
+
+def merge_notes_prompt(text):
+    return f"Merge these study notes on consecutive parts of one document into one set of concise study notes. Keep every key concept, definition, formula and fact:\n\n{text}"
+
+
+def part_outline_prompt(text):
+    return f"List the topics and subtopics of this part of a longer document as a short indented outline:\n\n{text}"
+
+
+def merge_outline_prompt(text):
+    return f"Merge these outlines of consecutive parts of one document into one short indented outline of its topics and subtopics:\n\n{text}"
+
+
+def quiz_prompt(text):
+    return f"Generate 5 MCQs in JSON list with fields: question, options, answer. Use this text:\n\n{text}"
+
+
+def flashcards_prompt(text):
+    return f"Generate 5 flashcards as Q&A pairs:\n\n{text}"
+
+
+def question_prompt(context, question):
+    return f"Answer this based on:\n\n{context}\n\nQ: {question}"
+
+
+def generate(chain, query, callbacks=None):
+    """Run a retrieval chain on `query`"""
+    return chain.run(query, callbacks=callbacks)
+
+
+def build_messages(prompt):
+    return [
+        {"role": "system", "content": "You are an AI that generates educational content."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def complete(client, prompt, model=CHAT_MODEL):
+    """Whole completion for `prompt`"""
+    response = client.chat.completions.create(model=model, messages=build_messages(prompt))
+    return response.choices[0].message.content or ""
+
+
+def stream_completion(client, prompt, model=CHAT_MODEL):
+    """Yield the completion for `prompt` piece by piece as it is generated"""
+    stream = client.chat.completions.create(model=model, messages=build_messages(prompt), stream=True)
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def embed_texts(client, texts, model=EMBEDDING_MODEL):
+    vectors = []
+    for start in range(0, len(texts), EMBEDDING_BATCH):
+        response = client.embeddings.create(model=model, input=texts[start:start + EMBEDDING_BATCH])
+        vectors.extend(item.embedding for item in response.data)
+    return vectors
+
+
+def build_study_assistant(index, memory, llm, answer_cache=None, filter=None, response_cache=None):
+    """Build the chains, tools, agent and router for one library, search scope and conversation"""
+    from langchain.agents import AgentType, Tool, initialize_agent
+
+    from intent_router import IntentRouter
+
+    key = index.scoped_key(filter)
+    # One chain per output shape, reused by every call
+    qa_chain = make_qa_chain(llm, index, k=5, return_source_documents=True, filter=filter)
+    generation_chain = make_qa_chain(llm, index, k=5, filter=filter)
+
+    # Tools accept `callbacks` so the agent (or a tab) can stream their tokens
+    def answer_question(query, callbacks=None):
+        """Enhanced Q&A with source context"""
+        def run_chain(query):
+            result = qa_chain({"query": query}, callbacks=callbacks)
+            return f"**Answer:** {result['result']}\n\n**Sources:** Based on {len(result['source_documents'])} document sections"
+
+        if answer_cache is None:
+            return run_chain(query)
+        # Repeated or near-identical questions skip retrieval and the LLM
+        return answer_cache.get_or_compute(key, "qa", query, run_chain)
+
+    def generate_stored(query, callbacks, regenerate, parse=None):
+        if response_cache is None:
+            return generate(generation_chain, query, callbacks)
+        # The same request on the same documents and scope reuses the stored output,
+        # as long as it parsed
+        model = getattr(llm, "model_name", None) or type(llm).__name__
+        return response_cache.get_or_generate(
+            model, query, key, lambda: generate(generation_chain, query, callbacks), regenerate,
+            valid=(lambda output: bool(parse(output))) if parse else None
+        )
+
+    def generate_notes(topic, callbacks=None, regenerate=False):
+        """Generate structured study notes"""
+        return generate_stored(notes_query(topic), callbacks, regenerate)
+
+    def create_flashcards(topic="the uploaded material", callbacks=None, regenerate=False):
+        """Generate flashcards in Q&A format"""
+        return generate_stored(flashcards_query(topic), callbacks, regenerate, parse_flashcards)
+
+    def generate_quiz(topic="the uploaded material", callbacks=None, regenerate=False):
+        """Generate multiple choice quiz"""
+        return generate_stored(quiz_query(topic), callbacks, regenerate, parse_quiz)
+
+    tools = [
+        Tool(
+            name="Question Answering",
+            func=answer_question,
+            description="Answers specific questions from the study material with source references"
+        ),
+        Tool(
+            name="Notes Generator",
+            func=generate_notes,
+            description="Creates structured, comprehensive study notes on any topic from the material"
+        ),
+        Tool(
+            name="Flashcard Creator",
+            func=create_flashcards,
+            description="Generates flashcards for active recall and memorization practice"
+        ),
+        Tool(
+            name="Quiz Generator",
+            func=generate_quiz,
+            description="Creates multiple choice quizzes to test knowledge and understanding"
+        )
+    ]
+
+    agent = initialize_agent(
+        tools=tools,
+        llm=llm,
+        agent=AgentType.CONVERSATIONAL_REACT_DESCRIPTION,
+        memory=memory,
+        verbose=False,
+        handle_parsing_errors=True
+    )
+    return {
+        "index": index,
+        "key": key,
+        "filter": filter,
+        "memory": memory,
+        "tools": tools,
+        "agent": agent,
+        # Obvious requests go straight to their tool, skipping the agent's reasoning calls
+        "router": IntentRouter(tools),
+    }
+
+
+# --- Parse ---
+FALLBACK_MINDMAP = """digraph G {
+    rankdir=TB;
+    node [shape=box, style=rounded];
+    "Main Topic" -> "Concept 1";
+    "Main Topic" -> "Concept 2";
+    "Main Topic" -> "Concept 3";
+    "Concept 1" -> "Detail 1";
+    "Concept 2" -> "Detail 2";
+    "Concept 3" -> "Detail 3";
+}"""
+
+QA_PAIR_PATTERN = r"Q:(.*?)A:(.*?)(?=Q:|$)"
+
+
+def parse_flashcards(text):
+    """"**Card X:**" blocks into [{question, answer}]"""
+    cards = []
+    current_card = {}
+    for line in text.split('\n'):
+        line = line.strip()
+        if line.startswith('**Card') and ':' in line:
+            if current_card:
+                cards.append(current_card)
+            current_card = {'question': '', 'answer': ''}
+        elif line.startswith('Q:'):
+            current_card['question'] = line[2:].strip()
+        elif line.startswith('A:'):
+            current_card['answer'] = line[2:].strip()
+    if current_card:
+        cards.append(current_card)
+    return cards
+
+
+def parse_quiz(text):
+    """"**Question X:**" blocks into [{question, options, answer}]"""
+    questions = []
+    current_question = {}
+    for line in text.split('\n'):
+        line = line.strip()
+        if line.startswith('**Question') and ':' in line:
+            if current_question:
+                questions.append(current_question)
+            current_question = {'question': line.split(':', 1)[1].strip(), 'options': [], 'answer': ''}
+        elif line.startswith(('A)', 'B)', 'C)', 'D)')):
+            current_question['options'].append(line)
+        elif line.startswith('**Correct Answer:**'):
+            current_question['answer'] = line.replace('**Correct Answer:**', '').strip()
+    if current_question:
+        questions.append(current_question)
+    return questions
+
+
+def parse_qa_pairs(text):
+    """"Q: ... A: ..." text into [(question, answer)]"""
+    return re.findall(QA_PAIR_PATTERN, text, re.S)
+
+
+def parse_quiz_json(raw):
+    """The first JSON list in `raw`, or [] if there is none"""
+    try:
+        raw_json = re.search(r"\[.*\]", raw, re.S)
+        return json.loads(raw_json.group()) if raw_json else []
+    except ValueError:
+        return []
+
+
+def parse_mindmap(response):
+    """The DOT graph in `response`, falling back to a simple mindmap"""
+    dot_match = re.search(r'(digraph.*?})', response, re.DOTALL | re.IGNORECASE)
+    return dot_match.group(1) if dot_match else FALLBACK_MINDMAP
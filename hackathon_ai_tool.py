@@ -1,10 +1,16 @@
 # hackathon_ai_tool_full_ui.py
 import streamlit as st
-from PyPDF2 import PdfReader
-import openai
 import os
 import re
-import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import engine
+from context_pack import CONTEXT_TOKEN_BUDGET, count_tokens, pack_context, text_hash
+from map_reduce import MAP_REDUCE, condense
+from response_cache import open_response_cache
+from streaming import DEBUG, BlockStream, JsonArrayStream, StreamTimer
+from tracing import Tracer, show_trace_panel
 
 
 st.set_page_config(page_title="Study Gen", layout="wide")
@@ -15,19 +21,260 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     st.error("❌ Please set your OPENAI_API_KEY environment variable before running the app.")
     st.stop()
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+
+
+@st.cache_resource
+def get_client():
+    # The OpenAI SDK is slow to import; load it with the first generation
+    return engine.make_client(OPENAI_API_KEY)
+
+
+@st.cache_resource
+def get_response_cache():
+    # Shared by every session; generated material persists on disk across restarts
+    return open_response_cache()
 
 
 # --- Helper: AI Content Generation ---
-def generate_content(prompt):
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are an AI that generates educational content."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    return response.choices[0].message.content or ""
+# Given the `source` a prompt was built from (the module text's hash), a
+# completion is saved and reused for the same prompt; `regenerate` skips it.
+# With a `valid` check, only a completion that passes it (one that parsed) is saved.
+# Worker threads have no script context for st.cache_resource, so they are
+# handed the `client` and `cache` the script thread got
+def saved_response(prompt, source, regenerate, cache=None):
+    if source is None or regenerate:
+        return None
+    return (cache or get_response_cache()).lookup(engine.CHAT_MODEL, prompt, source)
+
+
+def generate_content(prompt, source=None, regenerate=False, valid=None, client=None, cache=None):
+    cache = cache or get_response_cache()
+    content = saved_response(prompt, source, regenerate, cache)
+    if content is not None:
+        return content
+    with tracer.span("generate_content", model=engine.CHAT_MODEL, tokens_in=count_tokens(prompt)) as span:
+        content = engine.complete(client or get_client(), prompt)
+        span["tokens_out"] = count_tokens(content)
+    if source is not None and (valid is None or valid(content)):
+        cache.store(engine.CHAT_MODEL, prompt, source, content)
+    return content
+
+
+def stream_content(prompt, source=None, valid=None):
+    """Yield the completion for `prompt` piece by piece as it is generated"""
+    with tracer.span("generate_content", model=engine.CHAT_MODEL, streamed=True, tokens_in=count_tokens(prompt)) as span:
+        parts = []
+        for piece in engine.stream_completion(get_client(), prompt):
+            parts.append(piece)
+            yield piece
+        content = "".join(parts)
+        span["tokens_out"] = count_tokens(content)
+    if source is not None and (valid is None or valid(content)):
+        get_response_cache().store(engine.CHAT_MODEL, prompt, source, content)
+
+
+def stream_timed(prompt, source=None, regenerate=False, valid=None):
+    """Stream `prompt` (or its saved completion, all at once) and keep its timing for the debug caption"""
+    content = saved_response(prompt, source, regenerate)
+    if content is not None:
+        st.session_state.last_timing = None
+        return iter([content])
+    timer = StreamTimer()
+    st.session_state.last_timing = timer
+    return timer.wrap(stream_content(prompt, source, valid))
+
+
+# --- Helper: Module context ---
+def embed_texts(texts):
+    with tracer.span("embed", texts=len(texts), tokens_in=sum(count_tokens(text) for text in texts)):
+        return engine.embed_texts(get_client(), texts)
+
+
+def module_context(module_data, query):
+    """The parts of the module text most relevant to `query`, within the prompt token budget"""
+    with tracer.span("retriever", query=query) as span:
+        context, module_data["index"] = pack_context(module_data["text"], query, embed_texts, index=module_data.get("index"))
+        span["tokens_out"] = count_tokens(context)
+    return context
+
+
+# What each Studio generation retrieves from a large module
+NOTES_QUERY = "main topics, key concepts, definitions and important facts"
+MINDMAP_QUERY = "main topics, subtopics and how they relate to each other"
+QUIZ_QUERY = "important facts, definitions and concepts worth testing"
+FLASHCARDS_QUERY = "key terms, definitions, formulas and facts to memorize"
+
+# What "Generate Everything" produces: module_data key -> (retrieval query, prompt builder, parser)
+STUDIO_JOBS = {
+    "notes": (NOTES_QUERY, engine.notes_prompt, lambda output: output),
+    "mindmap": (MINDMAP_QUERY, engine.mindmap_prompt, engine.parse_mindmap),
+    "quiz": (QUIZ_QUERY, engine.quiz_prompt, engine.parse_quiz_json),
+    "flashcards": (FLASHCARDS_QUERY, engine.flashcards_prompt, engine.parse_qa_pairs),
+}
+# Whether a completion for `key` parsed, and so is worth saving: a mindmap
+# that fell back, or a quiz or flashcards with nothing in them, is not
+VALID_OUTPUT = {
+    "mindmap": lambda output: engine.parse_mindmap(output) != engine.FALLBACK_MINDMAP,
+    "quiz": lambda output: bool(engine.parse_quiz_json(output)),
+    "flashcards": lambda output: bool(engine.parse_qa_pairs(output)),
+}
+STUDIO_CONCURRENCY = int(os.getenv("STUDYGEN_STUDIO_CONCURRENCY", "4"))
+
+# Notes and mindmaps cover the whole module: a long one is first condensed by
+# map-reduce with these (part prompt, merge prompt)
+CONDENSE_STEPS = {
+    "notes": (engine.part_notes_prompt, engine.merge_notes_prompt),
+    "mindmap": (engine.part_outline_prompt, engine.merge_outline_prompt),
+}
+
+
+def module_digest(module_data, key, on_progress=None):
+    """The whole module text, condensed to fit the prompt budget for `key`; kept until the text changes"""
+    digests = module_data.setdefault("digests", {})
+    text_id = text_hash(module_data["text"])
+    if digests.get(key, (None,))[0] != text_id:
+        part_prompt, merge_prompt = CONDENSE_STEPS[key]
+        client, cache = get_client(), get_response_cache()
+        with tracer.span("map_reduce", kind=key, tokens_in=count_tokens(module_data["text"])) as span:
+            digest = condense(
+                module_data["text"], part_prompt, merge_prompt,
+                lambda prompt: generate_content(prompt, source=text_id, client=client, cache=cache),
+                on_progress=on_progress
+            )
+            span["tokens_out"] = count_tokens(digest)
+        digests[key] = (text_id, digest)
+    return digests[key][1]
+
+
+def condenses(key):
+    """Whether the `key` generation reads a map-reduce digest of the module"""
+    return MAP_REDUCE and key in CONDENSE_STEPS
+
+
+def studio_material(module_data, key, query):
+    """What the `key` Studio button sends: the whole module (condensed) or the parts relevant to `query`"""
+    if not condenses(key):
+        return module_context(module_data, query)
+    if count_tokens(module_data["text"]) <= CONTEXT_TOKEN_BUDGET:
+        return module_data["text"]
+    with st.status(f"Reading the whole module for the {key}...") as status:
+        digest = module_digest(module_data, key, on_progress=lambda level, done, total: status.update(
+            label=f"{'Summarizing' if level == 0 else 'Merging'} parts of the module: {done}/{total}"
+        ))
+        status.update(label=f"Read the whole module for the {key}", state="complete")
+    return digest
+
+
+def generate_everything(module_data, regenerate=False):
+    """Run every Studio generation concurrently, yielding (key, result, error) as each finishes"""
+    # Retrieved contexts share the module's embedding index, and digests run their own
+    # concurrent map-reduce, so both are ready before the workers start: at most
+    # STUDIO_CONCURRENCY completions are then in flight
+    source = text_hash(module_data["text"])
+    materials = {
+        key: module_digest(module_data, key) if condenses(key) else module_context(module_data, query)
+        for key, (query, _, _) in STUDIO_JOBS.items()
+    }
+    client, cache = get_client(), get_response_cache()
+
+    def run(key):
+        _, build_prompt, parse = STUDIO_JOBS[key]
+        return parse(generate_content(
+            build_prompt(materials[key]), source, regenerate, VALID_OUTPUT.get(key), client, cache
+        ))
+
+    with ThreadPoolExecutor(max_workers=STUDIO_CONCURRENCY) as pool:
+        futures = {pool.submit(run, key): key for key in STUDIO_JOBS}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                yield key, future.result(), None
+            except Exception as e:
+                yield key, None, e
+
+
+# --- Interactive views ---
+# Fragments: answering a question or turning a card reruns only the fragment,
+# not the whole page, so interaction stays fast however big the course is
+def show_flashcard(index):
+    st.session_state.flash_index = index
+    st.session_state.flash_flipped = False
+
+
+def flip_flashcard():
+    st.session_state.flash_flipped = not st.session_state.flash_flipped
+
+
+@st.fragment
+def flashcard_deck(cards):
+    i = st.session_state.flash_index
+    q, a = cards[i]
+
+
+    st.write(f"Card {i+1}/{len(cards)}")
+
+
+    if not st.session_state.flash_flipped:
+        st.info(f"Q: {q.strip()}")
+    else:
+        st.success(f"A: {a.strip()}")
+
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.button("⬅ Prev", on_click=show_flashcard, args=(i - 1,), disabled=i == 0)
+    with col2:
+        st.button("🔄 Flip", on_click=flip_flashcard)
+    with col3:
+        st.button("➡ Next", on_click=show_flashcard, args=(i + 1,), disabled=i == len(cards) - 1)
+
+
+@st.fragment
+def quiz_panel(quiz):
+    for i, q in enumerate(quiz):
+        st.write(f"**Q{i+1}: {q['question']}**")
+        if i not in st.session_state.quiz_answers:
+            st.session_state.quiz_answers[i] = []
+
+
+        correct_ans = q["answer"]
+        if not isinstance(correct_ans, list):
+            correct_ans = [correct_ans]
+
+
+        if len(correct_ans) == 1:
+            selected = st.radio("Select an option:", q["options"], index=0, key=f"quiz_{i}")
+            st.session_state.quiz_answers[i] = [selected]
+        else:
+            selected_opts = []
+            for opt in q["options"]:
+                if st.checkbox(opt, key=f"quiz_{i}_{opt}"):
+                    selected_opts.append(opt)
+            st.session_state.quiz_answers[i] = selected_opts
+
+
+    if st.button("Submit Quiz"):
+        st.session_state.quiz_submitted = True
+
+
+    if st.session_state.quiz_submitted:
+        score = 0
+        st.write("---")
+        for i, q in enumerate(quiz):
+            user_ans = st.session_state.quiz_answers.get(i, [])
+            correct_ans = q["answer"]
+            if not isinstance(correct_ans, list):
+                correct_ans = [correct_ans]
+
+
+            if set(user_ans) == set(correct_ans):
+                score += 1
+                st.success(f"Q{i+1}: ✅ Correct")
+            else:
+                st.error(f"Q{i+1}: ❌ Wrong (Your: {user_ans}, Correct: {correct_ans})")
+
+
+        st.info(f"Final Score: {score}/{len(quiz)}")
 
 
 # --- Session State ---
@@ -49,6 +296,12 @@ if "flash_index" not in st.session_state:
     st.session_state.flash_index = 0
 if "flash_flipped" not in st.session_state:
     st.session_state.flash_flipped = False
+if "last_timing" not in st.session_state:
+    st.session_state.last_timing = None
+if "tracer" not in st.session_state:
+    st.session_state.tracer = Tracer()
+# Module-level so Studio worker threads can record spans too
+tracer = st.session_state.tracer
 
 
 # ================= PAGE 1: COURSE LIST =================
@@ -130,8 +383,19 @@ elif st.session_state.page == "content":
 
 
         if uploaded_file:
-            pdf_reader = PdfReader(uploaded_file)
-            module_data["text"] = "".join(page.extract_text() or "" for page in pdf_reader.pages)
+            # Only extract once per upload; reruns reuse the stored text
+            source_id = (uploaded_file.name, uploaded_file.size)
+            if module_data.get("source_id") != source_id:
+                progress = st.progress(0.0, text=f"Extracting {uploaded_file.name}...")
+                with tracer.span("process_pdf", file=uploaded_file.name) as span:
+                    module_data["text"] = engine.read_pdf(
+                        uploaded_file,
+                        page_markers=False,
+                        on_progress=lambda done, total: progress.progress(done / total, text=f"Extracting {uploaded_file.name}: page {done}/{total}")
+                    )
+                    span["chars"] = len(module_data["text"])
+                module_data["source_id"] = source_id
+                progress.empty()
         elif pasted_text.strip():
             module_data["text"] = pasted_text.strip()
 
@@ -139,15 +403,17 @@ elif st.session_state.page == "content":
     # --- CENTER: Dynamic View ---
     with center:
         st.header(f"💬 {course} → {module}")
+        # Streamed output from the Studio buttons is rendered here
+        live = st.container()
 
 
         if st.session_state.active_view == "chat":
             q_text = st.text_input("Ask a question")
             if st.button("Ask"):
                 if q_text.strip():
-                    q_prompt = f"Answer this based on:\n\n{module_data['text']}\n\nQ: {q_text}"
-                    ans = generate_content(q_prompt)
-                    st.markdown(f"**Answer:** {ans}")
+                    q_prompt = engine.question_prompt(module_context(module_data, q_text), q_text)
+                    st.markdown("**Answer:**")
+                    st.write_stream(stream_timed(q_prompt, text_hash(module_data["text"])))
                 else:
                     st.warning("Enter a question first.")
 
@@ -187,50 +453,7 @@ elif st.session_state.page == "content":
             if not module_data["quiz"]:
                 st.info("No quiz available. Click '🎯 Generate Quiz' in the Studio to create one.")
             else:
-                for i, q in enumerate(module_data["quiz"]):
-                    st.write(f"**Q{i+1}: {q['question']}**")
-                    if i not in st.session_state.quiz_answers:
-                        st.session_state.quiz_answers[i] = []
-
-
-                    correct_ans = q["answer"]
-                    if not isinstance(correct_ans, list):
-                        correct_ans = [correct_ans]
-
-
-                    if len(correct_ans) == 1:
-                        selected = st.radio("Select an option:", q["options"], index=0, key=f"quiz_{i}")
-                        st.session_state.quiz_answers[i] = [selected]
-                    else:
-                        selected_opts = []
-                        for opt in q["options"]:
-                            if st.checkbox(opt, key=f"quiz_{i}_{opt}"):
-                                selected_opts.append(opt)
-                        st.session_state.quiz_answers[i] = selected_opts
-
-
-                if st.button("Submit Quiz"):
-                    st.session_state.quiz_submitted = True
-
-
-                if st.session_state.quiz_submitted:
-                    score = 0
-                    st.write("---")
-                    for i, q in enumerate(module_data["quiz"]):
-                        user_ans = st.session_state.quiz_answers.get(i, [])
-                        correct_ans = q["answer"]
-                        if not isinstance(correct_ans, list):
-                            correct_ans = [correct_ans]
-
-
-                        if set(user_ans) == set(correct_ans):
-                            score += 1
-                            st.success(f"Q{i+1}: ✅ Correct")
-                        else:
-                            st.error(f"Q{i+1}: ❌ Wrong (Your: {user_ans}, Correct: {correct_ans})")
-
-
-                    st.info(f"Final Score: {score}/{len(module_data['quiz'])}")
+                quiz_panel(module_data["quiz"])
 
 
         elif st.session_state.active_view == "flashcards":
@@ -238,39 +461,19 @@ elif st.session_state.page == "content":
 
 
             if module_data["flashcards"]:
-                i = st.session_state.flash_index
-                q, a = module_data["flashcards"][i]
+                flashcard_deck(module_data["flashcards"])
 
 
-                st.write(f"Card {i+1}/{len(module_data['flashcards'])}")
-
-
-                if not st.session_state.flash_flipped:
-                    st.info(f"Q: {q.strip()}")
-                else:
-                    st.success(f"A: {a.strip()}")
-
-
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    if st.button("⬅ Prev") and i > 0:
-                        st.session_state.flash_index -= 1
-                        st.session_state.flash_flipped = False
-                        st.rerun()
-                with col2:
-                    if st.button("🔄 Flip"):
-                        st.session_state.flash_flipped = not st.session_state.flash_flipped
-                        st.rerun()
-                with col3:
-                    if st.button("➡ Next") and i < len(module_data["flashcards"]) - 1:
-                        st.session_state.flash_index += 1
-                        st.session_state.flash_flipped = False
-                        st.rerun()
+        if DEBUG and st.session_state.last_timing:
+            st.caption(st.session_state.last_timing.summary())
 
 
     # --- RIGHT: Studio ---
     with right:
         st.header("🎬 Studio")
+        # Results are saved per module text; tick to generate them again anyway
+        regenerate = st.checkbox("🔄 Regenerate", help="Ignore saved results and generate them again")
+        source = text_hash(module_data["text"])
 
 
         if st.button("💬 Ask"):
@@ -279,45 +482,34 @@ elif st.session_state.page == "content":
 
 
         if st.button("📝 Generate Notes"):
-            prompt = f"Summarize into study notes:\n\n{module_data['text']}"
-            module_data["notes"] = generate_content(prompt)
+            with live:
+                st.subheader("📝 Notes")
+                prompt = engine.notes_prompt(studio_material(module_data, "notes", NOTES_QUERY))
+                module_data["notes"] = st.write_stream(stream_timed(prompt, source, regenerate))
             st.session_state.active_view = "notes"
             st.rerun()
 
 
         if st.button("🧠 Generate Mindmap"):
-            prompt = f"Create a mindmap in Graphviz DOT format. Use 'digraph' syntax. Only return the DOT code. Content: {module_data['text'][:500]}"
-            mindmap_response = generate_content(prompt)
-            
-            # Clean and validate the response
-            dot_match = re.search(r'(digraph.*?})', mindmap_response, re.DOTALL | re.IGNORECASE)
-            if dot_match:
-                module_data["mindmap"] = dot_match.group(1)
-            else:
-                # Fallback simple mindmap
-                module_data["mindmap"] = """digraph G {
-    rankdir=TB;
-    node [shape=box, style=rounded];
-    "Main Topic" -> "Concept 1";
-    "Main Topic" -> "Concept 2";
-    "Main Topic" -> "Concept 3";
-    "Concept 1" -> "Detail 1";
-    "Concept 2" -> "Detail 2";
-    "Concept 3" -> "Detail 3";
-}"""
-            
+            with live:
+                prompt = engine.mindmap_prompt(studio_material(module_data, "mindmap", MINDMAP_QUERY))
+            module_data["mindmap"] = engine.parse_mindmap(generate_content(prompt, source, regenerate, VALID_OUTPUT["mindmap"]))
             st.session_state.active_view = "mindmap"
             st.rerun()
 
 
         if st.button("🎯 Generate Quiz"):
-            prompt = f"Generate 5 MCQs in JSON list with fields: question, options, answer. Use this text:\n\n{module_data['text']}"
-            raw = generate_content(prompt)
-            try:
-                raw_json = re.search(r"\[.*\]", raw, re.S)
-                module_data["quiz"] = json.loads(raw_json.group()) if raw_json else []
-            except:
-                module_data["quiz"] = []
+            prompt = engine.quiz_prompt(module_context(module_data, QUIZ_QUERY))
+            # Show each question as soon as its JSON object is complete
+            parser = JsonArrayStream()
+            chunks = []
+            with live:
+                st.subheader("🎯 Quiz")
+                for chunk in stream_timed(prompt, source, regenerate, VALID_OUTPUT["quiz"]):
+                    chunks.append(chunk)
+                    for q in parser.feed(chunk):
+                        st.write(f"**Q: {q.get('question', '')}**")
+            module_data["quiz"] = engine.parse_quiz_json("".join(chunks))
 
 
             if not module_data["quiz"]:
@@ -331,15 +523,49 @@ elif st.session_state.page == "content":
 
 
         if st.button("📖 Generate Flashcards"):
-            prompt = f"Generate 5 flashcards as Q&A pairs:\n\n{module_data['text']}"
-            output = generate_content(prompt)
-            module_data["flashcards"] = re.findall(r"Q:(.*?)A:(.*?)(?=Q:|$)", output, re.S)
+            prompt = engine.flashcards_prompt(module_context(module_data, FLASHCARDS_QUERY))
+            # Show each card as soon as the next one starts
+            parser = BlockStream(r"Q:", engine.parse_qa_pairs)
+            chunks = []
+            with live:
+                st.subheader("📖 Flashcards")
+                for chunk in stream_timed(prompt, source, regenerate, VALID_OUTPUT["flashcards"]):
+                    chunks.append(chunk)
+                    for q, a in parser.feed(chunk):
+                        st.info(f"Q: {q.strip()}")
+                for q, a in parser.close():
+                    st.info(f"Q: {q.strip()}")
+            module_data["flashcards"] = engine.parse_qa_pairs("".join(chunks))
             st.session_state.active_view = "flashcards"
             st.session_state.flash_index = 0
             st.session_state.flash_flipped = False
             st.rerun()
 
 
+        if st.button("⚡ Generate Everything"):
+            # All four generations run at once; each result is saved as soon as it arrives
+            start = time.perf_counter()
+            with st.status("Generating notes, mindmap, quiz and flashcards...") as status:
+                for key, result, error in generate_everything(module_data, regenerate):
+                    if error is not None:
+                        st.write(f"❌ {key}: {error}")
+                    else:
+                        module_data[key] = result
+                        st.write(f"✅ {key} ready ({time.perf_counter() - start:.1f}s)")
+                status.update(label=f"Studio generated in {time.perf_counter() - start:.1f}s", state="complete")
+
+            st.session_state.active_view = "notes"
+            st.session_state.quiz_submitted = False
+            st.session_state.quiz_answers = {}
+            st.session_state.flash_index = 0
+            st.session_state.flash_flipped = False
+            st.rerun()
+
+
     if st.button("⬅ Back to Modules"):
         st.session_state.page = "modules"
-        st.rerun()
\ No newline at end of file
+        st.rerun()
+
+
+if DEBUG:
+    show_trace_panel(tracer)
@@ -1,19 +1,21 @@
 import os
 import streamlit as st
-from PyPDF2 import PdfReader
-import json
 from datetime import datetime
-import docx
-from io import BytesIO
-
-# LangChain imports
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import FAISS
-from langchain.chains import RetrievalQA
-from langchain.agents import initialize_agent, Tool, AgentType
-from langchain.memory import ConversationBufferMemory
-from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import uuid
+
+from answer_cache import AnswerCache
+from response_cache import open_response_cache
+from chat_memory import MEMORY_TOKENS, history_tokens, make_memory
+from engine import (
+    build_study_assistant, file_type, index_documents, make_embeddings, make_llm,
+    parse_flashcards, parse_quiz, read_document
+)
+from index_registry import IndexRegistry
+from index_store import list_libraries, load_library
+from intent_router import FOLLOW_UP
+from streaming import DEBUG, BlockStream, LLMCallCounter, StreamHandler
+from tracing import Tracer, TracingCallback, show_trace_panel
+from vector_index import IncrementalIndex, library_key
 
 # --- Streamlit Config ---
 st.set_page_config(
@@ -104,17 +106,39 @@ if not OPENAI_API_KEY:
 # --- Initialize LLM ---
 @st.cache_resource
 def get_llm():
-    return ChatOpenAI(
-        openai_api_key=OPENAI_API_KEY, 
-        model_name="gpt-4",
-        temperature=0.3
-    )
+    return make_llm("gpt-4", api_key=OPENAI_API_KEY, temperature=0.3, streaming=True)
+
+@st.cache_resource
+def get_summary_llm():
+    # Folds old chat turns into the memory's rolling summary
+    return make_llm("gpt-4o-mini", api_key=OPENAI_API_KEY, temperature=0)
+
+@st.cache_resource
+def get_embeddings():
+    # Shared by every session; vectors persist on disk across restarts
+    return make_embeddings(api_key=OPENAI_API_KEY)
+
+@st.cache_resource
+def get_answer_cache():
+    # Shared by every session; answers are keyed by library hash
+    return AnswerCache(get_embeddings())
+
+@st.cache_resource
+def get_response_cache():
+    # Shared by every session; notes, flashcards and quizzes persist on disk across restarts
+    return open_response_cache()
 
-llm = get_llm()
+@st.cache_resource
+def get_index_registry():
+    # One registry per server process, so identical libraries share one index
+    return IndexRegistry()
 
 # --- Session State Initialization ---
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+get_index_registry().touch(st.session_state.session_id)
 if "vectorstore" not in st.session_state:
-    st.session_state.vectorstore = None
+    st.session_state.vectorstore = None  # made with the first document, see update_vectorstore
 if "documents" not in st.session_state:
     st.session_state.documents = {}  # {filename: {text, upload_time, size}}
 if "current_tab" not in st.session_state:
@@ -122,121 +146,198 @@ if "current_tab" not in st.session_state:
 if "conversation_history" not in st.session_state:
     st.session_state.conversation_history = []
 if "memory" not in st.session_state:
-    st.session_state.memory = ConversationBufferMemory(
-        memory_key="chat_history",
-        return_messages=True
-    )
+    st.session_state.memory = None  # made with the study assistant
 if "current_flashcards" not in st.session_state:
     st.session_state.current_flashcards = []
 if "current_quiz" not in st.session_state:
     st.session_state.current_quiz = []
 if "current_notes" not in st.session_state:
     st.session_state.current_notes = ""
+if "last_timing" not in st.session_state:
+    st.session_state.last_timing = None
+if "assistant" not in st.session_state:
+    st.session_state.assistant = None  # see build_study_assistant
+
+# Per chat path ("router", "agent", "cache"): queries answered, LLM calls, seconds
+if "route_stats" not in st.session_state:
+    st.session_state.route_stats = {}
+    st.session_state.last_route = None
+# Per chat turn: prompt tokens sent, and chat history tokens those prompts carried
+if "turn_tokens" not in st.session_state:
+    st.session_state.turn_tokens = []
+if "tracer" not in st.session_state:
+    st.session_state.tracer = Tracer(st.session_state.session_id)
+tracer = st.session_state.tracer
+# Passed with every LLM invocation so LLM calls and retrievals become trace spans
+tracing = TracingCallback(tracer)
 
 # --- Helper Functions ---
-def process_pdf(uploaded_file):
-    """Extract text from PDF with better error handling"""
+def process_file(uploaded_file):
+    """Extract text from a PDF, TXT or DOCX upload, reporting errors in the page"""
     try:
-        pdf = PdfReader(uploaded_file)
-        text = ""
-        for page_num, page in enumerate(pdf.pages):
-            page_text = page.extract_text()
-            if page_text:
-                text += f"\n--- Page {page_num + 1} ---\n{page_text}"
-        return text
-    except Exception as e:
-        st.error(f"Error processing {uploaded_file.name}: {str(e)}")
-        return ""
+        progress = st.progress(0.0, text=f"Processing {uploaded_file.name}...")
 
-def process_txt(uploaded_file):
-    """Process text files"""
-    try:
-        content = uploaded_file.read().decode('utf-8')
-        return content
-    except Exception as e:
-        st.error(f"Error processing {uploaded_file.name}: {str(e)}")
-        return ""
+        def show_progress(done, total):
+            span["pages"] = total
+            progress.progress(done / total, text=f"Extracting {uploaded_file.name}: page {done}/{total}")
 
-def process_docx(uploaded_file):
-    """Process Word documents"""
-    try:
-        doc = docx.Document(uploaded_file)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
+        with tracer.span(f"process_{file_type(uploaded_file.name).lower()}", file=uploaded_file.name) as span:
+            text = read_document(uploaded_file.name, uploaded_file, on_progress=show_progress)
+            span["chars"] = len(text)
+        progress.empty()
         return text
     except Exception as e:
         st.error(f"Error processing {uploaded_file.name}: {str(e)}")
         return ""
 
-def create_vectorstore(all_documents):
-    """Create FAISS vectorstore from multiple documents"""
+def update_vectorstore(all_documents):
+    """Point the session at the shared index for its library, embedding only new or changed documents"""
     try:
-        all_text = ""
-        for filename, doc_data in all_documents.items():
-            all_text += f"\n\n=== {filename} ===\n{doc_data['text']}"
-        
-        if not all_text.strip():
-            return None
-            
-        # Split text into chunks for better retrieval
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            separators=["\n\n", "\n", ". ", " "]
-        )
-        
-        chunks = text_splitter.split_text(all_text)
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        
-        return FAISS.from_texts(chunks, embeddings)
+        registry = get_index_registry()
+        if not all_documents:
+            registry.release(st.session_state.session_id)
+            st.session_state.vectorstore = None
+            return
+        # A persisted index is reused when this exact library was indexed before
+        embedded_before = get_embeddings().stats()["misses"]
+        with tracer.span("create_vectorstore", documents=len(all_documents)) as span:
+            st.session_state.vectorstore = registry.acquire(
+                st.session_state.session_id,
+                library_key(all_documents),
+                lambda: index_documents(all_documents, st.session_state.vectorstore or IncrementalIndex(get_embeddings())),
+                all_documents
+            )
+            span["chunks"] = st.session_state.vectorstore.chunk_count
+            span["texts_embedded"] = get_embeddings().stats()["misses"] - embedded_before
     except Exception as e:
-        st.error(f"Error creating vectorstore: {str(e)}")
-        return None
-
-def parse_flashcards(text):
-    """Parse flashcard text into structured format"""
-    cards = []
-    lines = text.split('\n')
-    current_card = {}
+        st.error(f"Error updating vectorstore: {str(e)}")
+
+# --- Interactive Widgets ---
+# Fragments: flipping a card or picking an answer reruns only the fragment,
+# not the CSS, sidebar, navigation and agent setup around it
+def show_card(index):
+    st.session_state.current_card_index = index
+
+def shuffle_cards():
+    import random
+    random.shuffle(st.session_state.current_flashcards)
+    st.session_state.current_card_index = 0
+
+def toggle_answer():
+    st.session_state.show_answer = not st.session_state.show_answer
+
+@st.fragment
+def flashcard_deck():
+    """Flashcard navigator; its buttons rerun only this fragment"""
+    cards = st.session_state.current_flashcards
+    st.write(f"**📊 {len(cards)} Flashcards Created**")
     
-    for line in lines:
-        line = line.strip()
-        if line.startswith('**Card') and ':' in line:
-            if current_card:
-                cards.append(current_card)
-            current_card = {'question': '', 'answer': ''}
-        elif line.startswith('Q:'):
-            current_card['question'] = line[2:].strip()
-        elif line.startswith('A:'):
-            current_card['answer'] = line[2:].strip()
+    # Flashcard navigator
+    if 'current_card_index' not in st.session_state:
+        st.session_state.current_card_index = 0
+    index = st.session_state.current_card_index
     
-    if current_card:
-        cards.append(current_card)
+    col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
     
-    return cards
-
-def parse_quiz(text):
-    """Parse quiz text into structured format"""
-    questions = []
-    lines = text.split('\n')
-    current_question = {}
+    with col1:
+        st.button("⬅️ Previous", on_click=show_card, args=(index - 1,), disabled=index == 0)
+    
+    with col2:
+        st.write(f"Card {index + 1} of {len(cards)}")
+    
+    with col4:
+        st.button("Next ➡️", on_click=show_card, args=(index + 1,), disabled=index == len(cards) - 1)
     
-    for line in lines:
-        line = line.strip()
-        if line.startswith('**Question') and ':' in line:
-            if current_question:
-                questions.append(current_question)
-            current_question = {'question': line.split(':', 1)[1].strip(), 'options': [], 'answer': ''}
-        elif line.startswith(('A)', 'B)', 'C)', 'D)')):
-            current_question['options'].append(line)
-        elif line.startswith('**Correct Answer:**'):
-            current_question['answer'] = line.replace('**Correct Answer:**', '').strip()
+    with col5:
+        st.button("🔄 Shuffle", on_click=shuffle_cards)
     
-    if current_question:
-        questions.append(current_question)
+    # Display current flashcard
+    current_card = cards[index]
     
-    return questions
+    # Show/hide answer functionality
+    if 'show_answer' not in st.session_state:
+        st.session_state.show_answer = False
+    
+    st.markdown('<div class="flashcard">', unsafe_allow_html=True)
+    st.write("### 🤔 Question:")
+    st.write(current_card['question'])
+    
+    st.button("👁️ Show Answer" if not st.session_state.show_answer else "🙈 Hide Answer", on_click=toggle_answer)
+    
+    if st.session_state.show_answer:
+        st.write("### ✅ Answer:")
+        st.write(current_card['answer'])
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+@st.fragment
+def quiz_panel():
+    """Quiz questions and results; answering reruns only this fragment"""
+    st.write(f"**📊 Quiz: {len(st.session_state.current_quiz)} Questions**")
+
+    # Initialize user answers if needed
+    if 'user_answers' not in st.session_state:
+        st.session_state.user_answers = {}
+
+    # Display quiz questions
+    for i, question in enumerate(st.session_state.current_quiz):
+        st.markdown(f'<div class="quiz-question">', unsafe_allow_html=True)
+        st.write(f"**Question {i+1}:** {question['question']}")
+
+        # Radio buttons for options
+        if question['options']:
+            selected = st.radio(
+                f"Choose your answer for Question {i+1}:",
+                question['options'],
+                key=f"q_{i}",
+                index=None
+            )
+            if selected:
+                st.session_state.user_answers[i] = selected[0]  # Store just the letter (A, B, C, D)
+
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    # Submit quiz button
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        if st.button("📊 Submit Quiz", type="primary"):
+            st.session_state.show_results = True
+
+    with col2:
+        if st.button("🔄 Reset Quiz"):
+            st.session_state.user_answers = {}
+            st.session_state.show_results = False
+
+    # Show results
+    if st.session_state.show_results and st.session_state.user_answers:
+        st.subheader("📊 Quiz Results")
+
+        correct = 0
+        total = len(st.session_state.current_quiz)
+
+        for i, question in enumerate(st.session_state.current_quiz):
+            user_answer = st.session_state.user_answers.get(i, "Not answered")
+            correct_answer = question['answer'].split('-')[0].strip() if question['answer'] else "N/A"
+
+            if user_answer == correct_answer:
+                correct += 1
+                st.success(f"✅ Question {i+1}: Correct! ({user_answer})")
+            else:
+                st.error(f"❌ Question {i+1}: Your answer: {user_answer}, Correct: {correct_answer}")
+                if question['answer']:
+                    st.info(f"💡 Explanation: {question['answer']}")
+
+        score_percentage = (correct / total) * 100
+        st.metric("Final Score", f"{correct}/{total} ({score_percentage:.1f}%)")
+
+        if score_percentage >= 80:
+            st.balloons()
+            st.success("🎉 Excellent work!")
+        elif score_percentage >= 60:
+            st.success("👍 Good job! Keep studying!")
+        else:
+            st.warning("📚 Keep studying! You'll get there!")
 
 # --- Sidebar: Document Management ---
 with st.sidebar:
@@ -251,33 +352,39 @@ with st.sidebar:
         help="Supported formats: PDF, TXT, DOCX"
     )
     
-    if uploaded_files:
-        for file in uploaded_files:
-            if file.name not in st.session_state.documents:
-                with st.spinner(f"Processing {file.name}..."):
-                    # Process based on file type
-                    if file.name.endswith('.pdf'):
-                        text = process_pdf(file)
-                    elif file.name.endswith('.txt'):
-                        text = process_txt(file)
-                    elif file.name.endswith('.docx'):
-                        text = process_docx(file)
-                    else:
-                        continue
-                    
-                    if text:
-                        st.session_state.documents[file.name] = {
-                            'text': text,
-                            'upload_time': datetime.now(),
-                            'size': len(text),
-                            'type': file.name.split('.')[-1].upper()
-                        }
-        
-        # Recreate vectorstore with all documents
-        if st.session_state.documents:
+    # Files stay in the uploader across reruns; only new ones need processing
+    new_files = [file for file in uploaded_files or [] if file.name not in st.session_state.documents]
+    if new_files:
+        for file in new_files:
+            with st.spinner(f"Processing {file.name}..."):
+                text = process_file(file)
+                if text:
+                    st.session_state.documents[file.name] = {
+                        'text': text,
+                        'upload_time': datetime.now(),
+                        'size': len(text),
+                        'type': file_type(file.name)
+                    }
+        
+        # Embed only the newly added documents
+        if any(file.name in st.session_state.documents for file in new_files):
             with st.spinner("Updating knowledge base..."):
-                st.session_state.vectorstore = create_vectorstore(st.session_state.documents)
-            st.success(f"✅ Processed {len(uploaded_files)} new document(s)")
+                update_vectorstore(st.session_state.documents)
+            st.success(f"✅ Processed {len(new_files)} new document(s)")
+            st.rerun()
+    
+    # Libraries pre-built with `python ingest.py` open without extracting or embedding
+    saved_libraries = list_libraries()
+    if saved_libraries:
+        st.subheader("🏫 Course Libraries")
+        chosen_library = st.selectbox("Open a pre-built library", saved_libraries)
+        if st.button("📚 Open Library"):
+            st.session_state.documents = {
+                filename: {**doc_data, 'upload_time': datetime.now()}
+                for filename, doc_data in (load_library(chosen_library) or {}).items()
+            }
+            with st.spinner("Opening library..."):
+                update_vectorstore(st.session_state.documents)
             st.rerun()
     
     # Document Library Display
@@ -288,6 +395,28 @@ with st.sidebar:
         
         st.metric("Documents", total_docs)
         st.metric("Total Characters", f"{total_size:,}")
+        cache_stats = get_embeddings().stats()
+        st.caption(f"Embedding cache: {cache_stats['hits']:,} hits • {cache_stats['misses']:,} misses")
+        answer_stats = get_answer_cache().stats()
+        st.caption(f"Answer cache: {answer_stats['hit_rate']:.0%} hit rate ({answer_stats['hits']:,} of {answer_stats['hits'] + answer_stats['misses']:,})")
+        response_stats = get_response_cache().stats()
+        st.caption(f"Saved results reused: {response_stats['hits']:,} of {response_stats['hits'] + response_stats['misses']:,}")
+        if st.session_state.vectorstore is not None:
+            search_counts = st.session_state.vectorstore.search_counts
+            st.caption(f"Retrieval: {search_counts['lexical']:,} lexical only (no query embedding) • {search_counts['hybrid']:,} hybrid")
+        registry_stats = get_index_registry().stats()
+        st.caption(
+            f"Shared indexes: {registry_stats['indexes']} • "
+            f"{registry_stats['memory_bytes'] / 2**20:,.1f} / {registry_stats['memory_budget'] / 2**20:,.0f} MB"
+        )
+        
+        # Questions, notes, quizzes and flashcards only search the chosen documents;
+        # a question naming one ("Chapter 5 notes") is scoped to it automatically
+        st.session_state.search_scope = [
+            filename for filename in st.session_state.get("search_scope", []) if filename in st.session_state.documents
+        ]
+        st.multiselect("🔎 Search only in", list(st.session_state.documents), key="search_scope",
+                       placeholder="All documents")
         
         # Document list with individual delete buttons
         for filename, doc_data in st.session_state.documents.items():
@@ -304,16 +433,13 @@ with st.sidebar:
             with col2:
                 if st.button("🗑️", key=f"del_{filename}", help=f"Delete {filename}"):
                     del st.session_state.documents[filename]
-                    if st.session_state.documents:
-                        st.session_state.vectorstore = create_vectorstore(st.session_state.documents)
-                    else:
-                        st.session_state.vectorstore = None
+                    update_vectorstore(st.session_state.documents)
                     st.rerun()
         
         # Clear all button
         if st.button("🗑️ Clear All Documents", type="secondary"):
             st.session_state.documents = {}
-            st.session_state.vectorstore = None
+            update_vectorstore(st.session_state.documents)
             st.session_state.conversation_history = []
             st.session_state.current_flashcards = []
             st.session_state.current_quiz = []
@@ -368,106 +494,33 @@ if not st.session_state.documents:
         st.markdown('<div class="tool-card"><strong>📚 Multi-Document Support</strong><br>Upload PDF, TXT, DOCX files</div>', unsafe_allow_html=True)
 
 else:
-    # Create retriever and tools
-    retriever = st.session_state.vectorstore.as_retriever(search_kwargs={"k": 5})
-    
-    # --- Enhanced Tool Functions ---
-    def answer_question(query):
-        """Enhanced Q&A with source context"""
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm, 
-            retriever=retriever,
-            return_source_documents=True
+    # Chains, tools and agent depend only on the library and the conversation
+    # memory, so ordinary reruns (switching tabs, flipping a card) reuse them
+    if st.session_state.memory is None:
+        # Recent turns verbatim, older ones summarised, within STUDYGEN_MEMORY_TOKENS
+        st.session_state.memory = make_memory(get_summary_llm())
+    search_filter = {"source": st.session_state.search_scope} if st.session_state.get("search_scope") else None
+    assistant = st.session_state.assistant
+    if (assistant is None or assistant["index"] is not st.session_state.vectorstore
+            or assistant["memory"] is not st.session_state.memory or assistant["filter"] != search_filter):
+        assistant = build_study_assistant(
+            st.session_state.vectorstore, st.session_state.memory, get_llm(), get_answer_cache(), search_filter,
+            get_response_cache()
         )
-        result = qa_chain({"query": query})
-        return f"**Answer:** {result['result']}\n\n**Sources:** Based on {len(result['source_documents'])} document sections"
+        st.session_state.assistant = assistant
+    library_key = assistant["key"]
+    agent, router = assistant["agent"], assistant["router"]
+    answer_question, generate_notes, create_flashcards, generate_quiz = (tool.func for tool in assistant["tools"])
     
-    def generate_notes(topic):
-        """Generate structured study notes"""
-        enhanced_query = f"""Generate comprehensive, well-structured study notes on '{topic}'. 
-        Format as:
-        ## {topic}
-        
-        ### Key Concepts:
-        - [List main concepts with brief explanations]
-        
-        ### Important Details:
-        - [Detailed explanations of complex points]
-        - [Include formulas, definitions, examples where relevant]
-        
-        ### Summary:
-        [Concise summary for quick review]
-        
-        ### Review Questions:
-        - [3-4 questions to test understanding]"""
-        
-        result = RetrievalQA.from_chain_type(llm=llm, retriever=retriever).run(enhanced_query)
-        return result
-    
-    def create_flashcards(topic="the uploaded material"):
-        """Generate flashcards in Q&A format"""
-        query = f"""Create 10 flashcards from {topic}. Format each as:
-        
-        **Card X:**
-        Q: [Clear, specific question]
-        A: [Concise but complete answer]
-        
-        Focus on key concepts, definitions, formulas, and important facts that students need to memorize."""
-        
-        result = RetrievalQA.from_chain_type(llm=llm, retriever=retriever).run(query)
-        return result
-    
-    def generate_quiz(topic="the uploaded material"):
-        """Generate multiple choice quiz"""
-        query = f"""Create an 8-question multiple choice quiz from {topic}.
-        
-        Format each question as:
-        **Question X:** [Question text]
-        A) [Option A]
-        B) [Option B] 
-        C) [Option C]
-        D) [Option D]
-        
-        **Correct Answer:** [Letter] - [Brief explanation why this is correct]
-        
-        Make questions progressively harder. Include a mix of factual recall and conceptual understanding."""
-        
-        result = RetrievalQA.from_chain_type(llm=llm, retriever=retriever).run(query)
-        return result
-    
-    # Define tools for the agent
-    tools = [
-        Tool(
-            name="Question Answering",
-            func=answer_question,
-            description="Answers specific questions from the study material with source references"
-        ),
-        Tool(
-            name="Notes Generator", 
-            func=generate_notes,
-            description="Creates structured, comprehensive study notes on any topic from the material"
-        ),
-        Tool(
-            name="Flashcard Creator",
-            func=create_flashcards,
-            description="Generates flashcards for active recall and memorization practice"
-        ),
-        Tool(
-            name="Quiz Generator",
-            func=generate_quiz,
-            description="Creates multiple choice quizzes to test knowledge and understanding"
-        )
-    ]
-    
-    # Initialize agent with memory
-    agent = initialize_agent(
-        tools=tools,
-        llm=llm,
-        agent=AgentType.CONVERSATIONAL_REACT_DESCRIPTION,
-        memory=st.session_state.memory,
-        verbose=False,
-        handle_parsing_errors=True
-    )
+    def record_route(path, counter, tool_name=None, history=0):
+        st.session_state.turn_tokens.append({"prompt tokens": counter.prompt_tokens, "history tokens": history})
+        stats = st.session_state.route_stats.setdefault(path, {"queries": 0, "calls": 0, "seconds": 0.0})
+        stats["queries"] += 1
+        stats["calls"] += counter.calls
+        stats["seconds"] += counter.elapsed
+        st.session_state.last_route = {
+            "path": path, "tool": tool_name, "calls": counter.calls, "seconds": counter.elapsed
+        }
     
     # --- Tab Content ---
     
@@ -498,9 +551,39 @@ else:
             ask_button = st.button("🚀 Ask", type="primary")
         
         if ask_button and user_query.strip():
+            live = st.empty()
             with st.spinner("🤔 Your AI assistant is thinking..."):
                 try:
-                    response = agent.run(user_query)
+                    counter = LLMCallCounter()
+                    history = history_tokens(st.session_state.memory)
+                    # Follow-ups and questions asked mid-conversation depend on this
+                    # conversation, so only a first, self-contained question is shared
+                    shareable = history == 0 and not FOLLOW_UP.search(user_query)
+                    response = get_answer_cache().lookup(library_key, "chat", user_query) if shareable else None
+                    route = router.route(user_query) if response is None else None
+                    if response is None and route is None:
+                        handler = StreamHandler(live.markdown)
+                        st.session_state.last_timing = handler.timer
+                        with tracer.span("agent.run", history_tokens=history) as span:
+                            response = agent.run(user_query, callbacks=[handler, counter, tracing])
+                            span.update(calls=counter.calls, tokens_in=counter.prompt_tokens)
+                        if shareable:
+                            get_answer_cache().store(library_key, "chat", user_query, response)
+                        record_route("agent", counter, history=history)
+                    else:
+                        if response is None:
+                            handler = StreamHandler(live.markdown)
+                            st.session_state.last_timing = handler.timer
+                            with tracer.span("tool", tool=route.tool.name) as span:
+                                response = route.tool.func(route.tool_input, callbacks=[handler, counter, tracing])
+                                span.update(calls=counter.calls, tokens_in=counter.prompt_tokens)
+                            if shareable:
+                                get_answer_cache().store(library_key, "chat", user_query, response)
+                            record_route("router", counter, route.tool.name)
+                        else:
+                            record_route("cache", counter)
+                        # Keep the conversation memory complete even when the agent is skipped
+                        st.session_state.memory.save_context({"input": user_query}, {"output": response})
                     
                     # Add to conversation history
                     st.session_state.conversation_history.append({
@@ -511,6 +594,7 @@ else:
                     
                 except Exception as e:
                     response = f"I encountered an error: {str(e)}. Please try rephrasing your question."
+            live.empty()
             
             # Display current response
             st.markdown('<div class="response-container">', unsafe_allow_html=True)
@@ -535,14 +619,19 @@ else:
             notes_topic = st.text_input("Enter topic for study notes:", placeholder="e.g., 'Photosynthesis', 'Chapter 3', 'Quantum Mechanics'")
         with col2:
             generate_notes_btn = st.button("📝 Generate Notes", type="primary")
+            regenerate = st.checkbox("🔄 Regenerate", key="regenerate_notes", help="Ignore the saved result and generate it again")
         
         if generate_notes_btn and notes_topic:
+            live = st.empty()
             with st.spinner("📚 Creating your study notes..."):
                 try:
-                    notes = generate_notes(notes_topic)
+                    handler = StreamHandler(live.markdown)
+                    st.session_state.last_timing = handler.timer
+                    notes = generate_notes(notes_topic, callbacks=[handler, tracing], regenerate=regenerate)
                     st.session_state.current_notes = notes
                 except Exception as e:
                     st.error(f"Error generating notes: {str(e)}")
+            live.empty()
         
         if st.session_state.current_notes:
             st.markdown('<div class="response-container">', unsafe_allow_html=True)
@@ -565,64 +654,30 @@ else:
             flashcard_topic = st.text_input("Create flashcards for:", placeholder="e.g., 'Biology terms', 'Math formulas', 'History dates'")
         with col2:
             create_flashcards_btn = st.button("🎯 Create Flashcards", type="primary")
+            regenerate = st.checkbox("🔄 Regenerate", key="regenerate_flashcards", help="Ignore the saved result and generate it again")
         
         if create_flashcards_btn and flashcard_topic:
+            live = st.empty()
+            cards_box = live.container()
+            # Render each card as soon as the next one starts streaming
+            card_stream = BlockStream(r"(?m)^\s*\*\*Card", parse_flashcards)
+            
+            def show_new_cards(text):
+                for card in card_stream.update(text):
+                    cards_box.markdown(f'<div class="flashcard"><strong>Q:</strong> {card["question"]}</div>', unsafe_allow_html=True)
+            
             with st.spinner("🎯 Creating your flashcards..."):
                 try:
-                    flashcard_text = create_flashcards(flashcard_topic)
+                    handler = StreamHandler(show_new_cards)
+                    st.session_state.last_timing = handler.timer
+                    flashcard_text = create_flashcards(flashcard_topic, callbacks=[handler, tracing], regenerate=regenerate)
                     st.session_state.current_flashcards = parse_flashcards(flashcard_text)
                 except Exception as e:
                     st.error(f"Error creating flashcards: {str(e)}")
+            live.empty()
         
         if st.session_state.current_flashcards:
-            st.write(f"**📊 {len(st.session_state.current_flashcards)} Flashcards Created**")
-            
-            # Flashcard navigator
-            if 'current_card_index' not in st.session_state:
-                st.session_state.current_card_index = 0
-            
-            col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
-            
-            with col1:
-                if st.button("⬅️ Previous") and st.session_state.current_card_index > 0:
-                    st.session_state.current_card_index -= 1
-                    st.rerun()
-            
-            with col2:
-                st.write(f"Card {st.session_state.current_card_index + 1} of {len(st.session_state.current_flashcards)}")
-            
-            with col4:
-                if st.button("Next ➡️") and st.session_state.current_card_index < len(st.session_state.current_flashcards) - 1:
-                    st.session_state.current_card_index += 1
-                    st.rerun()
-            
-            with col5:
-                if st.button("🔄 Shuffle"):
-                    import random
-                    random.shuffle(st.session_state.current_flashcards)
-                    st.session_state.current_card_index = 0
-                    st.rerun()
-            
-            # Display current flashcard
-            current_card = st.session_state.current_flashcards[st.session_state.current_card_index]
-            
-            # Show/hide answer functionality
-            if 'show_answer' not in st.session_state:
-                st.session_state.show_answer = False
-            
-            st.markdown('<div class="flashcard">', unsafe_allow_html=True)
-            st.write("### 🤔 Question:")
-            st.write(current_card['question'])
-            
-            if st.button("👁️ Show Answer" if not st.session_state.show_answer else "🙈 Hide Answer"):
-                st.session_state.show_answer = not st.session_state.show_answer
-                st.rerun()
-            
-            if st.session_state.show_answer:
-                st.write("### ✅ Answer:")
-                st.write(current_card['answer'])
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+            flashcard_deck()
     
     elif st.session_state.current_tab == "quiz":
         st.subheader("🧠 Interactive Quiz Mode")
@@ -632,11 +687,23 @@ else:
             quiz_topic = st.text_input("Create quiz on:", placeholder="e.g., 'Cell biology', 'World War II', 'Calculus'")
         with col2:
             create_quiz_btn = st.button("🧠 Create Quiz", type="primary")
+            regenerate = st.checkbox("🔄 Regenerate", key="regenerate_quiz", help="Ignore the saved result and generate it again")
         
         if create_quiz_btn and quiz_topic:
+            live = st.empty()
+            questions_box = live.container()
+            # Render each question as soon as the next one starts streaming
+            question_stream = BlockStream(r"(?m)^\s*\*\*Question", parse_quiz)
+            
+            def show_new_questions(text):
+                for question in question_stream.update(text):
+                    questions_box.markdown(f'<div class="quiz-question"><strong>Q:</strong> {question["question"]}</div>', unsafe_allow_html=True)
+            
             with st.spinner("🧠 Creating your quiz..."):
                 try:
-                    quiz_text = generate_quiz(quiz_topic)
+                    handler = StreamHandler(show_new_questions)
+                    st.session_state.last_timing = handler.timer
+                    quiz_text = generate_quiz(quiz_topic, callbacks=[handler, tracing], regenerate=regenerate)
                     st.session_state.current_quiz = parse_quiz(quiz_text)
                     if 'user_answers' not in st.session_state:
                         st.session_state.user_answers = {}
@@ -644,74 +711,10 @@ else:
                         st.session_state.show_results = False
                 except Exception as e:
                     st.error(f"Error creating quiz: {str(e)}")
+            live.empty()
         
         if st.session_state.current_quiz:
-            st.write(f"**📊 Quiz: {len(st.session_state.current_quiz)} Questions**")
-            
-            # Initialize user answers if needed
-            if 'user_answers' not in st.session_state:
-                st.session_state.user_answers = {}
-            
-            # Display quiz questions
-            for i, question in enumerate(st.session_state.current_quiz):
-                st.markdown(f'<div class="quiz-question">', unsafe_allow_html=True)
-                st.write(f"**Question {i+1}:** {question['question']}")
-                
-                # Radio buttons for options
-                if question['options']:
-                    selected = st.radio(
-                        f"Choose your answer for Question {i+1}:",
-                        question['options'],
-                        key=f"q_{i}",
-                        index=None
-                    )
-                    if selected:
-                        st.session_state.user_answers[i] = selected[0]  # Store just the letter (A, B, C, D)
-                
-                st.markdown('</div>', unsafe_allow_html=True)
-            
-            # Submit quiz button
-            col1, col2 = st.columns([1, 3])
-            with col1:
-                if st.button("📊 Submit Quiz", type="primary"):
-                    st.session_state.show_results = True
-                    st.rerun()
-            
-            with col2:
-                if st.button("🔄 Reset Quiz"):
-                    st.session_state.user_answers = {}
-                    st.session_state.show_results = False
-                    st.rerun()
-            
-            # Show results
-            if st.session_state.show_results and st.session_state.user_answers:
-                st.subheader("📊 Quiz Results")
-                
-                correct = 0
-                total = len(st.session_state.current_quiz)
-                
-                for i, question in enumerate(st.session_state.current_quiz):
-                    user_answer = st.session_state.user_answers.get(i, "Not answered")
-                    correct_answer = question['answer'].split('-')[0].strip() if question['answer'] else "N/A"
-                    
-                    if user_answer == correct_answer:
-                        correct += 1
-                        st.success(f"✅ Question {i+1}: Correct! ({user_answer})")
-                    else:
-                        st.error(f"❌ Question {i+1}: Your answer: {user_answer}, Correct: {correct_answer}")
-                        if question['answer']:
-                            st.info(f"💡 Explanation: {question['answer']}")
-                
-                score_percentage = (correct / total) * 100
-                st.metric("Final Score", f"{correct}/{total} ({score_percentage:.1f}%)")
-                
-                if score_percentage >= 80:
-                    st.balloons()
-                    st.success("🎉 Excellent work!")
-                elif score_percentage >= 60:
-                    st.success("👍 Good job! Keep studying!")
-                else:
-                    st.warning("📚 Keep studying! You'll get there!")
+            quiz_panel()
     
     elif st.session_state.current_tab == "qa":
         st.subheader("❓ Question & Answer Mode")
@@ -721,4 +724,23 @@ else:
         qa_question = st.text_area(
             "What would you like to know?",
             placeholder="e.g., 'What are the main causes of climate change?', 'Explain the process of photosynthesis', 'What is mentioned about quantum entanglement?'",
-            height=100)
\ No newline at end of file
+            height=100)
+    
+    if DEBUG and st.session_state.last_timing:
+        st.caption(st.session_state.last_timing.summary())
+    if DEBUG and st.session_state.last_route:
+        last = st.session_state.last_route
+        via = f"{last['path']} → {last['tool']}" if last["tool"] else last["path"]
+        report = f"🧭 {via} • {last['calls']} LLM call(s) • {last['seconds']:.2f}s"
+        agent_stats = st.session_state.route_stats.get("agent")
+        if last["path"] != "agent" and agent_stats:
+            saved_calls = agent_stats["calls"] / agent_stats["queries"] - last["calls"]
+            saved_seconds = agent_stats["seconds"] / agent_stats["queries"] - last["seconds"]
+            report += f" • saved ~{saved_calls:.1f} call(s), ~{saved_seconds:.2f}s vs. the agent average"
+        st.caption(report)
+    if DEBUG and st.session_state.turn_tokens:
+        st.caption(f"🧮 prompt tokens per chat turn (memory budget {MEMORY_TOKENS:,} tokens)")
+        st.line_chart(st.session_state.turn_tokens)
+
+if DEBUG:
+    show_trace_panel(tracer)
@@ -1,12 +1,14 @@
 import os
+import uuid
 import streamlit as st
-from PyPDF2 import PdfReader
 
-# LangChain imports (new style)
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import FAISS
-from langchain.chains import RetrievalQA
-from langchain.prompts import PromptTemplate
+from answer_cache import AnswerCache
+from engine import generate, index_documents, make_embeddings, make_llm, make_qa_chain, read_pdf
+from index_registry import IndexRegistry
+from index_store import list_libraries, load_library
+from streaming import DEBUG, StreamHandler
+from tracing import Tracer, TracingCallback, show_trace_panel
+from vector_index import IncrementalIndex, library_key
 
 # --- Streamlit App Config ---
 st.set_page_config(page_title="📚 Study Gen RAG Assistant", layout="wide")
@@ -18,36 +20,137 @@ if not OPENAI_API_KEY:
     st.stop()
 
 # --- Initialize LLM ---
-llm = ChatOpenAI(openai_api_key=OPENAI_API_KEY, model_name="gpt-4o-mini")
+@st.cache_resource
+def get_llm():
+    return make_llm("gpt-4o-mini", api_key=OPENAI_API_KEY, streaming=True)
+
+@st.cache_resource
+def get_embeddings():
+    # Shared by every session; vectors persist on disk across restarts
+    return make_embeddings(api_key=OPENAI_API_KEY)
+
+@st.cache_resource
+def get_answer_cache():
+    # Shared by every session; answers are keyed by library hash
+    return AnswerCache(get_embeddings())
+
+@st.cache_resource
+def get_index_registry():
+    # One registry per server process, so identical libraries share one index
+    return IndexRegistry()
+
+def run_streamed(prompt, qa):
+    """Run `qa` on `prompt`, streaming tokens into the page as they arrive"""
+    output = st.empty()
+    handler = StreamHandler(output.markdown)
+    result = generate(qa, prompt, callbacks=[handler, TracingCallback(tracer)])
+    output.write(result)
+    if DEBUG:
+        st.caption(handler.timer.summary())
+    return result
+
+def search_filter():
+    """Retrieval filter for the documents picked under "Search only in", or None for all"""
+    scope = st.session_state.get("search_scope")
+    return {"source": scope} if scope else None
+
+def get_qa_chain():
+    """The session's RetrievalQA chain, rebuilt only when its library index or search scope changes"""
+    index = st.session_state.vectorstore
+    cached = st.session_state.qa_chain
+    if cached is None or cached[0] is not index or cached[1] != search_filter():
+        cached = (index, search_filter(), make_qa_chain(get_llm(), index, filter=search_filter()))
+        st.session_state.qa_chain = cached
+    return cached[2]
 
 # --- Session State ---
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+get_index_registry().touch(st.session_state.session_id)
 if "vectorstore" not in st.session_state:
     st.session_state.vectorstore = None
+if "documents" not in st.session_state:
+    st.session_state.documents = {}  # {filename: {text}}
 if "sources" not in st.session_state:
     st.session_state.sources = []
+if "qa_chain" not in st.session_state:
+    st.session_state.qa_chain = None  # (library index, search filter, chain)
+if "tracer" not in st.session_state:
+    st.session_state.tracer = Tracer(st.session_state.session_id)
+tracer = st.session_state.tracer
+
+def update_vectorstore():
+    """Point the session at the index for its documents, embedding as little as possible"""
+    # Shares the index of any session with the same library, else opens the
+    # saved index, else embeds only the new files into a copy and saves it
+    index = st.session_state.vectorstore or IncrementalIndex(get_embeddings())
+    embedded_before = get_embeddings().stats()["misses"]
+    with tracer.span("create_vectorstore", documents=len(st.session_state.documents)) as span:
+        st.session_state.vectorstore = get_index_registry().acquire(
+            st.session_state.session_id,
+            library_key(st.session_state.documents),
+            lambda: index_documents(st.session_state.documents, index),
+            st.session_state.documents
+        )
+        span["chunks"] = st.session_state.vectorstore.chunk_count
+        span["texts_embedded"] = get_embeddings().stats()["misses"] - embedded_before
 
 # --- Sidebar ---
 st.sidebar.title("📂 Sources")
 uploaded_files = st.sidebar.file_uploader("Upload PDFs", type=["pdf"], accept_multiple_files=True)
 
-if uploaded_files:
-    for file in uploaded_files:
-        pdf = PdfReader(file)
-        text = ""
-        for page in pdf.pages:
-            text += page.extract_text()
-
-        # Create embeddings
-        embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        vectorstore = FAISS.from_texts([text], embeddings)
+new_files = [file for file in uploaded_files or [] if file.name not in st.session_state.documents]
+if new_files:
+    for file in new_files:
+        progress = st.sidebar.progress(0.0, text=f"Extracting {file.name}...")
+        with tracer.span("process_pdf", file=file.name) as span:
+            # Page markers give every chunk its page number for filtered retrieval
+            text = read_pdf(
+                file,
+                on_progress=lambda done, total: progress.progress(done / total, text=f"Extracting {file.name}: page {done}/{total}")
+            )
+            span["chars"] = len(text)
+        progress.empty()
 
         # Save in session
-        st.session_state.vectorstore = vectorstore
+        st.session_state.documents[file.name] = {"text": text}
         st.session_state.sources.append(file.name)
 
-    st.sidebar.success(f"✅ Uploaded: {', '.join([f.name for f in uploaded_files])}")
+    update_vectorstore()
+    st.sidebar.success(f"✅ Uploaded: {', '.join([f.name for f in new_files])}")
     st.rerun()  # 🔄 Fixed rerun call
 
+# Libraries pre-built with `python ingest.py` open without extracting or embedding
+saved_libraries = list_libraries()
+if saved_libraries:
+    chosen_library = st.sidebar.selectbox("Or open a pre-built library", saved_libraries)
+    if st.sidebar.button("📚 Open Library"):
+        st.session_state.documents = load_library(chosen_library) or {}
+        st.session_state.sources = list(st.session_state.documents)
+        if st.session_state.documents:
+            update_vectorstore()
+        st.rerun()
+
+if st.session_state.sources:
+    # Answers only use the chosen documents; a question naming one is scoped to it automatically
+    st.session_state.search_scope = [
+        filename for filename in st.session_state.get("search_scope", []) if filename in st.session_state.documents
+    ]
+    st.sidebar.multiselect("🔎 Search only in", st.session_state.sources, key="search_scope",
+                           placeholder="All documents")
+    cache_stats = get_embeddings().stats()
+    st.sidebar.caption(f"Embedding cache: {cache_stats['hits']:,} hits • {cache_stats['misses']:,} misses")
+    answer_stats = get_answer_cache().stats()
+    st.sidebar.caption(f"Answer cache: {answer_stats['hit_rate']:.0%} hit rate ({answer_stats['hits']:,} of {answer_stats['hits'] + answer_stats['misses']:,})")
+    if st.session_state.vectorstore is not None:
+        search_counts = st.session_state.vectorstore.search_counts
+        st.sidebar.caption(f"Retrieval: {search_counts['lexical']:,} lexical only (no query embedding) • {search_counts['hybrid']:,} hybrid")
+    registry_stats = get_index_registry().stats()
+    st.sidebar.caption(
+        f"Shared indexes: {registry_stats['indexes']} • "
+        f"{registry_stats['memory_bytes'] / 2**20:,.1f} / {registry_stats['memory_budget'] / 2**20:,.0f} MB"
+    )
+
 # --- Main Page ---
 st.title("📖 Study Gen – RAG + Agentic Assistant")
 
@@ -61,36 +164,41 @@ else:
         st.subheader("❓ Ask a Question")
         query = st.text_input("Enter your question")
         if query:
-            retriever = st.session_state.vectorstore.as_retriever()
-            qa = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
-            answer = qa.run(query)
             st.write("### Answer:")
-            st.write(answer)
+
+            # Repeated or near-identical questions skip retrieval and the LLM
+            answer_key = st.session_state.vectorstore.scoped_key(search_filter())
+            last_key, last_query, answer = st.session_state.get("last_answer", (None, None, None))
+            # Reruns keep the question in the box: only a new question is looked up
+            if (last_key, last_query) != (answer_key, query):
+                answer = get_answer_cache().lookup(answer_key, "qa", query)
+                if answer is None:
+                    answer = run_streamed(query, get_qa_chain())
+                    get_answer_cache().store(answer_key, "qa", query, answer)
+                else:
+                    st.write(answer)
+                st.session_state.last_answer = (answer_key, query, answer)
+            else:
+                st.write(answer)
 
     # --- Tab 2: Notes ---
     with tab2:
         st.subheader("📝 Generate Notes")
         topic = st.text_input("Enter topic for notes")
         if st.button("Generate Notes"):
-            retriever = st.session_state.vectorstore.as_retriever()
-            qa = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
-            notes = qa.run(f"Generate structured, concise study notes on {topic}")
-            st.write(notes)
+            notes = run_streamed(f"Generate structured, concise study notes on {topic}", get_qa_chain())
 
     # --- Tab 3: Flashcards ---
     with tab3:
         st.subheader("🎴 Flashcards")
         if st.button("Generate Flashcards"):
-            retriever = st.session_state.vectorstore.as_retriever()
-            qa = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
-            flashcards = qa.run("Generate 5 Q&A style flashcards from the study material.")
-            st.write(flashcards)
+            flashcards = run_streamed("Generate 5 Q&A style flashcards from the study material.", get_qa_chain())
 
     # --- Tab 4: Quiz ---
     with tab4:
         st.subheader("🧠 Quiz Generator")
         if st.button("Generate Quiz"):
-            retriever = st.session_state.vectorstore.as_retriever()
-            qa = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
-            quiz = qa.run("Generate a short quiz with 5 multiple-choice questions and answers.")
-            st.write(quiz)
+            quiz = run_streamed("Generate a short quiz with 5 multiple-choice questions and answers.", get_qa_chain())
+
+if DEBUG:
+    show_trace_panel(tracer)
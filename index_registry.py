@@ -0,0 +1,127 @@
+"""Process-wide registry of library indexes shared by all Streamlit sessions.
+
+Sessions that open the same library (same content hash) get the same index
+object, and the documents' raw text is kept once per document rather than
+once per session. Each index records which sessions hold it; indexes that
+no live session holds are evicted least-recently-used first whenever the
+registry grows past its memory budget.
+
+Shared indexes must never be modified in place. A session that changes its
+library works on `index.copy()` and registers the result under the new key.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from vector_index import document_id, document_metadata
+
+INDEX_MEMORY_MB = int(os.getenv("STUDYGEN_INDEX_MEMORY_MB", "1024"))
+SESSION_TTL = int(os.getenv("STUDYGEN_SESSION_TTL", "1800"))
+
+
+class _Entry:
+    def __init__(self, index):
+        self.index = index
+        self.holders = {}  # {session id: last seen}
+
+
+class IndexRegistry:
+    """Reference-counted, memory-bounded cache of IncrementalIndex objects"""
+
+    def __init__(self, memory_budget=None, session_ttl=SESSION_TTL):
+        self.memory_budget = INDEX_MEMORY_MB * 1024 * 1024 if memory_budget is None else memory_budget
+        self.session_ttl = session_ttl
+        self.evictions = 0
+        self._entries = OrderedDict()  # {library key: _Entry}, least recently used first
+        self._sessions = {}  # {session id: library key}
+        self._texts = {}  # {document id: text}
+        self._lock = threading.RLock()
+
+    def acquire(self, session_id, key, build, all_documents=None):
+        """Return the shared index for `key`, calling `build()` if nobody has it.
+
+        The session's previous library is released. If `all_documents` is
+        given, its texts are replaced by the registry's shared copies.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            # Build outside the lock: it may embed, and other sessions must not wait on it
+            index = build()
+            with self._lock:
+                entry = self._entries.setdefault(key, _Entry(index))
+
+        with self._lock:
+            self.release(session_id)
+            entry.holders[session_id] = time.time()
+            self._sessions[session_id] = key
+            self._entries.move_to_end(key)
+            if all_documents is not None:
+                self._share_texts(all_documents)
+            self._evict()
+            return entry.index
+
+    def release(self, session_id):
+        with self._lock:
+            key = self._sessions.pop(session_id, None)
+            if key in self._entries:
+                self._entries[key].holders.pop(session_id, None)
+
+    def touch(self, session_id):
+        """Mark a session as alive; call on every rerun"""
+        with self._lock:
+            key = self._sessions.get(session_id)
+            if key in self._entries:
+                self._entries[key].holders[session_id] = time.time()
+                self._entries.move_to_end(key)
+
+    def _share_texts(self, all_documents):
+        for filename, doc_data in all_documents.items():
+            # The same ID the index records, so _evict() sees the text as live
+            doc_id = document_id(filename, doc_data["text"], document_metadata(doc_data))
+            shared = self._texts.setdefault(doc_id, doc_data["text"])
+            doc_data["text"] = shared
+
+    def _live_holders(self, entry, now):
+        return [sid for sid, seen in entry.holders.items() if now - seen < self.session_ttl]
+
+    def _evict(self):
+        now = time.time()
+        for key in list(self._entries):
+            if self._memory_bytes() <= self.memory_budget:
+                break
+            entry = self._entries[key]
+            if self._live_holders(entry, now):
+                continue
+            for session_id in entry.holders:
+                self._sessions.pop(session_id, None)
+            del self._entries[key]
+            self.evictions += 1
+
+        # Texts only stay shared while some registered library still contains them
+        live_ids = {doc_id for entry in self._entries.values() for doc_id, _ in entry.index.documents.values()}
+        for doc_id in list(self._texts):
+            if doc_id not in live_ids:
+                del self._texts[doc_id]
+
+    def _memory_bytes(self):
+        indexes = sum(entry.index.memory_bytes() for entry in self._entries.values())
+        texts = sum(sys.getsizeof(text) for text in self._texts.values())
+        return indexes + texts
+
+    def memory_bytes(self):
+        with self._lock:
+            return self._memory_bytes()
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            return {
+                "indexes": len(self._entries),
+                "sessions": sum(len(self._live_holders(entry, now)) for entry in self._entries.values()),
+                "memory_bytes": self._memory_bytes(),
+                "memory_budget": self.memory_budget,
+                "evictions": self.evictions,
+            }
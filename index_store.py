@@ -0,0 +1,149 @@
+"""On-disk FAISS indexes keyed by library content hash.
+
+A library that has been indexed once, in any session or before a restart,
+is opened from disk instead of being extracted and embedded again.
+
+Named libraries (written by ingest.py) keep a library's document texts
+next to its index, so an app can open a whole pre-built course without
+any uploads. Their indexes are never pruned.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from disk_cache import CACHE_DIR
+from vector_index import IncrementalIndex, library_key, unread_folders
+
+INDEX_DIR = os.path.join(CACHE_DIR, "indexes")
+LIBRARY_DIR = os.path.join(CACHE_DIR, "libraries")
+MAX_SAVED_INDEXES = int(os.getenv("STUDYGEN_MAX_SAVED_INDEXES", "50"))
+
+
+def index_path(key):
+    return os.path.join(INDEX_DIR, key)
+
+
+def has_index(key):
+    return os.path.exists(os.path.join(index_path(key), "documents.json"))
+
+
+def save_index(index):
+    """Persist `index` under its library key. Returns the key."""
+    key = index.key
+    if has_index(key):
+        return key
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    # Write to a scratch directory first so readers never see half an index
+    scratch = tempfile.mkdtemp(dir=INDEX_DIR, prefix=".tmp-")
+    try:
+        index.save(scratch)
+        os.replace(scratch, index_path(key))
+    except OSError:
+        shutil.rmtree(scratch, ignore_errors=True)
+        if not has_index(key):
+            raise
+    prune_indexes()
+    return key
+
+
+def load_index(key, embeddings):
+    """Open a persisted index, or return None if this library was never saved"""
+    if not has_index(key):
+        return None
+    os.utime(index_path(key))  # mark as recently used for pruning
+    return IncrementalIndex.load(index_path(key), embeddings)
+
+
+def prune_indexes(keep=None):
+    """Delete the least recently used indexes beyond the configured limit.
+
+    Named libraries' indexes are kept, and so are indexes a session has
+    opened but not searched yet, which would otherwise fail on first search.
+    """
+    keep = MAX_SAVED_INDEXES if keep is None else keep
+    if not os.path.isdir(INDEX_DIR):
+        return
+    pinned = {library["key"] for library in _read_libraries()}
+    opened = unread_folders()
+    entries = []
+    for name in os.listdir(INDEX_DIR):
+        path = os.path.join(INDEX_DIR, name)
+        if name in pinned or os.path.abspath(path) in opened:
+            continue
+        if not name.startswith("."):
+            entries.append(path)
+        elif time.time() - os.path.getmtime(path) > 3600:
+            shutil.rmtree(path, ignore_errors=True)  # left behind by a crashed save
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for path in entries[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def update_library_index(index, all_documents):
+    """Return an index matching `all_documents`, embedding as little as possible.
+
+    If this exact library was persisted before it is opened from disk;
+    otherwise `index` is synced incrementally and then saved.
+    """
+    if not all_documents:
+        return IncrementalIndex(index.embeddings, index.text_splitter)
+    key = library_key(all_documents)
+    if index.key == key:
+        return index
+    saved = load_index(key, index.embeddings)
+    if saved is not None:
+        return saved
+    index.sync(all_documents)
+    save_index(index)
+    return index
+
+
+def library_name(name):
+    """`name` made safe to use as a file name"""
+    return re.sub(r"[^\w.-]+", "_", name.strip()).strip("._") or "library"
+
+
+def library_file(name):
+    return os.path.join(LIBRARY_DIR, f"{library_name(name)}.json")
+
+
+def save_library(name, all_documents, index):
+    """Persist a named library: its index and its {filename: {text, ...}} documents"""
+    key = save_index(index)
+    os.makedirs(LIBRARY_DIR, exist_ok=True)
+    fd, scratch = tempfile.mkstemp(dir=LIBRARY_DIR, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"name": library_name(name), "key": key, "saved": time.time(), "documents": all_documents}, f)
+    os.replace(scratch, library_file(name))
+    return key
+
+
+def list_libraries():
+    """Names of the saved libraries, alphabetically"""
+    if not os.path.isdir(LIBRARY_DIR):
+        return []
+    return sorted(name[:-len(".json")] for name in os.listdir(LIBRARY_DIR)
+                  if name.endswith(".json") and not name.startswith("."))
+
+
+def load_library(name):
+    """The {filename: {text, ...}} documents of a saved library, or None"""
+    try:
+        with open(library_file(name), encoding="utf-8") as f:
+            return json.load(f)["documents"]
+    except FileNotFoundError:
+        return None
+
+
+def _read_libraries():
+    libraries = []
+    for name in list_libraries():
+        try:
+            with open(library_file(name), encoding="utf-8") as f:
+                libraries.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return libraries
@@ -0,0 +1,182 @@
+"""Bulk ingestion: pre-build a course library from a directory of study files.
+
+    python ingest.py SEMESTER_DIR --name biology-101 [--workers 8]
+
+Every PDF, DOCX and TXT file under the directory is read with the same
+readers the apps use, several files at a time, then chunked and embedded
+with the apps' splitter and embedding cache and saved as a named library
+with its persisted index. Every chunk records its file, page, course (the
+library) and module (the file's top-level folder) for filtered retrieval.
+The agent and RAG apps list saved libraries in their sidebar and open one
+without extracting or embedding anything.
+
+Interrupted runs resume where they stopped: each extracted file is
+checkpointed and reused while the file is unchanged, and chunks that were
+already embedded come back from the embedding cache.
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from engine import SUPPORTED_TYPES, build_index, file_type, make_embeddings, read_document
+from index_store import LIBRARY_DIR, library_name, save_library
+from text_normalize import NORMALIZE
+from vector_index import IncrementalIndex, document_id, document_metadata
+
+INGEST_WORKERS = int(os.getenv("STUDYGEN_INGEST_WORKERS", str(os.cpu_count() or 1)))
+EMBED_WORKERS = int(os.getenv("STUDYGEN_EMBED_WORKERS", "4"))
+
+
+def find_files(root):
+    """Supported files under `root`, as sorted paths relative to it"""
+    found = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if file_type(name).lower() in SUPPORTED_TYPES and not name.startswith("."):
+                found.append(os.path.relpath(os.path.join(directory, name), root))
+    return sorted(found)
+
+
+def checkpoint_file(checkpoint_dir, root, relpath):
+    """Where the text of this version of a file is checkpointed"""
+    stat = os.stat(os.path.join(root, relpath))
+    # Text normalized differently (STUDYGEN_NORMALIZE) is a different checkpoint
+    digest = hashlib.sha256(f"{relpath}\0{stat.st_size}\0{stat.st_mtime_ns}\0{NORMALIZE}".encode("utf-8")).hexdigest()
+    return os.path.join(checkpoint_dir, f"{digest[:32]}.txt")
+
+
+def extract(path, checkpoint):
+    """Read one file (in a worker process) and checkpoint its text"""
+    # One process per file already; large PDFs must not start a pool of their own
+    text = read_document(path, path, workers=1)
+    scratch = f"{checkpoint}.tmp-{os.getpid()}"
+    with open(scratch, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(scratch, checkpoint)
+    return text
+
+
+def read_checkpoint(checkpoint):
+    with open(checkpoint, encoding="utf-8") as f:
+        return f.read()
+
+
+def extract_all(root, files, checkpoint_dir, workers, log):
+    """{relative path: text} for every file, reusing checkpoints from earlier runs"""
+    texts = {}
+    pending = {}
+    for relpath in files:
+        checkpoint = checkpoint_file(checkpoint_dir, root, relpath)
+        if os.path.exists(checkpoint):
+            texts[relpath] = read_checkpoint(checkpoint)
+        else:
+            pending[relpath] = checkpoint
+    if texts:
+        log(f"Resuming: {len(texts)} of {len(files)} files already extracted")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(extract, os.path.join(root, relpath), checkpoint): relpath
+            for relpath, checkpoint in pending.items()
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            relpath = futures[future]
+            try:
+                texts[relpath] = future.result()
+                log(f"[{done}/{len(futures)}] {relpath}: {len(texts[relpath]):,} chars")
+            except Exception as e:
+                log(f"[{done}/{len(futures)}] {relpath}: skipped ({type(e).__name__}: {e})")
+    return texts
+
+
+def embed_all(all_documents, embeddings, workers, log):
+    """Embed every chunk to be stored into the embedding cache, several documents at a time.
+
+    Chunks are split, and near duplicates found, exactly as
+    IncrementalIndex does when it builds the index afterwards, so it finds
+    every vector it needs in the cache.
+    """
+    planner = IncrementalIndex(embeddings)  # only used to split and deduplicate
+    # Planning is cheap but order-dependent, so it runs in the order sync() will use
+    plans = {}
+    reused = 0
+    for filename, doc_data in all_documents.items():
+        metadata = document_metadata(doc_data)
+        doc_id = document_id(filename, doc_data["text"], metadata)
+        chunks, stand_ins = planner.plan_document(filename, doc_id, doc_data["text"], metadata)
+        plans[filename] = [text for chunk_id, text, _ in chunks if chunk_id not in stand_ins]
+        reused += len(stand_ins)
+    if reused:
+        log(f"{reused:,} near-duplicate chunks will reuse another chunk's vector")
+
+    def embed(filename):
+        chunks = plans[filename]
+        if chunks:
+            embeddings.embed_documents(chunks)
+        return len(chunks)
+
+    total = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(embed, filename): filename for filename in all_documents}
+        for done, future in enumerate(as_completed(futures), start=1):
+            total += future.result()
+            log(f"[{done}/{len(futures)}] embedded {futures[future]}")
+    return total
+
+
+def ingest(root, name, workers=INGEST_WORKERS, embed_workers=EMBED_WORKERS, log=print):
+    """Build and save the library `name` from the files under `root`. Returns its key."""
+    name = library_name(name)
+    files = find_files(root)
+    if not files:
+        raise ValueError(f"No {', '.join(SUPPORTED_TYPES).upper()} files under {root}")
+    checkpoint_dir = os.path.join(LIBRARY_DIR, f".{name}.partial")
+    os.makedirs(checkpoint_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    texts = extract_all(root, files, checkpoint_dir, workers, log)
+    # The library is the course; a file's top-level folder (week1/, chapter5/) is its module
+    all_documents = {
+        relpath: {"text": text, "size": len(text), "type": file_type(relpath), "course": name,
+                  "module": relpath.split(os.sep)[0] if os.sep in relpath else ""}
+        for relpath, text in sorted(texts.items()) if text.strip()
+    }
+    log(f"Extracted {len(all_documents)} documents in {time.perf_counter() - started:.1f}s")
+
+    embeddings = make_embeddings()
+    started = time.perf_counter()
+    chunks = embed_all(all_documents, embeddings, embed_workers, log)
+    stats = embeddings.stats()
+    log(f"Embedded {chunks:,} chunks in {time.perf_counter() - started:.1f}s "
+        f"({stats['misses']:,} new, {stats['hits']:,} from the cache)")
+
+    index = build_index(all_documents, embeddings)
+    key = save_library(name, all_documents, index)
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    log(f"Saved library '{name}' ({len(all_documents)} documents, {index.chunk_count:,} chunks)")
+    return key
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="folder of PDF, DOCX and TXT files (searched recursively)")
+    parser.add_argument("--name", help="library name shown in the apps (default: the folder name)")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="files extracted at once")
+    parser.add_argument("--embed-workers", type=int, default=EMBED_WORKERS, help="documents embedded at once")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+    name = args.name or os.path.basename(os.path.abspath(args.directory))
+    try:
+        ingest(args.directory, name, args.workers, args.embed_workers)
+    except ValueError as e:
+        sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Local intent router in front of the study agent.
+
+Most chat requests plainly ask for one tool ("make flashcards on enzymes",
+"what is osmosis?"). Sending those through the ReAct agent costs a
+reasoning LLM call before the tool runs and usually a rephrasing call
+after it. The router recognises them with keyword rules plus word overlap
+with the tools' own descriptions and dispatches straight to the tool.
+Anything ambiguous, or anything that leans on the conversation so far,
+returns None and should go to the agent.
+"""
+import re
+from collections import Counter, namedtuple
+
+Route = namedtuple("Route", ["tool", "tool_input"])
+
+# Phrases that clearly ask for one tool, keyed by tool name
+TOOL_KEYWORDS = {
+    "Quiz Generator": r"\bquiz(?:zes)?\b|\bmcqs?\b|multiple[- ]choice|\btest me\b",
+    "Flashcard Creator": r"\bflash ?cards?\b|\brecall cards?\b",
+    "Notes Generator": r"\bnotes?\b|\bsummar(?:y|ies|ize|ise)\b|\boutline\b|\bcheat ?sheet\b",
+}
+QUESTION_TOOL = "Question Answering"
+QUESTION_START = re.compile(
+    r"^\s*(what|why|how|who|whom|when|where|which|explain|define|describe|"
+    r"is|are|does|do|did|can|could|should|would|list|compare)\b",
+    re.IGNORECASE,
+)
+# Requests that depend on earlier turns need the agent's memory
+FOLLOW_UP = re.compile(
+    r"\b(that|this|it|those|these|them|again|above|previous|earlier|last one|more simply|"
+    r"you said|same)\b",
+    re.IGNORECASE,
+)
+COMMAND_PREFIX = re.compile(
+    r"^\s*(?:please\s+)?(?:can you\s+|could you\s+)?"
+    r"(?:create|make|generate|give me|write|build|prepare|produce|do)?\s*"
+    r"(?:me\s+)?(?:a|an|some|the|\d+)?\s*(?:short\s+|quick\s+|detailed\s+)?",
+    re.IGNORECASE,
+)
+# "Quiz me on enzymes": what follows the tool keyword before the topic
+TOPIC_PREFIX = re.compile(
+    r"^\s*(?:me\b\s*)?(?:(?:on|about|for|from|of|covering|regarding)\s+)?", re.IGNORECASE
+)
+# "What should go in my notes?" and "Do my notes mention enzymes?" mention a
+# tool but ask a question about it ("do a quiz" is still a request)
+QUESTION_FORM = re.compile(
+    r"^\s*(?:what|why|how|who|whom|when|where|which|is|are|was|were|am|does|did|"
+    r"do(?!\s+(?:a|an|some|\d+)\b)|can|could|should|would|will|shall|may|might|must|has|have|had)\b"
+    r"|\?\s*$",
+    re.IGNORECASE,
+)
+# "Could you make a quiz on enzymes?" is a request in question form
+POLITE_REQUEST = re.compile(
+    r"^\s*(?:please\s+)?(?:can|could|would|will)\s+you\s+(?:please\s+)?"
+    r"(?:create|make|generate|give me|write|build|prepare|produce|do)\b",
+    re.IGNORECASE,
+)
+# Command verbs say nothing about which tool is meant
+STOP_WORDS = {"and", "any", "for", "from", "the", "with", "to", "create", "generate", "make"}
+
+
+def _words(text):
+    words = re.findall(r"[a-z]+", text.lower())
+    return [word[:-1] if word.endswith("s") and not word.endswith("ss") else word
+            for word in words if len(word) > 2 and word not in STOP_WORDS]
+
+
+class IntentRouter:
+    """Routes plain requests to one of the agent's tools without an LLM call"""
+
+    def __init__(self, tools):
+        self.tools = {tool.name: tool for tool in tools}
+        # Words that appear in exactly one tool description identify that tool
+        description_words = {tool.name: set(_words(tool.description)) for tool in tools}
+        counts = Counter(word for words in description_words.values() for word in words)
+        self.signature_words = {
+            name: {word for word in words if counts[word] == 1}
+            for name, words in description_words.items()
+        }
+
+    def _scores(self, query):
+        words = set(_words(query))
+        scores = {}
+        for name in self.tools:
+            score = len(words & self.signature_words.get(name, set()))
+            pattern = TOOL_KEYWORDS.get(name)
+            if pattern and re.search(pattern, query, re.IGNORECASE):
+                score += 2
+            scores[name] = score
+        return scores
+
+    def route(self, query):
+        """Return Route(tool, tool_input) for a clear request, else None"""
+        if not query.strip() or FOLLOW_UP.search(query):
+            return None
+
+        scores = self._scores(query)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (best, best_score), (_, runner_up) = ranked[0], ranked[1] if len(ranked) > 1 else (None, 0)
+
+        if best != QUESTION_TOOL and best_score >= 2 and best_score - runner_up >= 2 \
+                and (not QUESTION_FORM.search(query) or POLITE_REQUEST.search(query)):
+            return Route(self.tools[best], self.extract_topic(query, best))
+        if QUESTION_TOOL in self.tools and max(scores.get(name, 0) for name in TOOL_KEYWORDS) == 0:
+            if QUESTION_START.search(query) or query.rstrip().endswith("?"):
+                return Route(self.tools[QUESTION_TOOL], query.strip())
+        return None
+
+    def extract_topic(self, query, tool_name):
+        """Strip the command phrase: "Make 10 flashcards on enzymes" -> "enzymes" """
+        text = COMMAND_PREFIX.sub("", query, count=1)
+        text = re.sub(r"^.*?(?:" + TOOL_KEYWORDS[tool_name] + r")", "", text, count=1, flags=re.IGNORECASE)
+        text = TOPIC_PREFIX.sub("", text, count=1).strip(" .?!")
+        return text or "the uploaded material"
@@ -0,0 +1,134 @@
+"""BM25 inverted index over a library's chunks, kept next to its FAISS index.
+
+Dense search needs an embedding API call for every query just to start.
+Questions that name something specific (a formula, a person, a defined
+term) are usually answered better, and with no network round trip, by
+the chunks that contain those exact words. LexicalIndex scores chunks with
+BM25 from in-memory postings and says whether a query is confidently
+lexical: every rare term it contains (one found in only a small share of
+the chunks) occurs together in at least one chunk. Stopwords and short
+tokens never count as rare, and a library of fewer than
+STUDYGEN_LEXICAL_MIN_CHUNKS chunks is never confident: there, "a small
+share" is a posting or two, which ordinary words reach, so a plain
+question would skip dense retrieval.
+
+Chunks are added and removed by ID, alongside the FAISS index, so the
+postings follow the library incrementally.
+"""
+import math
+import os
+import re
+from collections import Counter
+
+# BM25 term-frequency saturation and length normalisation
+BM25_K1 = 1.5
+BM25_B = 0.75
+# A term is rare when at most this share of the chunks contain it
+RARE_FRACTION = float(os.getenv("STUDYGEN_RARE_TERM_FRACTION", "0.02"))
+# Terms in more than this share of the chunks barely change BM25 rankings but
+# have the longest postings, so scoring skips them (postings this short never are)
+COMMON_FRACTION = 0.5
+COMMON_MIN_POSTINGS = 100
+# Fewer chunks than this and every query also runs dense retrieval
+LEXICAL_MIN_CHUNKS = int(os.getenv("STUDYGEN_LEXICAL_MIN_CHUNKS", "50"))
+# Rare terms are at least this long and not stopwords
+MIN_RARE_TERM_CHARS = 3
+STOP_WORDS = frozenset(
+    "about after all also and any are been before being between both but can could did does doing down during "
+    "each few for from further had has have having her here hers him his how into its just more most not now "
+    "off once only other our out over own same she should some such than that the their them then there these "
+    "they this those through too under until very was were what when where which while who whom why will with "
+    "would you your".split()
+)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class LexicalIndex:
+    """BM25 postings for a set of chunks, by chunk ID"""
+
+    def __init__(self):
+        self.postings = {}  # {term: {chunk id: term count}}
+        self.lengths = {}  # {chunk id: token count}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, chunk_id, text):
+        terms = Counter(tokenize(text))
+        for term, count in terms.items():
+            self.postings.setdefault(term, {})[chunk_id] = count
+        length = sum(terms.values())
+        self.lengths[chunk_id] = length
+        self.total_length += length
+
+    def remove(self, chunk_ids, texts):
+        """Drop chunks; `texts` are their texts, to find their postings without a scan"""
+        for chunk_id, text in zip(chunk_ids, texts):
+            if chunk_id not in self.lengths:
+                continue
+            for term in set(tokenize(text)):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self.postings[term]
+            self.total_length -= self.lengths.pop(chunk_id)
+
+    def copy(self):
+        other = type(self)()
+        other.postings = {term: dict(postings) for term, postings in self.postings.items()}
+        other.lengths = dict(self.lengths)
+        other.total_length = self.total_length
+        return other
+
+    def idf(self, term):
+        frequency = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.lengths) - frequency + 0.5) / (frequency + 0.5))
+
+    def rare_terms(self, query):
+        """Query terms (not stopwords or short tokens) that occur in the index but in at most RARE_FRACTION of its chunks"""
+        limit = max(1, RARE_FRACTION * len(self.lengths))
+        return {
+            term for term in tokenize(query)
+            if len(term) >= MIN_RARE_TERM_CHARS and term not in STOP_WORDS
+            and 0 < len(self.postings.get(term, ())) <= limit
+        }
+
+    def confident(self, query, allowed=None):
+        """Whether `query` has rare terms and some (allowed) chunk contains all of them.
+
+        The lexical hits for such a query can stand on their own. A library
+        under LEXICAL_MIN_CHUNKS chunks is too small to tell rare terms apart.
+        """
+        if len(self.lengths) < LEXICAL_MIN_CHUNKS:
+            return False
+        rare = self.rare_terms(query)
+        if not rare:
+            return False
+        together = set.intersection(*(set(self.postings[term]) for term in rare))
+        return any(allowed is None or chunk_id in allowed for chunk_id in together)
+
+    def search(self, query, k, allowed=None):
+        """[(chunk id, BM25 score)] best first for `query`, optionally only among `allowed` IDs"""
+        if not self.lengths:
+            return []
+        average_length = self.total_length / len(self.lengths)
+        common = max(COMMON_FRACTION * len(self.lengths), COMMON_MIN_POSTINGS)
+        scores = Counter()
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings or len(postings) > common:
+                continue
+            idf = self.idf(term)
+            for chunk_id, count in postings.items():
+                if allowed is not None and chunk_id not in allowed:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[chunk_id] / average_length)
+                scores[chunk_id] += idf * count * (BM25_K1 + 1) / (count + norm)
+        return scores.most_common(k)
@@ -0,0 +1,266 @@
+"""Shared HTTP layer for every OpenAI call: rate limits, retries, pooling and coalescing.
+
+The OpenAI SDK client and LangChain's ChatOpenAI and OpenAIEmbeddings all
+send through http_client(), one httpx client per process, so every
+session of an app shares it. Its transport:
+
+- waits for the model's token buckets (requests and tokens per minute)
+  before each attempt, so a classroom of sessions queues briefly instead
+  of collecting 429s. The limits are the account's, learned from the
+  x-ratelimit-limit-* headers of the API's responses, unless
+  STUDYGEN_RATE_LIMITS sets them
+- retries 429s, 5xx responses and connection errors up to
+  STUDYGEN_MAX_RETRIES times, with full-jitter exponential backoff that
+  never waits less than the server's Retry-After
+- keeps up to STUDYGEN_MAX_CONNECTIONS pooled keep-alive connections
+- coalesces identical non-streaming requests: while one is in flight, the
+  same request from another session waits for its response instead of
+  being sent again (single flight)
+
+The SDK's own retries are turned off where the clients are made, so each
+attempt is rate limited and backed off here.
+"""
+import functools
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+import httpx
+
+MAX_RETRIES = int(os.getenv("STUDYGEN_MAX_RETRIES", "6"))
+MAX_CONNECTIONS = int(os.getenv("STUDYGEN_MAX_CONNECTIONS", "32"))
+# "model=requests/tokens per minute", comma-separated ("*" is every other model);
+# models not listed use the limits the API reports
+RATE_LIMITS = os.getenv("STUDYGEN_RATE_LIMITS", "")
+# Buckets hold one second of their rate: the API enforces per-minute limits
+# over shorter windows, so a full minute's burst would still be refused
+BURST_SECONDS = 1
+RETRY_BASE = 0.5
+RETRY_CAP = 30.0
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+# Response headers that no longer apply once the body is read and decoded
+REPLAY_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+def parse_rate_limits(spec):
+    """{model: (requests per minute, tokens per minute)} from a STUDYGEN_RATE_LIMITS string"""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, rates = entry.partition("=")
+        requests, _, tokens = rates.partition("/")
+        limits[model.strip()] = (float(requests), float(tokens or 0))
+    return limits
+
+
+class TokenBucket:
+    """`per_minute` units a minute, bursting to BURST_SECONDS' worth"""
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Take `amount` units and return the seconds to wait before using them.
+
+        The level may go below zero, so later callers queue behind this one.
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            self.level -= amount
+            return max(0.0, -self.level / self.rate)
+
+
+class ModelLimits:
+    """Request and token buckets per model"""
+
+    def __init__(self, limits=None):
+        self.limits = parse_rate_limits(RATE_LIMITS) if limits is None else dict(limits)
+        self._buckets = {}
+        self._learned = {}  # {model: (requests, tokens) per minute the API last reported}
+        self._lock = threading.Lock()
+
+    def buckets(self, model):
+        with self._lock:
+            if model not in self._buckets:
+                self._buckets[model] = self._make_buckets(self.limits.get(model) or self.limits.get("*") or (0, 0))
+            return self._buckets[model]
+
+    @staticmethod
+    def _make_buckets(limits):
+        requests, tokens = limits
+        return (TokenBucket(requests) if requests else None, TokenBucket(tokens) if tokens else None)
+
+    def learn(self, model, headers):
+        """Take `model`'s limits from a response's x-ratelimit-limit-* headers, unless they were configured"""
+        if not model or model in self.limits or "*" in self.limits:
+            return
+        try:
+            limits = (float(headers.get("x-ratelimit-limit-requests", 0)),
+                      float(headers.get("x-ratelimit-limit-tokens", 0)))
+        except ValueError:
+            return
+        # Compared as reported: rebuilding the buckets would forget the waits already owed
+        with self._lock:
+            if any(limits) and limits != self._learned.get(model):
+                self._learned[model] = limits
+                self._buckets[model] = self._make_buckets(limits)
+
+    def wait(self, model, tokens):
+        """Block until `model` can take one more request of about `tokens` tokens; returns the seconds waited"""
+        delay = max([bucket.reserve(amount) for bucket, amount in zip(self.buckets(model), (1, tokens)) if bucket] or [0.0])
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+def retry_after(response):
+    """Seconds the server asked us to wait, or None"""
+    try:
+        if "retry-after-ms" in response.headers:
+            return float(response.headers["retry-after-ms"]) / 1000
+        if "retry-after" in response.headers:
+            return float(response.headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def backoff(attempt):
+    """Full-jitter exponential backoff before retry number `attempt` (from 0)"""
+    return random.uniform(0, min(RETRY_CAP, RETRY_BASE * 2 ** attempt))
+
+
+class _Flight:
+    """One in-flight request that identical requests wait for"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None  # (status, headers, content)
+        self.error = None
+
+
+class ClientTransport(httpx.BaseTransport):
+    """Rate-limiting, retrying, coalescing wrapper around a pooled transport"""
+
+    def __init__(self, transport, limits=None, max_retries=MAX_RETRIES):
+        self.transport = transport
+        self.limits = limits or ModelLimits()
+        self.max_retries = max_retries
+        self.stats = Counter()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def count(self, **fields):
+        with self._lock:
+            self.stats.update(fields)
+
+    def handle_request(self, request):
+        body = request.read()
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            payload = {}
+        if request.method != "POST" or payload.get("stream"):
+            return self._send(request, payload, len(body))
+
+        # The API key is part of the key: different accounts never share a response
+        key = hashlib.sha256(b"\0".join([
+            str(request.url).encode(), request.headers.get("authorization", "").encode(), body
+        ])).hexdigest()
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            self.count(coalesced=1)
+            if flight.error is not None:
+                raise flight.error
+            return self._replay(flight.result, request)
+
+        try:
+            response = self._send(request, payload, len(body))
+            flight.result = (response.status_code, response.headers, response.read())
+            response.close()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+        return self._replay(flight.result, request)
+
+    @staticmethod
+    def _replay(result, request):
+        status, headers, content = result
+        headers = [(name, value) for name, value in headers.items() if name.lower() not in REPLAY_DROPPED_HEADERS]
+        return httpx.Response(status, headers=headers, content=content, request=request)
+
+    def _send(self, request, payload, size):
+        """Send with rate limiting and retries; the last response or error is returned or raised"""
+        model = payload.get("model", "")
+        tokens = size // 4 + int(payload.get("max_tokens") or 0)
+        for attempt in range(self.max_retries + 1):
+            waited = self.limits.wait(model, tokens)
+            self.count(requests=1, waited_seconds=waited)
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+                self.count(connection_errors=1)
+                delay = backoff(attempt)
+            else:
+                self.limits.learn(model, response.headers)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                self.count(**{f"status_{response.status_code}": 1})
+                delay = max(retry_after(response) or 0.0, backoff(attempt))
+                response.close()
+            self.count(retries=1)
+            time.sleep(delay)
+
+    def close(self):
+        self.transport.close()
+
+
+def pooled_transport(limits=None, max_retries=MAX_RETRIES, max_connections=MAX_CONNECTIONS):
+    """ClientTransport over a pool of up to `max_connections` keep-alive connections"""
+    pool = httpx.HTTPTransport(limits=httpx.Limits(
+        max_connections=max_connections, max_keepalive_connections=max_connections
+    ))
+    return ClientTransport(pool, limits, max_retries)
+
+
+def make_http_client(transport):
+    return httpx.Client(transport=transport, timeout=httpx.Timeout(600.0, connect=5.0), follow_redirects=True)
+
+
+@functools.lru_cache(maxsize=None)
+def shared_transport():
+    return pooled_transport()
+
+
+@functools.lru_cache(maxsize=None)
+def http_client():
+    """The process-wide client every OpenAI call goes through"""
+    return make_http_client(shared_transport())
+
+
+def stats():
+    """Counters of the shared client: requests, retries, status_429, coalesced, waited_seconds, ..."""
+    transport = shared_transport()
+    with transport._lock:
+        return dict(transport.stats)
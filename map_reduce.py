@@ -0,0 +1,76 @@
+"""Map-reduce condensing of documents too long for one prompt.
+
+Notes and mindmaps built from the chunks most similar to a query see only
+a prompt's worth of a long module, so a whole-book summary leaves most of
+the book out. condense() instead covers all of it: the text is chunked and
+the chunks grouped into parts that fit the prompt budget, every part is
+summarized concurrently (the map), and the summaries are merged a budget's
+worth at a time, again concurrently, until they fit in one prompt (the
+reduce). The caller builds its final prompt from the result.
+
+A job keeps at most STUDYGEN_MAP_CONCURRENCY calls in flight. Rate limits
+are left to the shared client (llm_client), which every call goes through
+and which already queues calls to stay within the account's limits.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from context_pack import CONTEXT_TOKEN_BUDGET, chunk_text, count_tokens
+
+MAP_REDUCE = os.getenv("STUDYGEN_MAP_REDUCE", "1") != "0"
+MAP_CONCURRENCY = int(os.getenv("STUDYGEN_MAP_CONCURRENCY", "8"))
+# Merge rounds before giving up on the summaries fitting the budget
+MAX_LEVELS = 6
+
+
+def group_texts(texts, budget):
+    """Consecutive `texts` joined into parts of at most `budget` tokens (a longer text is a part of its own)"""
+    parts, part, used = [], [], 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if part and used + tokens > budget:
+            parts.append("\n\n".join(part))
+            part, used = [], 0
+        part.append(text)
+        used += tokens
+    if part:
+        parts.append("\n\n".join(part))
+    return parts
+
+
+def trim_to_budget(texts, budget):
+    """`texts` joined, each cut to an equal share of `budget` tokens"""
+    share = budget / sum(count_tokens(text) for text in texts)
+    return "\n\n".join(text[:int(len(text) * share)] for text in texts)
+
+
+def condense(text, map_prompt, merge_prompt, complete, budget=CONTEXT_TOKEN_BUDGET, concurrency=MAP_CONCURRENCY,
+             on_progress=None):
+    """`text` if it fits in `budget` tokens, else a map-reduce summary of all of it that does.
+
+    `map_prompt(part)` asks for a summary of one part and
+    `merge_prompt(summaries)` for one summary of consecutive summaries;
+    `complete(prompt)` returns the model's reply. `on_progress(level,
+    done, total)` is called as each call of a round finishes (level 0 is
+    the map). At most `concurrency` calls run at once.
+    """
+    if count_tokens(text) <= budget:
+        return text
+    parts = group_texts(chunk_text(text), budget)
+    build_prompt = map_prompt
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for level in range(MAX_LEVELS):
+            futures = {pool.submit(complete, build_prompt(part)): i for i, part in enumerate(parts)}
+            summaries = [None] * len(parts)
+            for done, future in enumerate(as_completed(futures), start=1):
+                summaries[futures[future]] = future.result()
+                if on_progress:
+                    on_progress(level, done, len(parts))
+            condensed = "\n\n".join(summaries)
+            if count_tokens(condensed) <= budget:
+                return condensed
+            merged = group_texts(summaries, budget)
+            if len(merged) >= len(parts):
+                break  # the summaries are not getting shorter
+            parts, build_prompt = merged, merge_prompt
+    return trim_to_budget(summaries, budget)
@@ -0,0 +1,122 @@
+"""MinHash near-duplicate detection for chunks, before they are embedded.
+
+Students upload overlapping material: slides and the notes of the same
+lecture, or two versions of a handout. Their chunks would be embedded
+twice and, worse, retrieved together, filling the prompt with the same
+passage several times. NearDuplicateIndex keeps a MinHash signature of
+word shingles for every stored chunk, bucketed with locality-sensitive
+hashing, so a new chunk is compared only with the few chunks that share a
+bucket. A chunk whose estimated Jaccard similarity to a stored one reaches
+DUPLICATE_THRESHOLD, and that has no words the stored one lacks, is a near
+duplicate of it: it is still stored with its own text, but takes the
+stored chunk's vector instead of being embedded. (A chunk that adds even
+one word, say a planted fact's term, is embedded so dense search can find
+it.)
+Search shows only the first of chunks that reach COPY_THRESHOLD, the
+near-exact copies left by re-exported or re-uploaded files.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+DEDUPLICATE = os.getenv("STUDYGEN_DEDUPLICATE", "0") != "0"
+# Estimated Jaccard similarity of word shingles at which two chunks are near duplicates
+DUPLICATE_THRESHOLD = float(os.getenv("STUDYGEN_DUPLICATE_THRESHOLD", "0.8"))
+# ... and at which one is a copy of the other, which search does not return twice
+COPY_THRESHOLD = float(os.getenv("STUDYGEN_COPY_THRESHOLD", "0.95"))
+SHINGLE_WORDS = 3
+PERMUTATIONS = 64
+# 16 bands of 4 rows: pairs at the threshold share a bucket with ~99.9% probability
+BANDS = 16
+
+_PRIME = (1 << 61) - 1
+_random = np.random.RandomState(20240917)
+_A = _random.randint(1, 1 << 30, size=(PERMUTATIONS, 1), dtype=np.int64).astype(np.uint64)
+_B = _random.randint(0, 1 << 30, size=(PERMUTATIONS, 1), dtype=np.int64).astype(np.uint64)
+
+
+def shingles(text):
+    """Hashes of the overlapping SHINGLE_WORDS-word sequences of `text`"""
+    words = text.lower().split()
+    grams = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=4).digest(), "little") for gram in grams],
+        dtype=np.uint64,
+    )
+
+
+def word_hashes(text):
+    """Sorted hashes of the distinct words of `text`"""
+    return np.unique(np.array(
+        [int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest(), "little")
+         for word in set(text.lower().split())],
+        dtype=np.uint32,
+    ))
+
+
+def signature(text):
+    """MinHash signature: the minimum of each of PERMUTATIONS hash functions over the shingles"""
+    # 32-bit shingle hashes times 30-bit factors stay below 2**64, so nothing wraps before the modulus
+    return ((_A * shingles(text)[None, :] + _B) % _PRIME).min(axis=1)
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(first == second))
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of stored chunks, with LSH buckets for fast lookup"""
+
+    def __init__(self, threshold=DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self.signatures = {}  # {chunk id: signature}
+        self.words = {}  # {chunk id: word_hashes}
+        self.buckets = {}  # {(band, band hash): {chunk ids}}
+
+    def __len__(self):
+        return len(self.signatures)
+
+    @staticmethod
+    def _bands(sig):
+        rows = PERMUTATIONS // BANDS
+        return [(band, sig[band * rows:(band + 1) * rows].tobytes()) for band in range(BANDS)]
+
+    def find(self, sig, words):
+        """ID of a stored chunk that `sig` nearly duplicates and that has all of `words`, or None"""
+        candidates = set()
+        for key in self._bands(sig):
+            candidates |= self.buckets.get(key, set())
+        best, best_similarity = None, self.threshold
+        for chunk_id in candidates:
+            score = similarity(sig, self.signatures[chunk_id])
+            if score >= best_similarity and np.isin(words, self.words[chunk_id], assume_unique=True).all():
+                best, best_similarity = chunk_id, score
+        return best
+
+    def add(self, chunk_id, sig, words):
+        self.signatures[chunk_id] = sig
+        self.words[chunk_id] = words
+        for key in self._bands(sig):
+            self.buckets.setdefault(key, set()).add(chunk_id)
+
+    def remove(self, chunk_ids):
+        for chunk_id in chunk_ids:
+            sig = self.signatures.pop(chunk_id, None)
+            self.words.pop(chunk_id, None)
+            if sig is None:
+                continue
+            for key in self._bands(sig):
+                bucket = self.buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(chunk_id)
+                    if not bucket:
+                        del self.buckets[key]
+
+    def copy(self):
+        other = type(self)(self.threshold)
+        other.signatures = dict(self.signatures)
+        other.words = dict(self.words)
+        other.buckets = {key: set(ids) for key, ids in self.buckets.items()}
+        return other
@@ -0,0 +1,108 @@
+"""Parallel, streaming PDF text extraction shared by the Study Gen apps.
+
+Pages are extracted in batches on a process pool and yielded in order as a
+generator, with at most a few batches in flight at once, so memory stays
+bounded on very large textbooks. Small files are extracted in-process,
+where the pool start-up would cost more than it saves. PyPDF2 is imported
+on first use, so apps only pay for it once someone uploads a PDF.
+"""
+import io
+import multiprocessing
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+PageText = namedtuple("PageText", ["number", "text"])  # number is 1-based
+
+PDF_WORKERS = int(os.getenv("STUDYGEN_PDF_WORKERS", str(os.cpu_count() or 1)))
+PAGES_PER_TASK = 16
+SERIAL_PAGE_LIMIT = 32
+
+_worker_reader = None
+
+
+def _init_worker(data):
+    from PyPDF2 import PdfReader
+
+    global _worker_reader
+    _worker_reader = PdfReader(io.BytesIO(data))
+
+
+def _extract_range(start, stop):
+    return [_worker_reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def read_bytes(source):
+    """Contents of a path, bytes or file-like object such as a Streamlit upload"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    source.seek(0)
+    return source.read()
+
+
+def _pool_context():
+    # Forking a threaded server process (Streamlit) is unsafe; prefer forkserver
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def iter_pdf_pages(source, workers=None, on_progress=None):
+    """Yield PageText(number, text) for every page of a PDF, in page order.
+
+    `source` may be a path, raw bytes or a file-like object such as a
+    Streamlit upload. `on_progress(done, total)` is called after each batch.
+    """
+    from PyPDF2 import PdfReader
+
+    data = read_bytes(source)
+    reader = PdfReader(io.BytesIO(data))
+    total = len(reader.pages)
+    workers = workers or PDF_WORKERS
+
+    if workers <= 1 or total <= SERIAL_PAGE_LIMIT:
+        for i, page in enumerate(reader.pages):
+            yield PageText(i + 1, page.extract_text() or "")
+            if on_progress:
+                on_progress(i + 1, total)
+        return
+
+    ranges = deque((start, min(start + PAGES_PER_TASK, total)) for start in range(0, total, PAGES_PER_TASK))
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=_pool_context(),
+        initializer=_init_worker,
+        initargs=(data,)
+    )
+    try:
+        # Keep two batches per worker in flight; results are consumed in order
+        pending = deque()
+        while ranges and len(pending) < workers * 2:
+            start, stop = ranges.popleft()
+            pending.append((start, pool.submit(_extract_range, start, stop)))
+        del reader
+
+        done = 0
+        while pending:
+            start, future = pending.popleft()
+            texts = future.result()
+            if ranges:
+                next_start, next_stop = ranges.popleft()
+                pending.append((next_start, pool.submit(_extract_range, next_start, next_stop)))
+            for offset, text in enumerate(texts):
+                yield PageText(start + offset + 1, text)
+            done += len(texts)
+            if on_progress:
+                on_progress(done, total)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def extract_pdf_text(source, workers=None, on_progress=None):
+    """Extract a whole PDF into one string without quadratic concatenation"""
+    return "".join(page.text for page in iter_pdf_pages(source, workers, on_progress))
@@ -0,0 +1,62 @@
+"""Persistent cache of generated study material.
+
+Completions are stored on disk under a hash of the model, the prompt and
+the source they were generated from (a module's text, or a library and
+search scope), so generating notes or a quiz again from unchanged
+material costs no second completion, in any session and after restarts.
+Regenerating skips the lookup and replaces the stored response.
+"""
+import hashlib
+import os
+
+from disk_cache import CACHE_DIR, DiskLRUCache
+
+RESPONSE_CACHE = os.getenv("STUDYGEN_RESPONSE_CACHE", "1") != "0"
+RESPONSE_CACHE_MB = int(os.getenv("STUDYGEN_RESPONSE_CACHE_MB", "128"))
+
+
+def response_key(model, prompt, source):
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{model}\0{prompt_hash}\0{source}".encode("utf-8")).hexdigest()
+
+
+def open_response_cache(path=None, max_bytes=None):
+    return ResponseCache(DiskLRUCache(
+        path or os.path.join(CACHE_DIR, "responses.sqlite3"),
+        max_bytes if max_bytes is not None else RESPONSE_CACHE_MB * 1024 * 1024
+    ))
+
+
+class ResponseCache:
+    """Completions by (model, prompt, source hash), in a DiskLRUCache"""
+
+    def __init__(self, cache, enabled=RESPONSE_CACHE):
+        self.cache = cache
+        self.enabled = enabled
+
+    def lookup(self, model, prompt, source):
+        """The stored completion, or None"""
+        if not self.enabled:
+            return None
+        value = self.cache.get(response_key(model, prompt, source))
+        return value.decode("utf-8") if value is not None else None
+
+    def store(self, model, prompt, source, response):
+        if self.enabled and response:
+            self.cache.set(response_key(model, prompt, source), response.encode("utf-8"))
+
+    def get_or_generate(self, model, prompt, source, generate, regenerate=False, valid=None):
+        """The stored completion, or `generate()`'s; `regenerate` always generates.
+
+        A new completion is stored for next time only if `valid(response)` (when given) is true,
+        so output that failed to parse is generated again rather than reused.
+        """
+        response = None if regenerate else self.lookup(model, prompt, source)
+        if response is None:
+            response = generate()
+            if valid is None or valid(response):
+                self.store(model, prompt, source, response)
+        return response
+
+    def stats(self):
+        return self.cache.stats()
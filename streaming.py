@@ -0,0 +1,201 @@
+"""Helpers for streaming LLM output to the UI.
+
+StreamTimer measures time-to-first-token, StreamHandler forwards LangChain
+tokens to a callback, LLMCallCounter counts the LLM calls and prompt tokens
+behind one answer, and the incremental parsers turn a token stream into
+flashcards / quiz questions as soon as each one is complete, so the apps can
+render items before the whole completion has arrived.
+"""
+import json
+import os
+import re
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from context_pack import count_tokens
+
+DEBUG = os.getenv("STUDYGEN_DEBUG", "") not in ("", "0", "false")
+
+
+class StreamTimer:
+    """Wall-clock timing of one streamed completion"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token = None
+        self.end = None
+
+    def mark(self):
+        now = time.perf_counter()
+        if self.first_token is None:
+            self.first_token = now
+        self.end = now
+
+    @property
+    def ttft(self):
+        return None if self.first_token is None else self.first_token - self.start
+
+    @property
+    def total(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    def wrap(self, chunks):
+        """Pass a chunk iterator through, recording when chunks arrive"""
+        for chunk in chunks:
+            if chunk:
+                self.mark()
+                yield chunk
+
+    def summary(self):
+        ttft = "n/a" if self.ttft is None else f"{self.ttft:.2f}s"
+        return f"⏱️ first token {ttft} • total {self.total:.2f}s"
+
+
+class StreamHandler(BaseCallbackHandler):
+    """LangChain callback that forwards generated tokens to `render(text)`.
+
+    `text` is the output of the LLM call currently streaming. When an agent
+    makes several calls, each new call starts from an empty text, and agent
+    reasoning is hidden until its final "AI:" answer begins.
+    """
+
+    def __init__(self, render, answer_prefix="AI:"):
+        self.render = render
+        self.answer_prefix = answer_prefix
+        self.timer = StreamTimer()
+        self.text = ""
+        self._raw = ""
+
+    def on_llm_start(self, *args, **kwargs):
+        self._raw = ""
+
+    def on_chat_model_start(self, *args, **kwargs):
+        self._raw = ""
+
+    def on_llm_new_token(self, token, **kwargs):
+        self._raw += token
+        visible = self._raw
+        if visible.lstrip().startswith("Thought"):
+            # ReAct reasoning: only the final answer is worth showing
+            _, found, answer = visible.partition(self.answer_prefix)
+            if not found:
+                return
+            visible = answer.lstrip()
+        elif "Thought".startswith(visible.lstrip()):
+            return  # too short to tell reasoning from an answer yet
+        if visible:
+            self.timer.mark()
+            self.text = visible
+            self.render(visible)
+
+
+class LLMCallCounter(BaseCallbackHandler):
+    """LangChain callback that counts the LLM calls and prompt tokens behind one query"""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.start = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.calls += 1
+        self.prompt_tokens += sum(count_tokens(prompt) for prompt in prompts)
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+        self.prompt_tokens += sum(
+            count_tokens(message.content if isinstance(message.content, str) else json.dumps(message.content))
+            for batch in messages for message in batch
+        )
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+class BlockStream:
+    """Incrementally split a token stream into blocks that start with `start_pattern`.
+
+    Each complete block is passed to `parse_block`, which returns a list of
+    items. A block is complete once the next block has started, or when
+    close() is called at the end of the stream.
+    """
+
+    def __init__(self, start_pattern, parse_block):
+        self.start_re = re.compile(start_pattern)
+        self.parse_block = parse_block
+        self.buffer = ""
+        self.seen = 0
+
+    def update(self, text):
+        """Feed the part of the accumulated `text` not seen yet"""
+        if len(text) < self.seen:
+            # A new LLM call started over; its text replaces what we had
+            self.buffer, self.seen = "", 0
+        chunk, self.seen = text[self.seen:], len(text)
+        return self.feed(chunk)
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        starts = [m.start() for m in self.start_re.finditer(self.buffer)]
+        if len(starts) < 2:
+            return []
+        items = []
+        for begin, end in zip(starts, starts[1:]):
+            items.extend(self.parse_block(self.buffer[begin:end]))
+        self.buffer = self.buffer[starts[-1]:]
+        return items
+
+    def close(self):
+        match = self.start_re.search(self.buffer)
+        items = self.parse_block(self.buffer[match.start():]) if match else []
+        self.buffer = ""
+        return items
+
+
+class JsonArrayStream:
+    """Incrementally yield the objects of a JSON array as each one closes"""
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.started = False
+        self.current = []
+
+    def feed(self, chunk):
+        items = []
+        for char in chunk:
+            if not self.started:
+                self.started = char == "["
+                self.depth = 1 if self.started else 0
+                continue
+            if self.depth >= 2:
+                self.current.append(char)
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+                if self.depth == 2:
+                    self.current = [char]
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 1:
+                    try:
+                        item = json.loads("".join(self.current))
+                    except ValueError:
+                        item = None
+                    if isinstance(item, dict):
+                        items.append(item)
+                    self.current = []
+                elif self.depth == 0:
+                    self.started = False
+        return items
@@ -0,0 +1,82 @@
+"""Normalization between text extraction and chunking.
+
+Text extracted from PDFs carries a lot that is not content: running
+headers and footers and page numbers repeated on every page, words split
+across line breaks with a hyphen, and runs of spaces and blank lines. All
+of it would be chunked, embedded and pasted into prompts. This module
+removes it page by page, so page boundaries (and the page numbers used for
+citations) survive:
+
+- boilerplate: lines among the first or last few of a page whose text,
+  with digits ignored, recurs at the edges of many pages
+- hyphenation: "photo-\\nsynthesis" becomes "photosynthesis"
+- whitespace: runs of spaces and tabs become one space, lines are
+  stripped and blank lines are collapsed to one
+"""
+import os
+import re
+from collections import Counter
+
+NORMALIZE = os.getenv("STUDYGEN_NORMALIZE", "1") != "0"
+# Lines this close to the top or bottom of a page may be headers or footers
+EDGE_LINES = 3
+# An edge line is boilerplate when it recurs on this share of the pages (and on at least MIN_REPEATS)
+BOILERPLATE_FRACTION = 0.2
+MIN_REPEATS = 3
+
+HYPHENATED_BREAK = re.compile(r"(\w)-\n[ \t]*([a-z])")
+SPACES = re.compile(r"[ \t\f\v\u00a0]+")
+BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def line_key(line):
+    """A line with digits and case ignored, so "Page 4" and "Page 5" match"""
+    return re.sub(r"\d+", "#", SPACES.sub(" ", line).strip().lower())
+
+
+def edge_lines(lines):
+    """Indexes of the first and last EDGE_LINES non-empty lines"""
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    return set(filled[:EDGE_LINES] + filled[-EDGE_LINES:])
+
+
+def boilerplate_keys(pages):
+    """Keys of the edge lines repeated across enough of `pages`"""
+    seen = Counter()
+    for lines in pages:
+        seen.update({line_key(lines[i]) for i in edge_lines(lines)})
+    threshold = max(MIN_REPEATS, BOILERPLATE_FRACTION * len(pages))
+    return {key for key, count in seen.items() if key and count >= threshold}
+
+
+def normalize_text(text, stats=None):
+    """`text` with hyphenated line breaks joined and whitespace collapsed"""
+    text, joined = HYPHENATED_BREAK.subn(r"\1\2", text)
+    text = "\n".join(SPACES.sub(" ", line).strip() for line in text.split("\n"))
+    text = BLANK_LINES.sub("\n\n", text).strip()
+    if stats is not None:
+        stats["hyphens_joined"] += joined
+    return text
+
+
+def normalize_pages(texts, stats=None):
+    """Normalized text of each page, with headers, footers and page numbers removed.
+
+    `stats`, a Counter if given, gets "chars_in", "chars_out",
+    "boilerplate_lines" and "hyphens_joined".
+    """
+    stats = Counter() if stats is None else stats
+    pages = [text.split("\n") for text in texts]
+    repeated = boilerplate_keys(pages)
+    normalized = []
+    for text, lines in zip(texts, pages):
+        if repeated:
+            edges = edge_lines(lines)
+            kept = [line for i, line in enumerate(lines) if i not in edges or line_key(line) not in repeated]
+            stats["boilerplate_lines"] += len(lines) - len(kept)
+            lines = kept
+        page = normalize_text("\n".join(lines), stats)
+        stats["chars_in"] += len(text)
+        stats["chars_out"] += len(page)
+        normalized.append(page)
+    return normalized
@@ -0,0 +1,151 @@
+"""Per-stage latency, token and call tracing.
+
+Each traced stage (PDF extraction, indexing, retrieval, LLM calls, agent
+runs, ...) becomes a span: a JSON-serialisable dict with the stage name,
+wall time, token counts and any extra attributes. Spans are kept in a
+bounded in-memory Tracer per session, summarised per stage for the debug
+panel, and can be exported as JSON lines. Set STUDYGEN_TRACE_FILE to also
+append every span to a file for offline analysis.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from context_pack import count_tokens
+
+TRACE_FILE = os.getenv("STUDYGEN_TRACE_FILE", "")
+MAX_SPANS = 1000
+
+
+class Tracer:
+    """Thread-safe, bounded record of spans"""
+
+    def __init__(self, session_id="", max_spans=MAX_SPANS, export_path=TRACE_FILE):
+        self.session_id = session_id
+        self.export_path = export_path
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """Time the body as one `stage` span; the body may add fields to the yielded dict"""
+        record = {"stage": stage, **attrs}
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            self.record(record)
+
+    def record(self, span):
+        span.setdefault("time", time.time())
+        span.setdefault("session", self.session_id)
+        with self._lock:
+            self._spans.append(span)
+            if self.export_path:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(span, default=str) + "\n")
+
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def summary(self):
+        """Per stage: calls, total and mean seconds, tokens in and out"""
+        stages = {}
+        for span in self.spans():
+            stats = stages.setdefault(span["stage"], {
+                "stage": span["stage"], "calls": 0, "seconds": 0.0, "tokens_in": 0, "tokens_out": 0
+            })
+            stats["calls"] += 1
+            stats["seconds"] += span["seconds"]
+            stats["tokens_in"] += span.get("tokens_in", 0)
+            stats["tokens_out"] += span.get("tokens_out", 0)
+        for stats in stages.values():
+            stats["mean_seconds"] = stats["seconds"] / stats["calls"]
+        return sorted(stages.values(), key=lambda stats: stats["seconds"], reverse=True)
+
+    def to_jsonl(self):
+        return "".join(json.dumps(span, default=str) + "\n" for span in self.spans())
+
+
+class TracingCallback(BaseCallbackHandler):
+    """LangChain callback that records each LLM call and retrieval as a span"""
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+        self._open = {}  # {run id: (start, span)}
+
+    def _start(self, run_id, span):
+        self._open[run_id] = (time.perf_counter(), span)
+
+    def _end(self, run_id, **fields):
+        start, span = self._open.pop(run_id, (None, None))
+        if span is None:
+            return
+        span.update(fields)
+        span["seconds"] = time.perf_counter() - start
+        self.tracer.record(span)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        text = "".join(str(message.content) for batch in messages for message in batch)
+        self._start(run_id, {"stage": "llm", "model": _model_name(serialized, kwargs), "tokens_in": count_tokens(text)})
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        text = "".join(prompts)
+        self._start(run_id, {"stage": "llm", "model": _model_name(serialized, kwargs), "tokens_in": count_tokens(text)})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        text = "".join(generation.text for batch in response.generations for generation in batch)
+        self._end(run_id, tokens_out=count_tokens(text))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=type(error).__name__)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id, {"stage": "retriever", "tokens_in": count_tokens(query)})
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id, documents=len(documents))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=type(error).__name__)
+
+
+def _model_name(serialized, kwargs):
+    params = kwargs.get("invocation_params") or {}
+    return params.get("model_name") or params.get("model") or (serialized or {}).get("name", "")
+
+
+def show_trace_panel(tracer):
+    """Debug sidebar panel: per-stage totals, recent spans and a JSONL download"""
+    import streamlit as st
+
+    with st.sidebar.expander("🔍 Trace", expanded=False):
+        summary = tracer.summary()
+        if not summary:
+            st.caption("Nothing traced yet.")
+            return
+        st.dataframe(summary, hide_index=True)
+        st.caption("Most recent spans")
+        st.dataframe(tracer.spans()[-20:][::-1], hide_index=True)
+        st.download_button(
+            "📥 Export trace (JSONL)",
+            data=tracer.to_jsonl(),
+            file_name=f"studygen_trace_{int(time.time())}.jsonl",
+            mime="application/jsonl",
+        )
+        if st.button("Clear trace"):
+            tracer.clear()
@@ -0,0 +1,648 @@
+"""Incremental FAISS index for the study document library.
+
+Every document is split and embedded on its own and its chunks are stored
+under IDs derived from the document's name and content. Adding or deleting
+one file therefore only embeds (or drops) that file's chunks; the rest of
+the library is never re-embedded.
+
+Each chunk keeps its document, the page it starts on and the document's
+course and module, and search() can narrow a
+query to matching chunks before the similarity search, so a question about
+one chapter only scores that chapter's vectors. Pages come from read_pdf's
+"--- Page N ---" markers, which are taken out of the text before splitting
+so they are never embedded or sent in a prompt.
+
+A BM25 index (lexical_index.LexicalIndex) is kept alongside the vectors.
+In the default "hybrid" mode, a query whose rare terms all occur in some
+chunk is answered from it alone, without embedding the query; any other
+query fuses the lexical and dense rankings.
+
+With STUDYGEN_DEDUPLICATE on, a chunk that nearly duplicates a stored
+chunk (near_duplicates, MinHash) is stored with its own text and metadata
+but reuses that chunk's vector instead of being embedded, and search()
+returns only the first of near-exact copies. search() can also diversify
+its results with maximal marginal relevance.
+
+FAISS and the LangChain vectorstore and splitter are imported on first
+use, so an app that has no documents yet never loads them.
+"""
+import bisect
+import functools
+import hashlib
+import json
+import os
+import pickle
+import re
+import weakref
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from lexical_index import LexicalIndex
+
+# Part of every document ID; bump it when chunk text or metadata changes so indexes
+# saved by older versions are rebuilt (from the embedding cache) on next use
+INDEX_VERSION = 5
+# Document-level metadata copied onto every chunk, besides "source" and "page"
+METADATA_FIELDS = ("course", "module")
+PAGE_MARKER = re.compile(r"^--- Page (\d+) ---$", re.MULTILINE)
+# "hybrid" (lexical when confident, else fused with dense) or "vector" (dense only)
+RETRIEVAL_MODE = os.getenv("STUDYGEN_RETRIEVAL", "hybrid")
+# Each ranking contributes this many candidates per requested result to the fusion
+FUSION_DEPTH = 4
+RRF_K = 60
+# Default MMR weight on diversity in search(): 0 ranks by relevance only
+RETRIEVAL_DIVERSITY = float(os.getenv("STUDYGEN_RETRIEVAL_DIVERSITY", "0"))
+# Loaders of opened indexes (and their copies) that have not read their vectors yet
+_unread_loaders = weakref.WeakSet()
+
+
+def make_text_splitter():
+    """Splitter shared by every index so chunk boundaries stay identical"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        separators=["\n\n", "\n", ". ", " "]
+    )
+
+
+def document_id(filename, text, metadata=None):
+    """Stable ID for one version of a document and its metadata"""
+    key = f"{INDEX_VERSION}\0{filename}\0{text}"
+    if metadata:
+        key += "\0" + json.dumps(metadata, sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def document_metadata(doc_data):
+    """The course and module a library entry belongs to, if it says"""
+    return {field: doc_data[field] for field in METADATA_FIELDS if doc_data.get(field)}
+
+
+def library_key(all_documents):
+    """Content hash of a whole {filename: {text, ...}} library"""
+    doc_ids = sorted(
+        document_id(filename, doc_data["text"], document_metadata(doc_data))
+        for filename, doc_data in all_documents.items()
+    )
+    return hashlib.sha256("\n".join(doc_ids).encode("utf-8")).hexdigest()[:32]
+
+
+def unread_folders():
+    """Folders that opened indexes will still read their vectors from on first search"""
+    return {loader.folder for loader in list(_unread_loaders)}
+
+
+def read_faiss_index(path):
+    """Read a FAISS index, memory-mapping its vectors when this faiss build can"""
+    import faiss
+
+    mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+    if mmap_flag is not None:
+        try:
+            return faiss.read_index(path, mmap_flag), True
+        except RuntimeError:
+            pass
+    return faiss.read_index(path), False
+
+
+def strip_page_markers(text):
+    """(`text` without page marker lines, [(offset, page number)] where each page starts)"""
+    parts = []
+    markers = []
+    length = 0
+    cursor = 0
+    for match in PAGE_MARKER.finditer(text):
+        parts.append(text[cursor:match.start()])
+        length += match.start() - cursor
+        markers.append((length, int(match.group(1))))
+        # Take the marker's line break too: a page break is not a paragraph break
+        cursor = match.end() + text.startswith("\n", match.end())
+    parts.append(text[cursor:])
+    return "".join(parts), markers
+
+
+def chunk_pages(text, chunks, markers):
+    """Page number each chunk of `text` starts on, given its page `markers`, or None without any"""
+    offsets = [offset for offset, _ in markers]
+    pages = []
+    cursor = 0
+    for chunk in chunks:
+        # Chunks come in order and overlap, so each starts at or after the previous one
+        start = text.find(chunk, cursor)
+        if start < 0:
+            start = cursor
+        cursor = start + 1
+        before = bisect.bisect_right(offsets, start)
+        if before:
+            pages.append(markers[before - 1][1])
+        elif markers:
+            pages.append(markers[0][1])  # the document header belongs to page one
+        else:
+            pages.append(None)
+    return pages
+
+
+def reciprocal_rank_fusion(rankings):
+    """Chunk IDs from several best-first rankings, ordered by reciprocal rank fusion"""
+    scores = Counter()
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] += 1 / (RRF_K + rank + 1)
+    return [chunk_id for chunk_id, _ in scores.most_common()]
+
+
+def maximal_marginal_relevance(vectors, k, diversity):
+    """Indexes of `k` of the best-first `vectors`, trading rank against similarity to those already picked"""
+    import numpy as np
+
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = vectors @ vectors.T
+    relevance = 1 - np.arange(len(vectors)) / len(vectors)
+    picked = [0]
+    while len(picked) < min(k, len(vectors)):
+        redundancy = similarity[:, picked].max(axis=1)
+        scores = (1 - diversity) * relevance - diversity * redundancy
+        scores[picked] = -np.inf
+        picked.append(int(np.argmax(scores)))
+    return picked
+
+
+def matches(value, allowed):
+    """Whether `value` passes one filter entry: a single value, or a list, set or range of them"""
+    if isinstance(allowed, (list, tuple, set, frozenset, range)):
+        return value in allowed
+    return value == allowed
+
+
+def name_words(text):
+    return re.findall(r"[a-z]+|\d+", text.lower())
+
+
+def mentions(words, name):
+    """Whether the word sequence `name` appears in `words`"""
+    return any(words[i:i + len(name)] == name for i in range(len(words) - len(name) + 1))
+
+
+@functools.lru_cache(maxsize=None)
+def scoped_retriever_class():
+    from langchain_core.retrievers import BaseRetriever
+
+    class ScopedRetriever(BaseRetriever):
+        """Retriever over an IncrementalIndex that filters chunks before the similarity search.
+
+        Without an explicit filter, a query naming a document or module
+        ("Chapter 5 notes") is scoped to it.
+        """
+
+        index: object
+        k: int = 4
+        filter: Optional[dict] = None
+        diversity: Optional[float] = None
+
+        def _get_relevant_documents(self, query, *, run_manager=None):
+            return self.index.search(query, self.k, self.filter or self.index.scope_for(query), diversity=self.diversity)
+
+    return ScopedRetriever
+
+
+class IncrementalIndex:
+    """FAISS vectorstore that is updated per document instead of rebuilt"""
+
+    def __init__(self, embeddings, text_splitter=None):
+        self.embeddings = embeddings
+        self.text_splitter = text_splitter or make_text_splitter()
+        self.documents = {}  # {filename: (document id, [chunk ids])}
+        self.metadata = {}  # {filename: {course, module}}, for documents that have any
+        self._store = None
+        self._positions = None  # {chunk id: row in the FAISS index}
+        self._lexical = LexicalIndex()
+        self._lexical_file = None  # saved postings of a loaded index, read on first use
+        self._near_duplicates = None
+        self._near_duplicates_file = None
+        self.search_counts = Counter()  # {"lexical" | "hybrid" | "vector": searches}
+        self._loader = None
+        self._mmapped = False
+
+    def __contains__(self, filename):
+        return filename in self.documents
+
+    def __len__(self):
+        return len(self.documents)
+
+    @property
+    def store(self):
+        # Persisted indexes are only read from disk when first searched
+        if self._loader is not None:
+            loader, self._loader = self._loader, None
+            self._store, self._mmapped = loader()
+        return self._store
+
+    @store.setter
+    def store(self, value):
+        self._loader = None
+        self._mmapped = False
+        self._positions = None
+        self._store = value
+
+    def _load_or_rebuild(self, path, index, add):
+        """A saved side index, or `index` rebuilt with add(index, chunk id, text) from the chunk texts"""
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        if self.store is not None:
+            for chunk_id, doc in self.store.docstore._dict.items():
+                add(index, chunk_id, doc.page_content)
+        return index
+
+    @property
+    def lexical(self):
+        # Loaded indexes read their saved postings, or rebuild them from the chunk texts
+        if self._lexical is None:
+            self._lexical = self._load_or_rebuild(self._lexical_file, LexicalIndex(), LexicalIndex.add)
+        return self._lexical
+
+    @property
+    def near_duplicates(self):
+        if self._near_duplicates is None:
+            from near_duplicates import NearDuplicateIndex, signature, word_hashes
+
+            self._near_duplicates = self._load_or_rebuild(
+                self._near_duplicates_file, NearDuplicateIndex(),
+                lambda index, chunk_id, text: index.add(chunk_id, signature(text), word_hashes(text))
+            )
+        return self._near_duplicates
+
+    @property
+    def key(self):
+        doc_ids = sorted(doc_id for doc_id, _ in self.documents.values())
+        return hashlib.sha256("\n".join(doc_ids).encode("utf-8")).hexdigest()[:32]
+
+    @property
+    def chunk_count(self):
+        return sum(len(ids) for _, ids in self.documents.values())
+
+    def split_document(self, filename, text):
+        return self._split(filename, text)[0]
+
+    def _split(self, filename, text):
+        """(chunks, page each chunk starts on) for one document"""
+        header = f"=== {filename} ===\n"
+        text, markers = strip_page_markers(text)
+        text = header + text
+        chunks = self.text_splitter.split_text(text)
+        return chunks, chunk_pages(text, chunks, [(offset + len(header), page) for offset, page in markers])
+
+    def _writable_store(self):
+        # A memory-mapped index is read-only; copy it into RAM before changing it
+        import faiss
+
+        store = self.store
+        if self._mmapped and store is not None:
+            store.index = faiss.deserialize_index(faiss.serialize_index(store.index))
+            self._mmapped = False
+        return store
+
+    def plan_document(self, filename, doc_id, text, metadata=None):
+        """Split one document into (chunks, reused vectors) without embedding anything.
+
+        Chunks are [(chunk id, text, chunk metadata)]. With deduplication
+        on, reused vectors map the ID of each chunk that nearly duplicates an
+        earlier one (stored, or earlier in this document) without adding
+        words of its own to that chunk's ID, whose vector it takes; the rest
+        need embedding. Every chunk is registered for near-duplicate checks,
+        so later chunks are compared with it.
+        """
+        from near_duplicates import DEDUPLICATE, signature, word_hashes
+
+        chunks, pages = self._split(filename, text)
+        planned = []
+        reused = {}
+        for i, (chunk, page) in enumerate(zip(chunks, pages)):
+            chunk_id = f"{doc_id}-{i}"
+            chunk_metadata = {"source": filename, **(metadata or {}), **({"page": page} if page is not None else {})}
+            if DEDUPLICATE:
+                sig, words = signature(chunk), word_hashes(chunk)
+                stand_in = self.near_duplicates.find(sig, words)
+                if stand_in is not None:
+                    reused[chunk_id] = stand_in
+                self.near_duplicates.add(chunk_id, sig, words)
+            planned.append((chunk_id, chunk, chunk_metadata))
+        return planned, reused
+
+    def _store_chunks(self, chunks, reused=None):
+        """Store [(chunk id, text, chunk metadata)], embedding those not in `reused` ({chunk id: stand-in id})"""
+        from langchain_community.vectorstores import FAISS
+
+        if not chunks:
+            return
+        reused = reused or {}
+        ids, texts, metadatas = (list(column) for column in zip(*chunks))
+        new = [(chunk_id, text) for chunk_id, text, _ in chunks if chunk_id not in reused]
+        vectors = dict(zip(
+            [chunk_id for chunk_id, _ in new],
+            self.embeddings.embed_documents([text for _, text in new]) if new else []
+        ))
+        for chunk_id in ids:
+            if chunk_id in reused:
+                stand_in = reused[chunk_id]
+                vectors[chunk_id] = vectors[stand_in] if stand_in in vectors else self._vector(stand_in)
+        text_embeddings = [(text, vectors[chunk_id]) for chunk_id, text in zip(ids, texts)]
+        lexical = self.lexical
+        store = self._writable_store()
+        if store is None:
+            self.store = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas, ids=ids)
+        else:
+            store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        self._positions = None
+        for chunk_id, text in zip(ids, texts):
+            lexical.add(chunk_id, text)
+
+    def _vector(self, chunk_id):
+        """The stored vector of `chunk_id`, as FAISS holds it"""
+        return self.store.index.reconstruct(int(self._rows([chunk_id])[0])).tolist()
+
+    def add_document(self, filename, text, metadata=None):
+        """Embed and add one document. Returns the number of chunks embedded."""
+        metadata = metadata or {}
+        doc_id = document_id(filename, text, metadata)
+        if filename in self.documents:
+            if self.documents[filename][0] == doc_id:
+                return 0
+            self.remove_document(filename)
+
+        chunks, reused = self.plan_document(filename, doc_id, text, metadata)
+        self._store_chunks(chunks, reused)
+        self.documents[filename] = (doc_id, [chunk_id for chunk_id, _, _ in chunks])
+        if metadata:
+            self.metadata[filename] = metadata
+        return len(chunks) - len(reused)
+
+    def remove_document(self, filename):
+        """Drop one document's chunks by ID. Nothing is re-embedded."""
+        from near_duplicates import DEDUPLICATE
+
+        _, ids = self.documents.pop(filename, (None, []))
+        self.metadata.pop(filename, None)
+        self._positions = None
+        if self.chunk_count == 0:
+            self.store = None
+            self._lexical = LexicalIndex()
+            self._near_duplicates = None
+            self._near_duplicates_file = None
+        elif ids:
+            lexical = self.lexical
+            store = self._writable_store()
+            lexical.remove(ids, [store.docstore.search(chunk_id).page_content for chunk_id in ids])
+            # Chunks that took a removed chunk's vector keep their own copy of it
+            if DEDUPLICATE or self._near_duplicates is not None:
+                self.near_duplicates.remove(ids)
+            store.delete(ids)
+
+    def sync(self, all_documents):
+        """Bring the index in line with a {filename: {text, ...}} library.
+
+        Only files that were added, changed or removed since the last sync
+        are touched. Returns the number of chunks embedded.
+        """
+        for filename in list(self.documents):
+            if filename not in all_documents:
+                self.remove_document(filename)
+
+        embedded = 0
+        for filename, doc_data in all_documents.items():
+            embedded += self.add_document(filename, doc_data["text"], document_metadata(doc_data))
+        return embedded
+
+    def copy(self):
+        """Independent copy that can be changed without touching this index.
+
+        Vectors are copied, never re-embedded. A not-yet-loaded index shares
+        its loader, so copying it stays free until it is searched.
+        """
+        import faiss
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+
+        other = type(self)(self.embeddings, self.text_splitter)
+        other.documents = dict(self.documents)
+        other.metadata = dict(self.metadata)
+        other._near_duplicates = self._near_duplicates.copy() if self._near_duplicates is not None else None
+        other._near_duplicates_file = self._near_duplicates_file
+        other._lexical = self._lexical.copy() if self._lexical is not None else None
+        other._lexical_file = self._lexical_file
+        if self._loader is not None:
+            other._loader = self._loader
+        elif self._store is not None:
+            store = self._store
+            other._store = FAISS(
+                self.embeddings,
+                faiss.deserialize_index(faiss.serialize_index(store.index)),
+                InMemoryDocstore(dict(store.docstore._dict)),
+                dict(store.index_to_docstore_id)
+            )
+        return other
+
+    def memory_bytes(self):
+        """Approximate RAM held by the loaded vectors, chunk texts and lexical postings"""
+        if self._store is None:
+            return 0
+        vectors = 0 if self._mmapped else self._store.index.ntotal * self._store.index.d * 4
+        texts = sum(len(doc.page_content) for doc in self._store.docstore._dict.values())
+        # Roughly one dict entry (~100 bytes) per (term, chunk) posting
+        postings = 0 if self._lexical is None else 100 * sum(map(len, self._lexical.postings.values()))
+        # 64 uint64s, a few hundred word hashes and their dict entries
+        signatures = 0 if self._near_duplicates is None else 1200 * len(self._near_duplicates)
+        return vectors + texts + postings + signatures
+
+    def as_retriever(self, search_kwargs=None):
+        """Retriever taking the `k` and optional `filter` and `diversity` of search()"""
+        if not self.chunk_count:
+            raise ValueError("The index is empty; add a document first.")
+        search_kwargs = search_kwargs or {}
+        return scoped_retriever_class()(
+            index=self, k=search_kwargs.get("k", 4), filter=search_kwargs.get("filter"),
+            diversity=search_kwargs.get("diversity")
+        )
+
+    def scoped_key(self, filter=None):
+        """Library key, extended by `filter` so answers from different scopes never mix"""
+        if not filter:
+            return self.key
+        scope = json.dumps(filter, sort_keys=True, default=lambda value: list(value))
+        return f"{self.key}-{hashlib.sha256(scope.encode('utf-8')).hexdigest()[:8]}"
+
+    def scope_for(self, query):
+        """Filter for the documents or modules `query` names, or None.
+
+        Only names of two or more words count ("chapter5.pdf", "Week 2"), so a
+        file called "notes.txt" does not capture every question about notes.
+        """
+        words = name_words(query)
+        sources = []
+        for filename in self.documents:
+            names = [os.path.splitext(os.path.basename(filename))[0], self.metadata.get(filename, {}).get("module", "")]
+            if any(len(name) >= 2 and mentions(words, name) for name in map(name_words, names)):
+                sources.append(filename)
+        return {"source": sources} if sources else None
+
+    def search(self, query, k=4, filter=None, mode=None, diversity=None):
+        """The `k` chunks most relevant to `query` among those matching `filter`.
+
+        `filter` maps "source", "page", "course" or "module" to a value or a
+        list, set or range of values, e.g. {"source": "bio.pdf", "page":
+        range(40, 61)}. Matching chunks are found from the metadata first and
+        only they are scored. `mode` defaults to STUDYGEN_RETRIEVAL. With a
+        `diversity` above 0 (default STUDYGEN_RETRIEVAL_DIVERSITY), the `k`
+        are picked by maximal marginal relevance from a deeper ranking.
+        """
+        store = self.store
+        if store is None:
+            raise ValueError("The index is empty; add a document first.")
+        allowed = None
+        if filter:
+            allowed = self._filtered_ids(filter)
+            if not allowed:
+                return []
+
+        from near_duplicates import DEDUPLICATE
+
+        diversity = RETRIEVAL_DIVERSITY if diversity is None else diversity
+        depth = k * FUSION_DEPTH if diversity or DEDUPLICATE else k
+        lexical = self.lexical if (mode or RETRIEVAL_MODE) == "hybrid" else None
+        if lexical is None:
+            self.search_counts["vector"] += 1
+            ranking = self._dense_search(depth, self.embeddings.embed_query(query), allowed)
+        elif lexical.confident(query, allowed):
+            # The query's rare terms are in the library: no query embedding needed
+            self.search_counts["lexical"] += 1
+            ranking = [chunk_id for chunk_id, _ in lexical.search(query, depth, allowed)]
+        else:
+            self.search_counts["hybrid"] += 1
+            # BM25 scoring runs while the query embedding is on the network
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                vector = pool.submit(self.embeddings.embed_query, query)
+                lexical_ranking = [chunk_id for chunk_id, _ in lexical.search(query, k * FUSION_DEPTH, allowed)]
+                dense_ranking = self._dense_search(k * FUSION_DEPTH, vector.result(), allowed)
+            ranking = reciprocal_rank_fusion([dense_ranking, lexical_ranking])[:depth]
+        if DEDUPLICATE:
+            ranking = self._without_copies(ranking)
+        return self._chunks(self._diversify(ranking, k, diversity))
+
+    def _without_copies(self, ranking):
+        """`ranking` without chunks that are near-exact copies of one ranked above them"""
+        from near_duplicates import COPY_THRESHOLD, signature, similarity
+
+        signatures = self.near_duplicates.signatures
+        kept, kept_signatures = [], []
+        for chunk_id in ranking:
+            sig = signatures.get(chunk_id)
+            if sig is None:
+                sig = signature(self.store.docstore.search(chunk_id).page_content)
+            if not any(similarity(sig, other) >= COPY_THRESHOLD for other in kept_signatures):
+                kept.append(chunk_id)
+                kept_signatures.append(sig)
+        return kept
+
+    def _diversify(self, ranking, k, diversity):
+        """`k` of the best-first `ranking`, picked by maximal marginal relevance when `diversity` > 0"""
+        if not diversity or len(ranking) <= k:
+            return ranking[:k]
+        vectors = self.store.index.reconstruct_batch(self._rows(ranking))
+        return [ranking[i] for i in maximal_marginal_relevance(vectors, k, diversity)]
+
+    def _rows(self, chunk_ids):
+        """FAISS rows of `chunk_ids`"""
+        import numpy as np
+
+        if self._positions is None:
+            self._positions = {chunk_id: row for row, chunk_id in self.store.index_to_docstore_id.items()}
+        return np.asarray([self._positions[chunk_id] for chunk_id in chunk_ids], dtype="int64")
+
+    def _chunks(self, chunk_ids):
+        return [self.store.docstore.search(chunk_id) for chunk_id in chunk_ids]
+
+    def _dense_search(self, n, vector, allowed=None):
+        """IDs of the `n` chunks nearest to the query's `vector`, best first, optionally only among `allowed`"""
+        import numpy as np
+
+        store = self.store
+        vector = np.asarray([vector], dtype="float32")
+        if allowed is None:
+            _, rows = store.index.search(vector, min(n, store.index.ntotal))
+            return [store.index_to_docstore_id[row] for row in rows[0] if row >= 0]
+
+        candidates = list(allowed)
+        # FAISS.from_texts builds a flat L2 index, so this ranks as it would
+        distances = ((store.index.reconstruct_batch(self._rows(candidates)) - vector) ** 2).sum(axis=1)
+        return [candidates[i] for i in np.argsort(distances)[:n]]
+
+    def _filtered_ids(self, filter):
+        """IDs of the chunks matching `filter`"""
+        store = self.store
+        document_fields = {"source", *METADATA_FIELDS}
+        chunk_filter = {field: allowed for field, allowed in filter.items() if field not in document_fields}
+        chunk_ids = set()
+        for filename, (_, ids) in self.documents.items():
+            fields = {"source": filename, **self.metadata.get(filename, {})}
+            if not all(matches(fields.get(field), allowed) for field, allowed in filter.items() if field in document_fields):
+                continue
+            for chunk_id in ids:
+                if chunk_filter:
+                    chunk = store.docstore.search(chunk_id).metadata
+                    if not all(matches(chunk.get(field), allowed) for field, allowed in chunk_filter.items()):
+                        continue
+                chunk_ids.add(chunk_id)
+        return chunk_ids
+
+    def save(self, folder):
+        """Write the index to `folder` (index.faiss, index.pkl, lexical.pkl, near_duplicates.pkl, documents.json)"""
+        import faiss
+        from near_duplicates import DEDUPLICATE
+
+        os.makedirs(folder, exist_ok=True)
+        store = self.store
+        if store is not None:
+            faiss.write_index(store.index, os.path.join(folder, "index.faiss"))
+            with open(os.path.join(folder, "index.pkl"), "wb") as f:
+                pickle.dump((store.docstore, store.index_to_docstore_id), f)
+            with open(os.path.join(folder, "lexical.pkl"), "wb") as f:
+                pickle.dump(self.lexical, f)
+            if DEDUPLICATE:
+                with open(os.path.join(folder, "near_duplicates.pkl"), "wb") as f:
+                    pickle.dump(self.near_duplicates, f)
+        with open(os.path.join(folder, "documents.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                name: [doc_id, ids, self.metadata.get(name, {})] for name, (doc_id, ids) in self.documents.items()
+            }, f)
+
+    @classmethod
+    def load(cls, folder, embeddings, text_splitter=None):
+        """Open an index written by save(). The vectors are read on first use."""
+        index = cls(embeddings, text_splitter)
+        with open(os.path.join(folder, "documents.json"), encoding="utf-8") as f:
+            for name, (doc_id, ids, metadata) in json.load(f).items():
+                index.documents[name] = (doc_id, ids)
+                if metadata:
+                    index.metadata[name] = metadata
+
+        def load_store():
+            from langchain_community.vectorstores import FAISS
+
+            faiss_index, mmapped = read_faiss_index(os.path.join(folder, "index.faiss"))
+            # Only ever unpickles files this app wrote into its own cache directory
+            with open(os.path.join(folder, "index.pkl"), "rb") as f:
+                docstore, index_to_docstore_id = pickle.load(f)
+            return FAISS(embeddings, faiss_index, docstore, index_to_docstore_id), mmapped
+
+        if index.chunk_count:
+            # Pruning skips the folder until every index holding this loader has read it
+            load_store.folder = os.path.abspath(folder)
+            _unread_loaders.add(load_store)
+            index._loader = load_store
+            index._lexical = None
+            index._lexical_file = os.path.join(folder, "lexical.pkl")
+            index._near_duplicates_file = os.path.join(folder, "near_duplicates.pkl")
+        return index